@@ -0,0 +1,199 @@
+# ai_cache.py
+# TTL + LRU cache with in-flight de-duplication for OpenAI strategy responses
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# Cache location, lifetime and size (set AI_CACHE=0 to always call OpenAI)
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', os.path.expanduser('~/.cache/trading-scripts/ai_cache.db'))
+AI_CACHE_ENABLED = os.getenv('AI_CACHE', '1') != '0'
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', 300))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 256))
+
+# Prices are compared at this many significant digits, so tiny ticks reuse the same answer
+PRICE_SIGNIFICANT_DIGITS = 4
+
+def quantize(price):
+    """Round a price to PRICE_SIGNIFICANT_DIGITS significant digits"""
+    return float(f"{price:.{PRICE_SIGNIFICANT_DIGITS}g}")
+
+def make_key(token, entry_price, take_profit, stop_loss, position_size, current_price, candle_sets):
+    """
+    Hash of the normalized prompt inputs.
+
+    Prices are quantized and each timeframe contributes only the open time of
+    its last closed candle, so the key changes when a candle closes rather
+    than on every tick of the open one.
+    """
+    closed_state = []
+    for candles in candle_sets:
+        if isinstance(candles, str) or len(candles) < 2:
+            closed_state.append(None)
+        else:
+            closed_state.append(int(candles.timestamp[-2]))
+
+    inputs = {
+        'token': token,
+        'entry': quantize(entry_price),
+        'take_profit': quantize(take_profit),
+        'stop_loss': quantize(stop_loss),
+        'position_size': quantize(position_size),
+        'current': quantize(current_price) if current_price is not None else None,
+        'closed_candles': closed_state,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed response cache shared across runs.
+
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_entries`. Concurrent calls for the same key inside one
+    process share a single in-flight call.
+    """
+
+    def __init__(self, path=None, ttl=AI_CACHE_TTL, max_entries=AI_CACHE_MAX_ENTRIES, enabled=AI_CACHE_ENABLED):
+        self.path = path or AI_CACHE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ai_responses_last_used ON ai_responses (last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS ai_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _lookup(self, conn, key, now):
+        row = conn.execute("SELECT response, created FROM ai_responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now - self.ttl:
+            conn.execute("DELETE FROM ai_responses WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE ai_responses SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _store(self, conn, key, response, now):
+        conn.execute("INSERT OR REPLACE INTO ai_responses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                     (key, response, now, now))
+        conn.execute("DELETE FROM ai_responses WHERE created < ?", (now - self.ttl,))
+        conn.execute("""
+            DELETE FROM ai_responses WHERE key NOT IN (
+                SELECT key FROM ai_responses ORDER BY last_used DESC LIMIT ?
+            )
+        """, (self.max_entries,))
+
+    def _count(self, conn, name, amount=1):
+        conn.execute("INSERT INTO ai_cache_stats (name, value) VALUES (?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def add_stats(self, **amounts):
+        """Add integer amounts to cumulative counters kept alongside the hit/miss counts"""
+        if not self.enabled:
+            return
+        try:
+            with self._transaction() as conn:
+                for name, amount in amounts.items():
+                    self._count(conn, name, amount)
+        except sqlite3.Error:
+            pass
+
+    def get_or_call(self, key, call):
+        """
+        Return (response, hit). On a miss `call()` runs once and must return
+        (response, cacheable); only cacheable responses are stored. Callers
+        coalesced onto an in-flight call get its response, as a hit only
+        when that response was cacheable.
+        """
+        if not self.enabled:
+            self.misses += 1
+            return call()[0], False
+
+        with self.lock:
+            try:
+                with self._transaction() as conn:
+                    cached = self._lookup(conn, key, time.time())
+                    if cached is not None:
+                        self._count(conn, 'hits')
+            except sqlite3.Error:
+                cached = None
+            if cached is not None:
+                self.hits += 1
+                return cached, True
+
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            # Shared answers count as hits only if the owner's response was cacheable
+            return future.result()
+
+        try:
+            response, cacheable = call()
+            try:
+                with self._transaction() as conn:
+                    if cacheable:
+                        self._store(conn, key, response, time.time())
+                    self._count(conn, 'misses')
+            except sqlite3.Error:
+                pass
+            future.set_result((response, cacheable))
+            return response, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def totals(self):
+        """Cumulative hit/miss counts across all runs"""
+        try:
+            with self._transaction() as conn:
+                return dict(conn.execute("SELECT name, value FROM ai_cache_stats").fetchall())
+        except sqlite3.Error:
+            return {}
+
+    def stats_line(self):
+        totals = self.totals()
+        return (f"hits: {self.hits} | misses: {self.misses} | coalesced: {self.coalesced} "
+                f"(all runs: {totals.get('hits', 0)} hits / {totals.get('misses', 0)} misses)")
+
+# Shared cache used by get_ai_suggestion
+response_cache = ResponseCache()
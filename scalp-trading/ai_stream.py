@@ -0,0 +1,119 @@
+# ai_stream.py
+# Server-sent-event reader for OpenAI chat streams and an incremental parser for the JSON answer
+
+import json
+
+def iter_sse_data(lines):
+    """Yield the payload of each `data:` line of a server-sent-event stream, stopping at [DONE]"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.startswith('data:'):
+            continue  # blank separators, comments and other SSE fields
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return
+        yield data
+
+def iter_chat_deltas(lines):
+    """Yield the content text of each chat.completion.chunk event"""
+    for data in iter_sse_data(lines):
+        chunk = json.loads(data)
+        for choice in chunk.get('choices', []):
+            text = (choice.get('delta') or {}).get('content')
+            if text:
+                yield text
+
+class IncrementalObjectParser:
+    """
+    Incremental parser for one JSON object, optionally wrapped in a ```json
+    fence. feed() returns the top-level (key, value) pairs whose values were
+    completed by the new text. `invalid` is set as soon as the text can no
+    longer be such an object.
+    """
+
+    def __init__(self):
+        self.pending = ''       # text before the opening brace
+        self.buffer = ''        # text after the opening brace
+        self.started = False
+        self.done = False
+        self.invalid = False
+        self.pos = 0
+        self.depth = 1
+        self.in_string = False
+        self.escape = False
+        self.member_start = 0
+
+    @property
+    def complete(self):
+        """True once a whole, valid object has been read"""
+        return self.done and not self.invalid
+
+    def _start(self):
+        while True:
+            head = self.pending.lstrip()
+            if head.startswith('{'):
+                self.started = True
+                self.buffer = head[1:]
+                self.pending = ''
+                return True
+            if head.startswith('```'):
+                newline = head.find('\n')
+                if newline < 0:
+                    self.pending = head
+                    return False
+                self.pending = head[newline + 1:]  # drop the fence line, e.g. ```json
+                continue
+            if head and not '```'.startswith(head):
+                self.invalid = True
+            self.pending = head
+            return False
+
+    def _member(self, text):
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads('{' + text + '}').items())
+        except ValueError:
+            self.invalid = True
+            return []
+
+    def feed(self, text):
+        if self.invalid or self.done:
+            return []
+        if not self.started:
+            self.pending += text
+            if not self._start():
+                return []
+        else:
+            self.buffer += text
+
+        fields = []
+        buffer = self.buffer
+        i = self.pos
+        while i < len(buffer) and not self.invalid:
+            c = buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+            elif c == '"':
+                self.in_string = True
+            elif c in '{[':
+                self.depth += 1
+            elif c in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    fields += self._member(buffer[self.member_start:i])
+                    self.done = True
+                    i += 1
+                    break
+            elif c == ',' and self.depth == 1:
+                fields += self._member(buffer[self.member_start:i])
+                self.member_start = i + 1
+            i += 1
+        self.pos = i
+        return fields
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# backtest.py
+# Vectorized historical backtester for fixed TP/SL percentage strategies
+
+import sys
+import time
+
+import numpy as np
+
+import kline_cache
+from candles import Candles
+from scalp_calc import calc_profit_grid, colorize_positive, colorize_negative, format_currency
+
+# First-hit search starts with a small window and doubles it, so quick exits stay cheap
+FIRST_HIT_CHUNK = 64
+FIRST_HIT_MAX_CHUNK = 65536
+
+# Candles after each possible entry that simulate_trades checks in one vectorized scan
+SCAN_BARS = 64
+# Fraction of entries that must have exited after 8 scanned candles to keep scanning
+SCAN_MIN_RESOLVED = 0.25
+
+def first_hit(high, low, start, take_profit, stop_loss, is_long=True, max_bars=None):
+    """
+    Return (index, outcome) of the first candle from start whose range touches
+    the take profit or stop loss, outcome being 'tp' or 'sl'. When a candle
+    touches both, the stop loss is assumed to fill first. Returns (None, None)
+    if neither level is hit within max_bars or before the data ends.
+    """
+    end = len(high) if max_bars is None else min(len(high), start + max_bars)
+    chunk = FIRST_HIT_CHUNK
+    i = start
+    while i < end:
+        j = min(i + chunk, end)
+        h = high[i:j]
+        l = low[i:j]
+        if is_long:
+            tp_hit = h >= take_profit
+            sl_hit = l <= stop_loss
+        else:
+            tp_hit = l <= take_profit
+            sl_hit = h >= stop_loss
+        hit = tp_hit | sl_hit
+        k = int(hit.argmax())
+        if hit[k]:
+            return i + k, 'sl' if sl_hit[k] else 'tp'
+        i = j
+        chunk = min(chunk * 2, FIRST_HIT_MAX_CHUNK)
+    return None, None
+
+def scan_first_hits(candles, take_profit, stop_loss, is_long=True, bars=SCAN_BARS):
+    """
+    first_hit for a trade entered at every candle's close at once, over the
+    next `bars` candles. Returns per-start (index, is_sl) arrays, index -1
+    where neither level was touched, and the number of candles scanned
+    (fewer than `bars` when few entries resolve early: trades are then long
+    and few, and cheaper to finish one by one).
+
+    Each step compares one candle offset for all starts with contiguous
+    slices, so the cost is O(len(candles) * bars) whatever the trade count.
+    """
+    high, low = candles.high, candles.low
+    starts = len(candles) - 1
+    hit_index = np.full(max(starts, 0), -1, dtype=np.int64)
+    hit_sl = np.zeros(max(starts, 0), dtype=bool)
+    pending = np.ones(max(starts, 0), dtype=bool)
+    scanned = 0
+    for k in range(1, min(bars, starts) + 1):
+        count = starts - k + 1  # starts with a candle k bars later
+        h, l = high[k:k + count], low[k:k + count]
+        if is_long:
+            tp_hit = h >= take_profit[:count]
+            sl_hit = l <= stop_loss[:count]
+        else:
+            tp_hit = l <= take_profit[:count]
+            sl_hit = h >= stop_loss[:count]
+        new = (tp_hit | sl_hit) & pending[:count]
+        found = np.flatnonzero(new)
+        if len(found):
+            hit_index[found] = found + k
+            hit_sl[found] = sl_hit[found]
+            pending[found] = False
+        scanned = k
+        if k % 8 == 0:
+            resolved = starts - np.count_nonzero(pending)
+            if resolved == starts or resolved < starts * SCAN_MIN_RESOLVED:
+                break
+    return hit_index, hit_sl, scanned
+
+def simulate_trades(candles, tp_pct, sl_pct, is_long=True, max_bars=None):
+    """
+    Replay candles with an always-in-market TP/SL strategy.
+
+    A trade enters at a candle close, exits at the first TP/SL touch (at the
+    open instead when the candle gaps through the level) or after max_bars at
+    the close, and the next trade enters at that exit candle's close. Returns
+    the per-trade entry/exit indexes, prices and outcomes; the trades do not
+    depend on position size or fees, so one replay can be booked many ways.
+
+    Exits within SCAN_BARS candles are found for every possible entry in one
+    vectorized scan (scan_first_hits), then the trade chain is walked; only
+    longer trades fall back to first_hit. A year of 1m candles at 0.1% TP/SL
+    (~250k trades) takes ~0.3s on one core, dominated by the scan.
+    """
+    high, low = candles.high, candles.low
+    opens, closes = candles.open, candles.close
+    direction = 1 if is_long else -1
+    n = len(candles)
+
+    take_profit = closes * (1 + direction * tp_pct / 100)
+    stop_loss = closes * (1 - direction * sl_pct / 100)
+    hit_index, hit_sl, scanned = scan_first_hits(candles, take_profit, stop_loss, is_long,
+                                                 SCAN_BARS if max_bars is None else min(SCAN_BARS, max_bars))
+    # The walk runs in Python, where list lookups beat numpy scalar indexing
+    hit_index_list = hit_index.tolist()
+
+    entry_idx, exit_idx, hit_kind = [], [], []  # hit_kind: 1 tp, 2 sl, 0 time
+    i = 0
+    while i < n - 1:
+        j = hit_index_list[i]
+        if j >= 0:
+            kind = 2 if hit_sl[i] else 1
+        elif max_bars is not None and max_bars <= scanned:
+            j, kind = None, None
+        else:
+            remaining = None if max_bars is None else max_bars - scanned
+            j, outcome = first_hit(high, low, i + 1 + scanned, take_profit[i], stop_loss[i], is_long, remaining)
+            kind = None if j is None else (2 if outcome == 'sl' else 1)
+        if j is None:
+            if max_bars is None or i + max_bars >= n:
+                break  # still open when the data ends
+            j = i + max_bars
+            kind = 0
+        entry_idx.append(i)
+        exit_idx.append(j)
+        hit_kind.append(kind)
+        i = j
+
+    entry_idx = np.array(entry_idx, dtype=np.int64)
+    exit_idx = np.array(exit_idx, dtype=np.int64)
+    hit_kind = np.array(hit_kind, dtype=np.int8)
+
+    level = np.where(hit_kind == 2, stop_loss[entry_idx], take_profit[entry_idx])
+    exit_open = opens[exit_idx]
+    # Gap through the level: fill at the open
+    gapped = np.where((hit_kind == 1) == is_long, exit_open > level, exit_open < level)
+    exit_price = np.where(hit_kind == 0, closes[exit_idx], np.where(gapped, exit_open, level))
+
+    return {
+        'entry_index': entry_idx,
+        'exit_index': exit_idx,
+        'entry': closes[entry_idx].astype(np.float64),
+        'exit': exit_price.astype(np.float64),
+        'outcome': np.array(['time', 'tp', 'sl'], dtype='U4')[hit_kind],
+    }
+
+def run_backtest(candles, tp_pct, sl_pct, position_size, is_long=True, use_bnb_discount=False, max_bars=None):
+    """Backtest the TP/SL strategy of simulate_trades, returning the per-trade arrays and summary statistics"""
+    trades = simulate_trades(candles, tp_pct, sl_pct, is_long, max_bars)
+
+    # Book every trade in one pass with the calc_profit fee model (leverage -1 books a short)
+    result = calc_profit_grid(trades['entry'], trades['exit'], position_size, use_bnb_discount=use_bnb_discount,
+                              leverage=1 if is_long else -1)
+    trades['net'] = result['net_amount']
+    trades['fees'] = result['fees']
+    return trades, summarize(trades, candles)
+
+def summarize(trades, candles):
+    """Win rate, expectancy, drawdown and time-in-trade for a set of trades"""
+    net = trades['net']
+    count = len(net)
+    if count == 0:
+        return {'trades': 0}
+
+    equity = np.cumsum(net)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+    bars = trades['exit_index'] - trades['entry_index']
+    minutes = (candles.timestamp[trades['exit_index']] - candles.timestamp[trades['entry_index']]) / 60000
+    wins = net > 0
+    gross_win = float(net[wins].sum())
+    gross_loss = float(-net[~wins].sum())
+
+    return {
+        'trades': count,
+        'wins': int(wins.sum()),
+        'win_rate': float(wins.mean() * 100),
+        'expectancy': float(net.mean()),
+        'total_net': float(equity[-1]),
+        'total_fees': float(trades['fees'].sum()),
+        'profit_factor': gross_win / gross_loss if gross_loss > 0 else float('inf'),
+        'max_drawdown': float(drawdown.max()),
+        'avg_bars': float(bars.mean()),
+        'avg_minutes': float(minutes.mean()),
+        'max_minutes': float(minutes.max()),
+        'tp_exits': int((trades['outcome'] == 'tp').sum()),
+        'sl_exits': int((trades['outcome'] == 'sl').sum()),
+        'time_exits': int((trades['outcome'] == 'time').sum()),
+    }
+
+def print_summary(stats, elapsed):
+    """Print backtest statistics with colors"""
+    if not stats['trades']:
+        print("No completed trades in the selected history")
+        return
+
+    colorize = colorize_positive if stats['total_net'] >= 0 else colorize_negative
+    print(f"Trades: {stats['trades']} | TP: {stats['tp_exits']} | SL: {stats['sl_exits']} | Time: {stats['time_exits']}")
+    print(f"Win Rate: {stats['win_rate']:.2f}% | Profit Factor: {stats['profit_factor']:.2f}")
+    print(f"Expectancy: {colorize(format_currency(stats['expectancy']))} | Total Net: {colorize(format_currency(stats['total_net']))}")
+    print(f"Fees: {format_currency(stats['total_fees'])} | Max Drawdown: {colorize_negative(format_currency(stats['max_drawdown']))}")
+    print(f"Time in Trade: avg {stats['avg_minutes']:.1f} min | max {stats['max_minutes']:.1f} min")
+    print(f"Backtest time: {elapsed * 1000:.1f} ms")
+
+def load_history(symbol, interval, days, use_archive=False):
+    """Load klines for the last `days` days from the kline cache or the memory-mapped archive store"""
+    start_ms = int((time.time() - days * 86400) * 1000)
+    if use_archive:
+        import kline_archive
+        return kline_archive.load_range(f'{symbol}USDT', interval, start_ms)
+
+    conn = kline_cache.connect()
+    try:
+        return Candles.from_rows(kline_cache.load_range(conn, f'{symbol}USDT', interval, start_ms))
+    finally:
+        conn.close()
+
+def main():
+    """Main function to handle command line arguments and run the backtest"""
+    if len(sys.argv) < 5:
+        print("Usage: python backtest.py <token> <tp_pct> <sl_pct> <position_size> [--days N] [--max-bars N] [--short] [--bnb] [--fetch] [--archive]")
+        print("  token: cryptocurrency symbol (e.g., BTC, ETH, SOL)")
+        print("  tp_pct: take profit distance from entry in percent")
+        print("  sl_pct: stop loss distance from entry in percent")
+        print("  position_size: USD size of each trade")
+        print("  --days N: history length in days (default 30)")
+        print("  --max-bars N: close trades at market after N candles")
+        print("  --short: backtest short trades instead of long")
+        print("  --bnb: use BNB discount fee rate")
+        print("  --fetch: backfill missing 1m klines from Binance first")
+        print("  --archive: read history from the kline_archive.py store instead of the kline cache")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    token = sys.argv[1].upper()
+    tp_pct = float(sys.argv[2])
+    sl_pct = float(sys.argv[3])
+    position_size = float(sys.argv[4])
+    days = float(get_flag_value('--days', 30))
+    max_bars = get_flag_value('--max-bars')
+    max_bars = int(max_bars) if max_bars else None
+    is_long = "--short" not in sys.argv
+    use_bnb = "--bnb" in sys.argv
+    use_archive = "--archive" in sys.argv
+
+    if "--fetch" in sys.argv and not use_archive:
+        from trading_strategy import binance, BINANCE_KLINES_PATH
+
+        def fetch(extra_params):
+            response = binance.get(BINANCE_KLINES_PATH, params={'symbol': f'{token}USDT', 'interval': '1m', **extra_params})
+            response.raise_for_status()
+            return response.json()
+
+        start_ms = int((time.time() - days * 86400) * 1000)
+        print(f"Backfilling {token}USDT 1m klines...")
+        added = kline_cache.backfill(f'{token}USDT', '1m', start_ms, fetch)
+        print(f"Stored {added} candles")
+
+    candles = load_history(token, '1m', days, use_archive)
+    if len(candles) < 2:
+        hint = "ingest archives with kline_archive.py" if use_archive else "run with --fetch"
+        print(f"No stored 1m history for {token}USDT, {hint} first")
+        sys.exit(1)
+
+    print(f"{token}USDT: {len(candles)} candles | TP {tp_pct}% | SL {sl_pct}% | {'Long' if is_long else 'Short'}")
+    started = time.perf_counter()
+    _, stats = run_backtest(candles, tp_pct, sl_pct, position_size, is_long=is_long, use_bnb_discount=use_bnb, max_bars=max_bars)
+    print_summary(stats, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
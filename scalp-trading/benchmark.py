@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# benchmark.py
+# Offline benchmarks of the calculation and analysis hot paths against recorded API payloads
+
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+import binance_price_calc
+import kline_cache
+import trading_strategy
+from candles import Candles
+from scalp_calc import calc_profit, calc_profit_grid
+
+# Recorded payloads replayed instead of the live APIs
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_fixtures')
+KLINES_FIXTURE = 'klines_SOLUSDT_1m.json'
+TICKER_FIXTURE = 'ticker_price.json'
+DEPTH_FIXTURE = 'depth_SOLUSDT.json'
+OPENAI_FIXTURE = 'openai_chat_completion.json'
+
+# Stored per-benchmark timings to compare against (machine specific, so kept out of the repo)
+BENCH_BASELINE_PATH = os.getenv('BENCH_BASELINE_PATH', os.path.expanduser('~/.cache/trading-scripts/bench_baseline.json'))
+REGRESSION_TOLERANCE = 0.25
+
+# Input sizes; --quick drops the largest of each
+SCENARIO_SIZES = (1, 100, 10_000)
+CANDLE_SIZES = (10, 1_000, 100_000, 1_000_000)
+# Position sizes priced against one order book snapshot
+DEPTH_SIZES = (1, 1_000, 100_000)
+# Watched positions (two levels each) per alert engine
+ALERT_SIZES = (1_000, 10_000, 100_000)
+# Simulated price paths per Monte Carlo run
+MC_SIZES = (1_000, 10_000, 100_000)
+# 1m candles replayed per sweep task
+SWEEP_TASK_SIZES = (1_000, 10_000, 100_000)
+# Scenarios appended to the trade journal in one transaction
+JOURNAL_SIZES = (1, 100, 10_000)
+# Decoding a million klines as JSON takes ~1 GB, and Binance pages are 1000 rows anyway
+PARSE_SIZES = (10, 1_000, 100_000)
+
+# Each timing repeats the call until it has run for at least this long, best of BENCH_REPEAT
+MIN_RUN_TIME = 0.2
+BENCH_REPEAT = 5
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+        return f.read()
+
+def tile_klines(rows, count):
+    """Repeat recorded kline rows until there are `count`, shifting open/close times so they stay increasing"""
+    span = rows[-1][0] - rows[0][0] + (rows[1][0] - rows[0][0])
+    tiled = []
+    for i in range(count):
+        row = list(rows[i % len(rows)])
+        shift = (i // len(rows)) * span
+        row[0] += shift
+        row[6] += shift
+        tiled.append(row)
+    return tiled
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter answering requests from in-memory payloads keyed by URL path"""
+
+    def __init__(self):
+        super().__init__()
+        self.payloads = {}
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.headers['Content-Type'] = 'application/json'
+        response._content = self.payloads[requests.utils.urlparse(request.url).path]
+        return response
+
+    def close(self):
+        pass
+
+replay = ReplayAdapter()
+
+def install_replay():
+    """Serve Binance and OpenAI calls from the fixtures and keep the kline cache out of the measurement"""
+    for session in (trading_strategy.session, trading_strategy.openai_session, binance_price_calc.price_session):
+        session.mount('https://', replay)
+    kline_cache.KLINE_CACHE_ENABLED = False
+    replay.payloads['/api/v3/ticker/price'] = load_fixture(TICKER_FIXTURE)
+    replay.payloads['/api/v3/depth'] = load_fixture(DEPTH_FIXTURE)
+    replay.payloads['/v1/chat/completions'] = load_fixture(OPENAI_FIXTURE)
+
+def scenario_prices(count):
+    """Deterministic entry/exit prices around the recorded ticker prices"""
+    rng = np.random.default_rng(count)
+    entry = rng.uniform(50, 250, count)
+    exit = entry * (1 + rng.normal(0, 0.01, count))
+    return entry, exit
+
+def fixture_candles(count):
+    rows = tile_klines(json.loads(load_fixture(KLINES_FIXTURE)), count)
+    return Candles.from_klines(rows)
+
+# Registered benchmarks: (name, sizes, setup); setup(size) returns the zero-argument callable to time
+BENCHMARKS = []
+
+def benchmark(name, sizes):
+    def register(setup):
+        BENCHMARKS.append((name, sizes, setup))
+        return setup
+    return register
+
+@benchmark('calc_profit', SCENARIO_SIZES)
+def bench_calc_profit(size):
+    entry, exit = (values.tolist() for values in scenario_prices(size))
+    def run():
+        for e, x in zip(entry, exit):
+            calc_profit(e, x, 1000)
+    return run
+
+@benchmark('calc_profit_grid', SCENARIO_SIZES)
+def bench_calc_profit_grid(size):
+    entry, exit = scenario_prices(size)
+    return lambda: calc_profit_grid(entry, exit, 1000)
+
+@benchmark('watchlist', SCENARIO_SIZES)
+def bench_watchlist(size):
+    symbols = [item['symbol'][:-4] for item in json.loads(load_fixture(TICKER_FIXTURE))]
+    _, exit = scenario_prices(size)
+    rows = [(symbols[i % len(symbols)], float(exit[i]) * 1.01, float(exit[i]) * 0.99, 1000.0) for i in range(size)]
+    def run():
+        prices = binance_price_calc.get_current_prices([row[0] for row in rows])
+        return binance_price_calc.calc_watchlist(rows, prices)
+    return run
+
+@benchmark('normalize_orders', SCENARIO_SIZES)
+def bench_normalize_orders(size):
+    from exchange_rules import SymbolRules, normalize, stack_rules
+
+    entry, exit = scenario_prices(size)
+    # One symbol's rules per row, as batch --snap does
+    rules = stack_rules([SymbolRules('SOLUSDT', 'TRADING', 0.01, 0.01, 1e6, 0.001, 0.001, 9e6, 5.0, 9e6)] * size)
+    return lambda: normalize(rules, entry, np.stack([exit * 1.01, exit * 0.99]), 1000.0)
+
+@benchmark('order_book_slippage', DEPTH_SIZES)
+def bench_order_book_slippage(size):
+    book = binance_price_calc.get_order_book('SOL')
+    sizes = np.random.default_rng(size).uniform(100, 1_000_000, size)
+    return lambda: book.slippage(sizes)
+
+@benchmark('monte_carlo', MC_SIZES)
+def bench_monte_carlo(size):
+    import monte_carlo
+
+    candles = fixture_candles(monte_carlo.MC_HISTORY)
+    entry = float(candles.close[-1])
+    # One process, so timings compare across machines with different core counts
+    return lambda: monte_carlo.estimate(candles, entry, entry * 1.005, entry * 0.995, 1000, paths=size, workers=1, seed=size)
+
+@benchmark('sweep_task', SWEEP_TASK_SIZES)
+def bench_sweep_task(size):
+    import sweep
+
+    # One TP distance against ten SL distances, booked at two sizes with and without BNB
+    sweep._init_worker({})
+    sweep._worker['series']['SOL'] = fixture_candles(size)
+    sl_values = sweep.parse_values('0.2:2:0.2')
+    return lambda: sweep._run_task('SOL', 0.6, sl_values, [500.0, 1000.0], True, 240)
+
+@benchmark('journal_append', JOURNAL_SIZES)
+def bench_journal_append(size):
+    import atexit
+    import shutil
+    import tempfile
+    import trade_journal
+
+    # A fresh journal in a throwaway directory; rows spread over 30 days so the rollup triggers hit many keys
+    directory = tempfile.mkdtemp(prefix='bench-journal-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = os.path.join(directory, 'journal.db')
+    entry, exit = scenario_prices(size)
+    now_ms = int(time.time() * 1000)
+    rows = [trade_journal.scenario_row('bench', 'SOL', float(e), float(x) * 1.01, float(x) * 0.99, 1000.0, 0.2, 9.8, -10.2,
+                                       ts=now_ms - i % 30 * trade_journal.DAY_MS) for i, (e, x) in enumerate(zip(entry, exit))]
+    return lambda: trade_journal.record_rows(rows, path)
+
+@benchmark('price_alerts_tick', ALERT_SIZES)
+def bench_price_alerts_tick(size):
+    from price_alerts import AlertEngine
+
+    # Levels 2-5% away and ticks within 1%, so this times the per-tick search rather than alert output
+    rng = np.random.default_rng(size)
+    rows = [('SOL', 100 * (1 + tp), 100 * (1 - sl), 1000.0) for tp, sl in rng.uniform(0.02, 0.05, (size, 2))]
+    engine = AlertEngine(rows)
+    ticks = (100 * (1 + rng.uniform(-0.01, 0.01, 1000))).tolist()
+    def run():
+        for price in ticks:
+            engine.on_price('SOLUSDT', price)
+    return run
+
+@benchmark('get_candlestick_data', PARSE_SIZES)
+def bench_get_candlestick_data(size):
+    rows = tile_klines(json.loads(load_fixture(KLINES_FIXTURE)), size)
+    payload = json.dumps(rows, separators=(',', ':')).encode()
+    def run():
+        replay.payloads['/api/v3/klines'] = payload
+        candles = trading_strategy.get_candlestick_data('SOL', '1m', size)
+        assert not isinstance(candles, str), candles
+    return run
+
+@benchmark('analyze_candles', CANDLE_SIZES)
+def bench_analyze_candles(size):
+    candles = fixture_candles(size)
+    return lambda: trading_strategy.analyze_candles(candles, '1m')
+
+@benchmark('resample', CANDLE_SIZES)
+def bench_resample(size):
+    import resample
+
+    candles = fixture_candles(size)
+    return lambda: resample.aggregate(candles, '1h')
+
+@benchmark('build_prompt', (len(trading_strategy.TIMEFRAMES),))
+def bench_build_prompt(size):
+    import indicators
+
+    analyses = [indicators.analyze('SOL', interval, fixture_candles(limit)) for interval, limit in trading_strategy.TIMEFRAMES[:size]]
+    return lambda: trading_strategy.build_prompt('SOL', 189.37, 192.4, 187.9, 1000, 189.37, analyses)
+
+@benchmark('signal_score', (len(trading_strategy.TIMEFRAMES),))
+def bench_signal_score(size):
+    import indicators
+    import signal_filter
+
+    analyses = [indicators.analyze('SOL', interval, fixture_candles(limit)) for interval, limit in trading_strategy.TIMEFRAMES[:size]]
+    return lambda: signal_filter.score(189.37, 192.4, 187.9, 1000, analyses)
+
+@benchmark('format_ai_response', (1,))
+def bench_format_ai_response(size):
+    content = json.loads(load_fixture(OPENAI_FIXTURE))['choices'][0]['message']['content']
+    def run():
+        with redirect_stdout(io.StringIO()):
+            for _ in range(size):
+                trading_strategy.format_ai_response(content)
+    return run
+
+def time_call(fn, min_time=MIN_RUN_TIME, repeat=BENCH_REPEAT):
+    """Best per-call time in seconds, auto-scaling the loop count like timeit's autorange"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return best
+
+def peak_allocation(fn):
+    """Peak bytes allocated (Python objects and NumPy buffers) during one call"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_benchmarks(name_filter=None, quick=False):
+    """Run the selected benchmarks, yielding (key, {'seconds', 'items_per_sec', 'peak_bytes'}) as each finishes"""
+    for name, sizes, setup in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+        for size in (sizes[:-1] or sizes) if quick else sizes:
+            fn = setup(size)
+            fn()  # warm-up: imports, engine state, lazy numpy paths
+            seconds = time_call(fn, MIN_RUN_TIME / 4 if quick else MIN_RUN_TIME)
+            yield f'{name}[{size}]', {
+                'seconds': seconds,
+                'items_per_sec': size / seconds,
+                'peak_bytes': peak_allocation(fn),
+            }
+
+def load_baseline(path=None):
+    try:
+        with open(path or BENCH_BASELINE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_baseline(results, path=None):
+    path = path or BENCH_BASELINE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = load_baseline(path)
+    baseline.update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+def record_fixtures():
+    """Replace the fixtures with fresh payloads from the live Binance API"""
+    from binance_price_calc import BINANCE_DEPTH_PATH, DEPTH_LIMIT
+    from trading_strategy import binance, BINANCE_KLINES_PATH, BINANCE_PRICE_PATH
+
+    klines = binance.get(BINANCE_KLINES_PATH, params={'symbol': 'SOLUSDT', 'interval': '1m', 'limit': 1000})
+    klines.raise_for_status()
+    symbols = [item['symbol'] for item in json.loads(load_fixture(TICKER_FIXTURE))]
+    ticker = binance.get(BINANCE_PRICE_PATH, params={'symbols': json.dumps(symbols, separators=(',', ':'))})
+    ticker.raise_for_status()
+    depth = binance.get(BINANCE_DEPTH_PATH, params={'symbol': 'SOLUSDT', 'limit': DEPTH_LIMIT})
+    depth.raise_for_status()
+    for name, response in ((KLINES_FIXTURE, klines), (TICKER_FIXTURE, ticker), (DEPTH_FIXTURE, depth)):
+        with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+            f.write(response.content)
+        print(f"Recorded {name} ({len(response.content)} bytes)")
+
+def main():
+    """Main function to run benchmarks and compare them with the stored baseline"""
+    if "--help" in sys.argv or "-h" in sys.argv:
+        print("Usage: python benchmark.py [--quick] [--filter name] [--save] [--compare] [--tolerance PCT] [--record]")
+        print("  --quick: skip the largest size of each benchmark and time shorter runs")
+        print("  --filter name: only run benchmarks whose name contains this text")
+        print("  --save: store the results as the new baseline")
+        print("  --compare: exit with status 1 if any benchmark is slower than the baseline by more than the tolerance")
+        print("  --tolerance PCT: allowed slowdown in percent (default 25)")
+        print("  --record: refresh the Binance fixtures from the live API and exit")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    if "--record" in sys.argv:
+        record_fixtures()
+        return
+
+    tolerance = float(get_flag_value('--tolerance', REGRESSION_TOLERANCE * 100)) / 100
+    baseline = load_baseline()
+    install_replay()
+
+    print(f"{'benchmark':<28} {'per call':>10} {'throughput':>14} {'peak alloc':>11} {'vs baseline':>12}")
+    results = {}
+    regressions = []
+    for key, result in run_benchmarks(get_flag_value('--filter'), quick="--quick" in sys.argv):
+        results[key] = result
+        change = ""
+        if key in baseline:
+            ratio = result['seconds'] / baseline[key]['seconds'] - 1
+            change = f"{ratio * 100:+.1f}%"
+            if ratio > tolerance:
+                regressions.append(key)
+                change += " !"
+        print(f"{key:<28} {format_seconds(result['seconds']):>10} {result['items_per_sec']:>10.4g} it/s "
+              f"{format_bytes(result['peak_bytes']):>11} {change:>12}", flush=True)
+
+    if "--save" in sys.argv:
+        save_baseline(results)
+        print(f"Saved baseline to {BENCH_BASELINE_PATH}")
+
+    if regressions:
+        print(f"Slower than baseline by more than {tolerance * 100:.0f}%: {', '.join(regressions)}")
+        if "--compare" in sys.argv:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
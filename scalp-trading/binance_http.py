@@ -0,0 +1,267 @@
+# binance_http.py
+# Resilient Binance REST client: timeouts, jittered retries, per-host circuit breakers and hedged requests
+
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+import profiler
+
+# REST hosts in order of preference (comma separated, a scheme may be given for local stand-ins)
+BINANCE_API_HOSTS = [host.strip() for host in os.getenv(
+    'BINANCE_API_HOSTS',
+    'api.binance.com,api1.binance.com,api2.binance.com,api3.binance.com,api4.binance.com').split(',') if host.strip()]
+
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = float(os.getenv('BINANCE_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('BINANCE_READ_TIMEOUT', 10))
+
+# Attempts per call (not counting the hedge) and full-jitter exponential backoff between them
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+
+# A host failing this many times in a row is skipped for the cooldown, then gets one trial request
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30.0
+
+# A second host is asked when the first has not answered within the p95 of recent latencies;
+# until enough samples exist the default delay is used
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = 0.5
+HEDGE_MIN_DELAY = 0.05
+LATENCY_WINDOW = 200
+
+# Rate-limit answers (429, or 418 once the IP is banned) hold every host until Retry-After, since
+# Binance limits per IP; calls wait out a hold of at most this many seconds and fail on longer ones
+RATE_LIMIT_STATUSES = (418, 429)
+RATE_LIMIT_MAX_WAIT = 5.0
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Every Binance host is failing and cooling down"""
+
+def base_url(host):
+    return host.rstrip('/') if '://' in host else f"https://{host}"
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+def retry_after(response):
+    """Seconds from a Retry-After header, or None"""
+    value = response.headers.get('Retry-After', '')
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+def is_failure(result):
+    """Connection errors, timeouts, 5xx and rate-limit answers count against a host's breaker"""
+    if isinstance(result, BaseException):
+        return isinstance(result, requests.exceptions.RequestException)
+    return result.status_code >= 500 or result.status_code in RATE_LIMIT_STATUSES
+
+def is_retryable(result):
+    """
+    Failures worth another attempt: all but rate limits whose Retry-After is
+    missing or longer than RATE_LIMIT_MAX_WAIT. Other 4xx are returned as-is.
+    """
+    if not is_failure(result):
+        return False
+    if isinstance(result, BaseException) or result.status_code not in RATE_LIMIT_STATUSES:
+        return True
+    wait = retry_after(result)
+    return wait is not None and wait <= RATE_LIMIT_MAX_WAIT
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open for `cooldown` -> half-open trial -> closed"""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = None
+        self.trial = False
+
+    def allow(self, now):
+        if self.open_until is None:
+            return True
+        if now >= self.open_until and not self.trial:
+            self.trial = True  # half-open: let one request through
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.open_until = None
+        self.trial = False
+
+    def failure(self, now, hold=None):
+        """Count a failure; `hold` (e.g. a Retry-After) opens the breaker for that long right away"""
+        self.failures += 1
+        if hold is not None:
+            self.open_until = max(self.open_until or now, now + hold)
+            self.trial = False
+        elif self.trial or self.failures >= self.threshold:
+            self.open_until = now + self.cooldown
+            self.trial = False
+
+class ResilientClient:
+    """
+    GET-only client spreading Binance market data calls over equivalent hosts.
+
+    Each call runs on the first healthy host. If that host has not answered
+    within the recent p95 latency, the same request also goes to the next
+    healthy host and the first good answer wins. Failed attempts are retried
+    on the following hosts with jittered backoff. Every attempt has connect
+    and read timeouts.
+    """
+
+    def __init__(self, session, hosts=None, max_attempts=MAX_ATTEMPTS, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.session = session
+        self.hosts = list(hosts or BINANCE_API_HOSTS)
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.breakers = {host: CircuitBreaker() for host in self.hosts}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.rate_limited_until = 0.0
+        self.lock = threading.Lock()
+
+    def base_urls(self):
+        return [base_url(host) for host in self.hosts]
+
+    def hedge_delay(self):
+        with self.lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return HEDGE_DEFAULT_DELAY
+            ordered = sorted(self.latencies)
+        return max(ordered[int(HEDGE_QUANTILE * (len(ordered) - 1))], HEDGE_MIN_DELAY)
+
+    def rate_limit_wait(self):
+        """Seconds left of the client-wide Retry-After hold (0 when not rate limited)"""
+        with self.lock:
+            return max(self.rate_limited_until - time.monotonic(), 0.0)
+
+    def _wait_rate_limit(self):
+        """Sleep through a short rate-limit hold; raise CircuitOpenError while a longer one lasts"""
+        wait = self.rate_limit_wait()
+        if wait > RATE_LIMIT_MAX_WAIT:
+            raise CircuitOpenError(f"Binance rate limit in force, retrying after {wait:.0f}s")
+        if wait:
+            time.sleep(wait)
+
+    def _pick_host(self, exclude):
+        """Next host whose breaker lets a request through, preferring ones not already tried"""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.rate_limited_until:
+                return None
+            for candidates in ([h for h in self.hosts if h not in exclude], self.hosts):
+                for host in candidates:
+                    if self.breakers[host].allow(now):
+                        return host
+        return None
+
+    def _attempt(self, host, path, params, headers, results, span_args):
+        started = time.monotonic()
+        try:
+            with profiler.attached(span_args):
+                result = self.session.get(base_url(host) + path, params=params, headers=headers, timeout=self.timeout)
+        except BaseException as e:
+            result = e
+        results.put((host, result, time.monotonic() - started))
+
+    def _launch(self, host, path, params, headers, results, span_args):
+        # Daemon threads: a hedge that lost the race never delays interpreter exit
+        threading.Thread(target=self._attempt, args=(host, path, params, headers, results, span_args), daemon=True).start()
+
+    def _record(self, host, result, latency):
+        with self.lock:
+            if is_failure(result):
+                rate_limited = not isinstance(result, BaseException) and result.status_code in RATE_LIMIT_STATUSES
+                hold = (retry_after(result) or 0.0) if rate_limited else None
+                now = time.monotonic()
+                self.breakers[host].failure(now, hold)
+                if rate_limited:
+                    # The limit is per IP: no host, hedge or retry may go out before it ends
+                    self.rate_limited_until = max(self.rate_limited_until, now + hold)
+            else:
+                self.breakers[host].success()
+                # Only successful answers set the hedge delay; errors are often much faster or slower
+                if 200 <= result.status_code < 300:
+                    self.latencies.append(latency)
+
+    def get(self, path, params=None, headers=None):
+        """
+        GET `path` (e.g. '/api/v3/klines') and return the response. 4xx answers
+        are returned as-is, except 429/418 with a short Retry-After, which are
+        retried after that wait. After the last attempt a 5xx or rate-limit
+        answer is returned and a connection error or timeout is raised. While
+        a rate-limit hold lasts, nothing is sent: short holds are waited out,
+        longer ones raise CircuitOpenError.
+        """
+        results = queue.Queue()
+        span_args = profiler.current_span()
+        tried = []
+        self._wait_rate_limit()
+        host = self._pick_host(tried)
+        if host is None:
+            if self.rate_limit_wait():
+                raise CircuitOpenError(f"Binance rate limit in force, retrying after {self.rate_limit_wait():.0f}s")
+            raise CircuitOpenError(f"All Binance hosts failing, retrying after {BREAKER_COOLDOWN:.0f}s cooldown")
+
+        self._launch(host, path, params, headers, results, span_args)
+        tried.append(host)
+        attempts, pending, hedged = 1, 1, False
+        hedge_at = time.monotonic() + self.hedge_delay()
+        last = None
+
+        while pending:
+            wait = None if hedged else max(hedge_at - time.monotonic(), 0)
+            try:
+                host, result, latency = results.get(timeout=wait)
+            except queue.Empty:
+                hedged = True
+                # No hedge while rate limited (_pick_host returns None then)
+                hedge_host = self._pick_host(tried)
+                if hedge_host is not None and hedge_host not in tried:
+                    self._launch(hedge_host, path, params, headers, results, span_args)
+                    tried.append(hedge_host)
+                    pending += 1
+                    profiler.annotate(hedged=1)
+                continue
+
+            pending -= 1
+            self._record(host, result, latency)
+            if not is_retryable(result):
+                if isinstance(result, BaseException):
+                    raise result
+                return result
+            last = result
+            if pending or attempts >= self.max_attempts:
+                continue
+
+            # Rate limits are per IP, so the retry waits out the client-wide hold on any host
+            wait = max(backoff_delay(attempts), self.rate_limit_wait())
+            if wait > RATE_LIMIT_MAX_WAIT:
+                break
+            time.sleep(wait)
+            retry_host = self._pick_host(tried[-1:])
+            if retry_host is None:
+                break
+            self._launch(retry_host, path, params, headers, results, span_args)
+            tried.append(retry_host)
+            attempts += 1
+            pending += 1
+            hedge_at = time.monotonic() + self.hedge_delay()
+            profiler.annotate(retries=1)
+
+        if isinstance(last, BaseException):
+            raise last
+        return last
@@ -3,8 +3,14 @@
 # Fetch current price from Binance as entry price and calculate take profit/stop loss scenarios
 
 import os, sys
+import csv
+import json
 import requests
-from scalp_calc import calc_profit, format_currency
+import binance_http
+import profiler
+import trade_journal
+from order_book import OrderBook
+from scalp_calc import calc_profit, calc_profit_grid, format_currency, print_grid
 
 RESET = "\033[0m"
 
@@ -31,13 +37,22 @@ def colorize_negative(s):
     # fallback to bright ANSI
     return f"{BOLD}\033[91m{s}{RESET}"
 
-# Binance API endpoint for price
-BINANCE_PRICE_URL = "https://api.binance.com/api/v3/ticker/price"
+# Binance API endpoints for price and order book depth (hosts come from binance_http.BINANCE_API_HOSTS)
+BINANCE_PRICE_PATH = "/api/v3/ticker/price"
+BINANCE_DEPTH_PATH = "/api/v3/depth"
+
+# Levels per side in a depth snapshot (request weight: 100 -> 5, 500 -> 25, 1000 -> 50, 5000 -> 250)
+DEPTH_LIMIT = 1000
+
+# Keep-alive session, reused across calls when running inside scalp_daemon.py
+price_session = profiler.instrument(requests.Session())
+binance = binance_http.ResilientClient(price_session)
 
 def get_current_price(symbol):
     """Fetch current price from Binance API"""
     try:
-        response = requests.get(f"{BINANCE_PRICE_URL}?symbol={symbol}USDT")
+        with profiler.span('binance.price', symbol=symbol):
+            response = binance.get(BINANCE_PRICE_PATH, params={'symbol': f'{symbol}USDT'})
         response.raise_for_status()
         data = response.json()
         return float(data['price'])
@@ -48,21 +63,326 @@ def get_current_price(symbol):
         print(f"Error parsing response: {e}")
         sys.exit(1)
 
-def print_scenario(title, result):
-    """Print a concise scenario result with colors"""
+def get_order_book(symbol, limit=DEPTH_LIMIT, client=None):
+    """Fetch one order book snapshot from Binance API (optionally through another client)"""
+    http = client or binance
+    try:
+        with profiler.span('binance.depth', symbol=symbol, limit=limit):
+            response = http.get(BINANCE_DEPTH_PATH, params={'symbol': f'{symbol}USDT', 'limit': limit})
+        response.raise_for_status()
+        return OrderBook.from_depth(response.json())
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching order book from Binance: {e}")
+        sys.exit(1)
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"Error parsing response: {e}")
+        sys.exit(1)
+
+def depth_slippage(symbol, position_size, limit=DEPTH_LIMIT, client=None, side='long'):
+    """
+    Fetch a depth snapshot and estimate the (entry, exit) slippage of a position_size long (or short).
+    Returns (book, slippage); slippage is None when the snapshot is too thin for the size.
+    """
+    import math
+
+    book = get_order_book(symbol, limit, client)
+    entry_slippage, exit_slippage = (float(v) for v in book.slippage(position_size, side))
+    if math.isnan(entry_slippage) or math.isnan(exit_slippage):
+        print(f"⚠️  {format_currency(position_size)} is deeper than the {limit}-level order book, slippage not included")
+        return book, None
+    print(f"Slippage estimate: {entry_slippage * 100:.3f}% entry / {exit_slippage * 100:.3f}% exit "
+          f"from mid ${book.mid:.4f} ({limit} levels)")
+    return book, (entry_slippage, exit_slippage)
+
+def get_symbol_rules(symbol, client=None):
+    """Tick/lot/notional rules of {symbol}USDT from the local exchangeInfo store (optionally refreshed through another client)"""
+    from exchange_rules import rules_store
+
+    try:
+        with profiler.span('binance.rules', symbol=symbol):
+            rules = rules_store.get(f'{symbol}USDT', client or binance)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching exchange info from Binance: {e}")
+        sys.exit(1)
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"Error parsing response: {e}")
+        sys.exit(1)
+    if rules is None:
+        print(f"{symbol}USDT is not listed on Binance")
+        sys.exit(1)
+    return rules
+
+def snap_order(rules, entry_price, take_profit_price, stop_loss_price, position_size):
+    """
+    Snap one order to the symbol's tick and lot sizes, printing the adjusted
+    values and any filter the order would still fail.
+    Returns (entry, take_profit, stop_loss, position_size).
+    """
+    from exchange_rules import describe_problems, normalize
+
+    order = normalize(rules, entry_price, [take_profit_price, stop_loss_price], position_size)
+    entry, take_profit, stop_loss = float(order['entry'][0]), *(float(v) for v in order['exit'])
+    quantity, cost = float(order['quantity'][0]), float(order['position_size'][0])
+    print(f"Snapped to tick {rules.tick_size:g} / lot {rules.step_size:g}: entry ${entry:.4f} | TP ${take_profit:.4f} | "
+          f"SL ${stop_loss:.4f} | {quantity:g} {rules.symbol[:-4]} = {format_currency(cost)}")
+    problems = int(order['problems'][0] | order['problems'][1])
+    if problems:
+        print(f"⚠️  {rules.symbol} would reject this order: {describe_problems(problems)}")
+    return entry, take_profit, stop_loss, cost
+
+# Above this many symbols, fetching the full ticker list is cheaper than a symbols=[...] filter
+MAX_SYMBOLS_PER_PRICE_REQUEST = 100
+
+def get_current_prices(symbols, client=None):
+    """Fetch current prices for many symbols with a single Binance request (optionally through another client)"""
+    http = client or binance
+    pairs = sorted({f"{symbol}USDT" for symbol in symbols})
+    try:
+        with profiler.span('binance.prices', symbols=len(pairs)):
+            response = None
+            if len(pairs) <= MAX_SYMBOLS_PER_PRICE_REQUEST:
+                response = http.get(BINANCE_PRICE_PATH, params={'symbols': json.dumps(pairs, separators=(',', ':'))})
+                # Binance rejects the whole filter if any symbol is unknown, fall back to the full list
+                if response.status_code == 400:
+                    response = None
+            if response is None:
+                response = http.get(BINANCE_PRICE_PATH)
+        response.raise_for_status()
+        prices = {item['symbol']: float(item['price']) for item in response.json()}
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching prices from Binance: {e}")
+        sys.exit(1)
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"Error parsing response: {e}")
+        sys.exit(1)
+
+    return {symbol: prices[f"{symbol}USDT"] for symbol in symbols if f"{symbol}USDT" in prices}
+
+def read_watchlist(lines):
+    """Parse token,tp,sl,size rows, skipping blanks, comments and a header row"""
+    rows = []
+    for line_no, row in enumerate(csv.reader(lines), start=1):
+        if not row or not row[0].strip() or row[0].strip().startswith('#'):
+            continue
+        if row[0].strip().lower() == 'token':
+            continue
+        try:
+            token, tp, sl, size = (field.strip() for field in row[:4])
+            rows.append((token.upper(), float(tp), float(sl), float(size)))
+        except ValueError:
+            print(f"Skipping invalid watchlist line {line_no}: {','.join(row)}", file=sys.stderr)
+    return rows
+
+# Batch output columns, in order
+BATCH_FIELDS = ('token', 'entry', 'take_profit', 'stop_loss', 'position_size',
+                'tp_change', 'tp_net', 'sl_change', 'sl_net', 'fees', 'risk_reward')
+
+def calc_watchlist(rows, prices, use_bnb=False, rules=None):
+    """
+    Compute TP/SL scenarios for every watchlist row in one vectorized pass.
+    With a {token: SymbolRules} map, all rows are first snapped to their
+    symbol's tick and lot sizes, and rows the exchange would reject are skipped.
+    """
+    import numpy as np
+
+    rows = [row for row in rows if row[0] in prices and (rules is None or row[0] in rules)]
+    if not rows:
+        return []
+
+    tokens = [row[0] for row in rows]
+    take_profit, stop_loss, position_size = (np.array(col, dtype=np.float64) for col in list(zip(*rows))[1:])
+    entry = np.array([prices[token] for token in tokens])
+
+    if rules is not None:
+        from exchange_rules import describe_problems, normalize, stack_rules
+
+        order = normalize(stack_rules([rules[token] for token in tokens]), entry, np.stack([take_profit, stop_loss]), position_size)
+        entry, position_size = order['entry'][0], order['position_size'][0]
+        take_profit, stop_loss = order['exit']
+        problems = order['problems'][0] | order['problems'][1]
+        for i in np.flatnonzero(problems):
+            print(f"{tokens[i]} {format_currency(position_size[i])} position would be rejected ({describe_problems(problems[i])}), skipping",
+                  file=sys.stderr)
+        keep = problems == 0
+        tokens = [token for token, ok in zip(tokens, keep) if ok]
+        entry, take_profit, stop_loss, position_size = entry[keep], take_profit[keep], stop_loss[keep], position_size[keep]
+
+    profit = calc_profit_grid(entry, take_profit, position_size, use_bnb_discount=use_bnb)
+    loss = calc_profit_grid(entry, stop_loss, position_size, use_bnb_discount=use_bnb)
+
+    risk = np.abs(stop_loss - entry)
+    reward = np.abs(take_profit - entry)
+    risk_reward = np.divide(reward, risk, out=np.zeros_like(reward), where=risk > 0)
+
+    columns = (tokens, entry.tolist(), take_profit.tolist(), stop_loss.tolist(), position_size.tolist(),
+               profit['price_change'].tolist(), profit['net_amount'].tolist(),
+               loss['price_change'].tolist(), loss['net_amount'].tolist(),
+               profit['fees'].tolist(), np.round(risk_reward, 2).tolist())
+    return [dict(zip(BATCH_FIELDS, values)) for values in zip(*columns)]
+
+def print_watchlist(results, output_format='table'):
+    """Print batch results as a colored table, CSV or JSON lines"""
+    if output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=BATCH_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+        return
+    if output_format == 'jsonl':
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'TOKEN':<8} {'ENTRY':>12} {'TP':>12} {'SL':>12} {'SIZE':>11} {'TP %':>7} {'TP NET':>11} {'SL %':>7} {'SL NET':>11} {'R:R':>5}")
+    for r in results:
+        tp_net = f"{format_currency(r['tp_net']):>11}"
+        sl_net = f"{format_currency(r['sl_net']):>11}"
+        tp_net = colorize_positive(tp_net) if r['tp_net'] >= 0 else colorize_negative(tp_net)
+        sl_net = colorize_positive(sl_net) if r['sl_net'] >= 0 else colorize_negative(sl_net)
+        print(f"{r['token']:<8} {r['entry']:>12.4f} {r['take_profit']:>12.4f} {r['stop_loss']:>12.4f} "
+              f"{format_currency(r['position_size']):>11} {r['tp_change']:>6.2f}% {tp_net} {r['sl_change']:>6.2f}% {sl_net} {r['risk_reward']:>5.2f}")
+
+def get_flag_value(name, default=None):
+    """Return the argument following a command line flag, or default"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith('--'):
+            return sys.argv[index + 1]
+    return default
+
+def run_batch():
+    """Evaluate a whole watchlist with one price request"""
+    source = get_flag_value('--batch', '-')
+    sort_field = get_flag_value('--sort')
+    output_format = get_flag_value('--format', 'table')
+    use_bnb = "--bnb" in sys.argv
+
+    if sort_field and sort_field not in BATCH_FIELDS:
+        print(f"Unknown sort field '{sort_field}', choose from: {', '.join(BATCH_FIELDS)}")
+        sys.exit(1)
+    if output_format not in ('table', 'csv', 'jsonl'):
+        print(f"Unknown format '{output_format}', choose from: table, csv, jsonl")
+        sys.exit(1)
+
+    with profiler.span('watchlist.read'):
+        if source == '-':
+            rows = read_watchlist(sys.stdin)
+        else:
+            with open(source, newline='') as f:
+                rows = read_watchlist(f)
+
+    prices = get_current_prices([row[0] for row in rows])
+    for token in sorted({row[0] for row in rows} - prices.keys()):
+        print(f"No Binance price for {token}USDT, skipping", file=sys.stderr)
+
+    rules = None
+    if "--snap" in sys.argv:
+        from exchange_rules import rules_store
+
+        with profiler.span('binance.rules', symbols=len(prices)):
+            try:
+                rules = {token: rules_store.get(f'{token}USDT', binance) for token in prices}
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching exchange info from Binance: {e}")
+                sys.exit(1)
+        for token in sorted(token for token, symbol_rules in rules.items() if symbol_rules is None):
+            print(f"No Binance trading rules for {token}USDT, skipping", file=sys.stderr)
+        rules = {token: symbol_rules for token, symbol_rules in rules.items() if symbol_rules is not None}
+
+    with profiler.span('watchlist.calc', rows=len(rows)):
+        results = calc_watchlist(rows, prices, use_bnb=use_bnb, rules=rules)
+        if sort_field:
+            results.sort(key=lambda r: r[sort_field], reverse=sort_field != 'token')
+
+    with profiler.span('watchlist.print'):
+        print_watchlist(results, output_format)
+
+    if trade_journal.requested():
+        journaled = trade_journal.record_rows([
+            trade_journal.scenario_row('batch', r['token'], r['entry'], r['take_profit'], r['stop_loss'], r['position_size'],
+                                       r['fees'], r['tp_net'], r['sl_net'])
+            for r in results
+        ])
+        if journaled is not None:
+            print(f"📒 Journaled {len(results)} scenarios", file=sys.stderr)
+
+def format_scenario(title, result):
+    """Format a concise scenario result with colors"""
+    values = f"{result['price_change']:>6.2f}% | Net: {format_currency(result['net_amount'])}"
+    if 'slippage' in result:
+        values += f" | Fees: {format_currency(result['fees'])} | Slippage: {format_currency(result['slippage'])}"
     if result['net_amount'] >= 0:
         colorized_title = colorize_positive(title)
-        colorized_values = colorize_positive(f"{result['price_change']:>6.2f}% | Net: {format_currency(result['net_amount'])}")
+        colorized_values = colorize_positive(values)
     else:
         colorized_title = colorize_negative(title)
-        colorized_values = colorize_negative(f"{result['price_change']:>6.2f}% | Net: {format_currency(result['net_amount'])}")
+        colorized_values = colorize_negative(values)
+
+    return f"{colorized_title:<12}: {colorized_values}"
+
+def print_scenario(title, result):
+    """Print a concise scenario result with colors"""
+    print(format_scenario(title, result))
+
+def run_stream(token, entry_price, take_profit_price, stop_loss_price, position_size, use_bnb=False, use_book=False, record_path=None,
+               slippage=None):
+    """
+    Redraw the TAKE PROFIT / STOP LOSS lines in place on every streamed price change.
+
+    Without a fixed entry_price the live price is used as entry; with one, an
+    UNREALIZED line shows the P&L of closing at the live price. A slippage
+    estimate from one depth snapshot is applied to every redraw.
+    """
+    import asyncio
+    from price_stream import stream_url, watch_price
+
+    in_place = sys.stdout.isatty()
+    lines_shown = 0
+
+    def render(price):
+        nonlocal lines_shown
+        entry = entry_price if entry_price is not None else price
+        lines = [
+            f"{token}USDT-CURR: ${price:.4f}",
+            format_scenario("TAKE PROFIT", calc_profit(entry, take_profit_price, position_size, use_bnb_discount=use_bnb, leverage=1,
+                                                       slippage=slippage)),
+            format_scenario("STOP LOSS  ", calc_profit(entry, stop_loss_price, position_size, use_bnb_discount=use_bnb, leverage=1,
+                                                       slippage=slippage)),
+        ]
+        if entry_price is not None:
+            lines.append(format_scenario("UNREALIZED ", calc_profit(entry_price, price, position_size, use_bnb_discount=use_bnb, leverage=1)))
 
-    print(f"{colorized_title:<12}: {colorized_values}")
+        if in_place:
+            # Move back to the first line of the previous frame and overwrite it
+            if lines_shown:
+                sys.stdout.write(f"\033[{lines_shown}F")
+            sys.stdout.write("".join(f"\033[2K{line}\n" for line in lines))
+        else:
+            sys.stdout.write("\n".join(lines) + "\n\n")
+        sys.stdout.flush()
+        lines_shown = len(lines)
+
+    url = stream_url(token, 'bookTicker' if use_book else 'trade')
+    record = open(record_path, 'a') if record_path else None
+    try:
+        asyncio.run(watch_price(url, render, record=record))
+        print("Stream closed by server")
+    except KeyboardInterrupt:
+        print()
+    except Exception as e:
+        print(f"Error streaming price from Binance: {e}")
+        sys.exit(1)
+    finally:
+        if record:
+            record.close()
 
 def main():
     """Main function to handle command line arguments and calculations"""
+    if "--batch" in sys.argv:
+        run_batch()
+        return
+
     if len(sys.argv) < 5:
-        print("Usage: python binance_price_calc.py <token> <take_profit_price> <stop_loss_price> <position_size> [--bnb] [--live] [--manual]")
+        print("Usage: python binance_price_calc.py <token> <take_profit_price> <stop_loss_price> <position_size> [--bnb] [--live] [--manual] [--grid] [--depth [levels]] [--snap] [--stream] [--journal] [--profile [file]]")
         print("  token: cryptocurrency symbol (e.g., BTC, ETH, SOL)")
         print("  take_profit_price: take profit exit price")
         print("  stop_loss_price: stop loss exit price")
@@ -70,6 +390,18 @@ def main():
         print("  --bnb: use BNB discount fee rate (optional)")
         print("  --live: explicitly use live Binance price as entry")
         print("  --manual: manually enter entry price")
+        print("  --grid: print net P&L heatmap of exit prices x position sizes")
+        print(f"  --depth [levels]: include slippage estimated from an order book snapshot (default {DEPTH_LIMIT} levels)")
+        print("  --snap: round prices to the symbol's tick size and the quantity to its lot size first")
+        print("  --stream: live-update TP/SL lines from the WebSocket trade stream")
+        print("    --book: use the bookTicker mid price instead of trades")
+        print("    --record <file>: append raw stream messages for ws_replay_server.py")
+        print("  --journal: record the scenario in the trade journal (see trade_journal.py)")
+        print("  --profile [file]: print per-phase timings and write a Chrome trace (default scalp-trace.json)")
+        print()
+        print("Batch mode: python binance_price_calc.py --batch [file|-] [--sort field] [--format table|csv|jsonl] [--bnb] [--snap] [--journal]")
+        print("  reads token,tp,sl,size rows from a file or stdin and prices them with one request")
+        print("  --snap: snap every row to its symbol's tick/lot sizes and skip rows Binance would reject")
         sys.exit(1)
 
     token = sys.argv[1].upper()
@@ -79,6 +411,20 @@ def main():
     use_bnb = "--bnb" in sys.argv
     use_live_price = "--live" in sys.argv
     use_manual_entry = "--manual" in sys.argv
+    use_grid = "--grid" in sys.argv
+    use_stream = "--stream" in sys.argv
+    use_depth = "--depth" in sys.argv
+    depth_limit = int(get_flag_value('--depth', DEPTH_LIMIT))
+
+    if use_stream:
+        entry_price = None
+        if use_manual_entry:
+            print("Enter entry price: ", end="")
+            entry_price = float(input())
+        slippage = depth_slippage(token, position_size, depth_limit)[1] if use_depth else None
+        run_stream(token, entry_price, take_profit_price, stop_loss_price, position_size, use_bnb=use_bnb,
+                   use_book="--book" in sys.argv, record_path=get_flag_value('--record'), slippage=slippage)
+        return
 
     # Get entry price
     if use_live_price:
@@ -92,13 +438,33 @@ def main():
         entry_price = get_current_price(token)
         print(f"{token}USDT-CURR: ${entry_price:.4f}")
 
+    rules = get_symbol_rules(token) if "--snap" in sys.argv else None
+    if rules is not None:
+        entry_price, take_profit_price, stop_loss_price, position_size = snap_order(
+            rules, entry_price, take_profit_price, stop_loss_price, position_size)
+
+    # One depth snapshot prices the slippage of every scenario (and grid size)
+    book, slippage = depth_slippage(token, position_size, depth_limit) if use_depth else (None, None)
+
     # Calculate profit scenarios
-    profit_result = calc_profit(entry_price, take_profit_price, position_size, use_bnb_discount=use_bnb, leverage=1)
-    loss_result = calc_profit(entry_price, stop_loss_price, position_size, use_bnb_discount=use_bnb, leverage=1)
+    profit_result = calc_profit(entry_price, take_profit_price, position_size, use_bnb_discount=use_bnb, leverage=1, slippage=slippage)
+    loss_result = calc_profit(entry_price, stop_loss_price, position_size, use_bnb_discount=use_bnb, leverage=1, slippage=slippage)
 
     # Print both scenarios
     print_scenario("TAKE PROFIT", profit_result)
     print_scenario("STOP LOSS  ", loss_result)
 
+    if trade_journal.requested():
+        scenario_id = trade_journal.record('calc', token, entry_price, take_profit_price, stop_loss_price, position_size,
+                                           profit_result, loss_result)
+        if scenario_id is not None:
+            print(f"📒 Journaled as #{scenario_id}")
+
+    if use_grid:
+        print()
+        print_grid(entry_price, take_profit_price, stop_loss_price, position_size, use_bnb_discount=use_bnb, book=book,
+                   rules=rules)
+
 if __name__ == "__main__":
-    main()
+    with profiler.profiled('binance_price_calc'):
+        main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# binance_stub_server.py
+# Local stand-in for the Binance REST API with synthetic prices and injectable delays and errors
+
+import json
+import math
+import random
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from kline_cache import INTERVAL_MS
+
+# Stalled requests sleep this long, well past the client read timeout
+STALL_SECONDS = 60
+
+def synthetic_price(symbol, ms):
+    """Deterministic smooth price path per symbol, so repeated calls agree"""
+    base = 10 + zlib.crc32(symbol.encode()) % 200
+    return base * (1 + 0.03 * math.sin(ms / 3.6e6) + 0.005 * math.sin(ms / 1.7e5))
+
+def synthetic_kline(symbol, interval, open_time):
+    step = INTERVAL_MS[interval]
+    open_price = synthetic_price(symbol, open_time)
+    close_price = synthetic_price(symbol, open_time + step - 1)
+    high = max(open_price, close_price) * 1.001
+    low = min(open_price, close_price) * 0.999
+    return [open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close_price:.8f}", "1000.00000000",
+            open_time + step - 1, f"{1000 * close_price:.8f}", 100, "500.00000000", f"{500 * close_price:.8f}", "0"]
+
+def klines_body(params, now_ms):
+    symbol, interval = params['symbol'], params['interval']
+    step = INTERVAL_MS[interval]
+    limit = min(int(params.get('limit', 500)), 1000)
+    if 'startTime' in params:
+        first = -(-int(params['startTime']) // step) * step
+        end = min(int(params.get('endTime', now_ms)), now_ms)
+        open_times = list(range(first, end + 1, step))[:limit]
+    else:
+        last = min(int(params.get('endTime', now_ms)), now_ms) // step * step
+        open_times = [last - i * step for i in range(limit)][::-1]
+    return [synthetic_kline(symbol, interval, t) for t in open_times]
+
+def ticker_body(params, now_ms):
+    if 'symbol' in params:
+        return {'symbol': params['symbol'], 'price': f"{synthetic_price(params['symbol'], now_ms):.8f}"}
+    symbols = json.loads(params['symbols']) if 'symbols' in params else ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT']
+    return [{'symbol': s, 'price': f"{synthetic_price(s, now_ms):.8f}"} for s in symbols]
+
+# Synthetic book: levels one tick (in basis points) apart, each holding more size the further out it is
+DEPTH_TICK_BPS = 1
+DEPTH_LEVEL_QUOTE = 2000
+
+def depth_body(params, now_ms):
+    symbol = params['symbol']
+    limit = min(int(params.get('limit', 100)), 5000)
+    price = synthetic_price(symbol, now_ms)
+    levels = [(k + 0.5) * DEPTH_TICK_BPS / 1e4 for k in range(limit)]
+    quantities = [DEPTH_LEVEL_QUOTE * (1 + k / 10) / price for k in range(limit)]
+    return {'lastUpdateId': now_ms,
+            'bids': [[f"{price * (1 - d):.8f}", f"{q:.8f}"] for d, q in zip(levels, quantities)],
+            'asks': [[f"{price * (1 + d):.8f}", f"{q:.8f}"] for d, q in zip(levels, quantities)]}
+
+# Symbols listed by /api/v3/exchangeInfo and the ETag of that (static) payload
+EXCHANGE_INFO_SYMBOLS = ('BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'DOGE', 'ADA', 'AVAX')
+EXCHANGE_INFO_ETAG = '"stub-exchange-info-1"'
+
+def exchange_info_body():
+    symbols = []
+    for token in EXCHANGE_INFO_SYMBOLS:
+        price = synthetic_price(f"{token}USDT", 0)
+        # About five significant digits of price, like real listings
+        tick = 10 ** (math.floor(math.log10(price)) - 4)
+        step = 0.001
+        symbols.append({
+            'symbol': f"{token}USDT", 'status': 'TRADING', 'baseAsset': token, 'quoteAsset': 'USDT',
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': f"{tick:.8f}", 'maxPrice': "1000000.00000000", 'tickSize': f"{tick:.8f}"},
+                {'filterType': 'LOT_SIZE', 'minQty': f"{step:.8f}", 'maxQty': "9000000.00000000", 'stepSize': f"{step:.8f}"},
+                {'filterType': 'NOTIONAL', 'minNotional': "5.00000000", 'applyMinToMarket': True,
+                 'maxNotional': "9000000.00000000", 'applyMaxToMarket': False, 'avgPriceMins': 5},
+            ],
+        })
+    return {'timezone': 'UTC', 'rateLimits': [], 'symbols': symbols}
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    stall_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, etag=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        roll = random.random()
+        if roll < self.stall_rate:
+            time.sleep(STALL_SECONDS)
+            return
+        time.sleep(self.delay + random.uniform(0, self.jitter))
+        if roll < self.stall_rate + self.error_rate:
+            self.send_json(503, {'code': -1001, 'msg': 'Internal error; unable to process your request. Please try again.'})
+            return
+
+        now_ms = int(time.time() * 1000)
+        try:
+            if url.path == '/api/v3/ping':
+                body = {}
+            elif url.path == '/api/v3/time':
+                body = {'serverTime': now_ms}
+            elif url.path == '/api/v3/ticker/price':
+                body = ticker_body(params, now_ms)
+            elif url.path == '/api/v3/klines':
+                body = klines_body(params, now_ms)
+            elif url.path == '/api/v3/depth':
+                body = depth_body(params, now_ms)
+            elif url.path == '/api/v3/exchangeInfo':
+                if self.headers.get('If-None-Match') == EXCHANGE_INFO_ETAG:
+                    self.send_response(304)
+                    self.send_header('ETag', EXCHANGE_INFO_ETAG)
+                    self.end_headers()
+                    return
+                self.send_json(200, exchange_info_body(), etag=EXCHANGE_INFO_ETAG)
+                return
+            else:
+                self.send_json(404, {'code': -1, 'msg': 'Not found'})
+                return
+        except (KeyError, ValueError) as e:
+            self.send_json(400, {'code': -1102, 'msg': f'Bad parameter: {e}'})
+            return
+        self.send_json(200, body)
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help'):
+        print("Usage: python binance_stub_server.py [port] [--delay SEC] [--jitter SEC] [--error-rate P] [--stall-rate P]")
+        print("  port: listen port (default 8080)")
+        print("  --delay SEC: fixed latency added to every answer")
+        print("  --jitter SEC: extra random latency between 0 and SEC")
+        print("  --error-rate P: share of requests answered with HTTP 503")
+        print("  --stall-rate P: share of requests that never answer (hits the client read timeout)")
+        print()
+        print("Then run: BINANCE_API_HOSTS=http://127.0.0.1:8080,http://127.0.0.1:8081 python binance_price_calc.py SOL 190 180 1000")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8080
+    StubHandler.delay = float(get_flag_value('--delay', 0))
+    StubHandler.jitter = float(get_flag_value('--jitter', 0))
+    StubHandler.error_rate = float(get_flag_value('--error-rate', 0))
+    StubHandler.stall_rate = float(get_flag_value('--stall-rate', 0))
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    print(f"Binance stub on http://127.0.0.1:{port} | delay {StubHandler.delay}s + jitter {StubHandler.jitter}s | "
+          f"errors {StubHandler.error_rate:.0%} | stalls {StubHandler.stall_rate:.0%}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
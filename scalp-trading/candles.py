@@ -0,0 +1,82 @@
+# candles.py
+# Compact columnar candle container backed by NumPy arrays
+
+import numpy as np
+
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+class Candles:
+    """
+    OHLCV series stored as one NumPy array per field.
+
+    Indexing with an int returns the legacy candle dict and iteration yields
+    dicts, so code written against the old list-of-dicts format keeps working.
+    Slicing returns a Candles view without copying.
+    """
+
+    __slots__ = CANDLE_FIELDS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def empty(cls):
+        return cls(*([] for _ in CANDLE_FIELDS))
+
+    @classmethod
+    def from_klines(cls, data):
+        """Build from a raw /api/v3/klines JSON payload"""
+        if not data:
+            return cls.empty()
+        timestamp = np.fromiter((row[0] for row in data), dtype=np.int64, count=len(data))
+        ohlcv = np.array([row[1:6] for row in data], dtype=np.float64)
+        return cls(timestamp, *ohlcv.T)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (timestamp, open, high, low, close, volume) tuples"""
+        if not rows:
+            return cls.empty()
+        table = np.array(rows, dtype=np.float64)
+        return cls(table[:, 0].astype(np.int64), *table[:, 1:6].T)
+
+    @classmethod
+    def from_dicts(cls, candles):
+        """Build from the legacy list-of-dicts format"""
+        return cls(*([c[field] for c in candles] for field in CANDLE_FIELDS))
+
+    @classmethod
+    def concat(cls, parts):
+        """Join several Candles end to end"""
+        return cls(*(np.concatenate([getattr(part, field) for part in parts]) for field in CANDLE_FIELDS))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Candles(*(getattr(self, field)[index] for field in CANDLE_FIELDS))
+        return {
+            'timestamp': int(self.timestamp[index]),
+            'open': float(self.open[index]),
+            'high': float(self.high[index]),
+            'low': float(self.low[index]),
+            'close': float(self.close[index]),
+            'volume': float(self.volume[index])
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"Candles({len(self)} rows)"
+
+    def to_dicts(self):
+        """Return the legacy list-of-dicts representation"""
+        return list(self)
@@ -0,0 +1,197 @@
+# exchange_rules.py
+# Local store of Binance symbol trading rules and a vectorized tick/lot/notional normalizer
+
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import requests
+
+# Store location and how long rules are trusted before revalidating with Binance
+EXCHANGE_RULES_PATH = os.getenv('EXCHANGE_RULES_PATH', os.path.expanduser('~/.cache/trading-scripts/exchange_rules.db'))
+EXCHANGE_RULES_TTL = float(os.getenv('EXCHANGE_RULES_TTL', 86400))
+
+BINANCE_EXCHANGE_INFO_PATH = "/api/v3/exchangeInfo"
+
+# Relative slack when snapping, so values already on a step stay put despite float noise
+SNAP_EPSILON = 1e-9
+
+# Compact per-symbol rules; a 0 limit means the filter does not apply.
+# Fields may also hold one array per field (see stack_rules) to normalize many symbols at once.
+SymbolRules = namedtuple('SymbolRules', (
+    'symbol', 'status', 'tick_size', 'min_price', 'max_price',
+    'step_size', 'min_qty', 'max_qty', 'min_notional', 'max_notional',
+))
+
+RULE_COLUMNS = SymbolRules._fields
+
+def parse_symbol(info):
+    """Compact rules from one exchangeInfo symbol entry"""
+    filters = {f['filterType']: f for f in info.get('filters', [])}
+    price = filters.get('PRICE_FILTER', {})
+    lot = filters.get('LOT_SIZE', {})
+    # NOTIONAL replaced MIN_NOTIONAL; older payloads only have the latter
+    notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL', {})
+    return SymbolRules(
+        info['symbol'], info.get('status', 'TRADING'),
+        float(price.get('tickSize', 0)), float(price.get('minPrice', 0)), float(price.get('maxPrice', 0)),
+        float(lot.get('stepSize', 0)), float(lot.get('minQty', 0)), float(lot.get('maxQty', 0)),
+        float(notional.get('minNotional', 0)), float(notional.get('maxNotional', 0)),
+    )
+
+def connect(path=None):
+    """Open the rules store, creating the schema on first use"""
+    path = path or EXCHANGE_RULES_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS symbol_rules (
+            symbol TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            tick_size REAL NOT NULL,
+            min_price REAL NOT NULL,
+            max_price REAL NOT NULL,
+            step_size REAL NOT NULL,
+            min_qty REAL NOT NULL,
+            max_qty REAL NOT NULL,
+            min_notional REAL NOT NULL,
+            max_notional REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS rules_meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+class RulesStore:
+    """
+    Symbol rules from /api/v3/exchangeInfo, fetched once and kept on disk.
+
+    The multi-megabyte payload is reduced to one row per symbol. After
+    EXCHANGE_RULES_TTL the store revalidates with the saved ETag /
+    Last-Modified, so an unchanged payload is not downloaded again. Rules
+    are held in a dict in memory for O(1) lookups.
+    """
+
+    def __init__(self, path=None, ttl=EXCHANGE_RULES_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.rules = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self, symbol, client):
+        """Rules for a symbol such as 'SOLUSDT' (None if Binance does not list it), fetching through `client` when stale"""
+        with self.lock:
+            if self.rules is None or time.time() - self.checked_at >= self.ttl:
+                self._load(client)
+            return self.rules.get(symbol)
+
+    def _load(self, client):
+        conn = connect(self.path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM rules_meta").fetchall())
+            checked_at = float(meta.get('checked_at', 0))
+            if time.time() - checked_at >= self.ttl or not meta.get('symbols'):
+                checked_at = self._refresh(conn, meta, client)
+            self.rules = {row[0]: SymbolRules(*row) for row in conn.execute(
+                f"SELECT {', '.join(RULE_COLUMNS)} FROM symbol_rules")}
+            self.checked_at = checked_at
+        finally:
+            conn.close()
+
+    def _refresh(self, conn, meta, client):
+        """Revalidate or download exchangeInfo, returning the time the stored rules were confirmed current"""
+        headers = {}
+        if meta.get('symbols'):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = client.get(BINANCE_EXCHANGE_INFO_PATH, headers=headers or None)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.exceptions.RequestException:
+            if meta.get('symbols'):
+                return float(meta.get('checked_at', 0))  # keep using the stored rules, retry on the next lookup
+            raise
+
+        now = time.time()
+        with conn:
+            if response.status_code != 304:
+                rows = [parse_symbol(info) for info in response.json()['symbols']]  # parse errors reach the caller
+                conn.execute("DELETE FROM symbol_rules")
+                conn.executemany(f"INSERT INTO symbol_rules VALUES ({', '.join('?' * len(RULE_COLUMNS))})", rows)
+                meta_rows = {'symbols': str(len(rows)), 'etag': response.headers.get('ETag', ''),
+                             'last_modified': response.headers.get('Last-Modified', '')}
+            else:
+                meta_rows = {}
+            meta_rows['checked_at'] = repr(now)
+            conn.executemany("INSERT OR REPLACE INTO rules_meta (key, value) VALUES (?, ?)", meta_rows.items())
+        return now
+
+# Shared store used by the calculators
+rules_store = RulesStore()
+
+def stack_rules(rules):
+    """Combine several SymbolRules into one whose fields are arrays, for normalizing rows of different symbols"""
+    columns = list(zip(*rules))
+    return SymbolRules(columns[0], columns[1], *(np.array(column, dtype=np.float64) for column in columns[2:]))
+
+def snap(values, step, mode='nearest'):
+    """Snap values to multiples of step ('nearest', 'down' or 'up'); arrays broadcast and a 0 step leaves values as-is"""
+    values = np.asarray(values, dtype=np.float64)
+    step = np.asarray(step, dtype=np.float64)
+    safe_step = np.where(step > 0, step, 1.0)
+    ratio = values / safe_step
+    if mode == 'down':
+        count = np.floor(ratio * (1 + SNAP_EPSILON))
+    elif mode == 'up':
+        count = np.ceil(ratio * (1 - SNAP_EPSILON))
+    else:
+        count = np.round(ratio)
+    # Steps are usually 10^-k: dividing by the whole 10^k gives the nearest float (9.7, not 9.700000000000001)
+    per_unit = 1 / safe_step
+    whole = np.abs(per_unit - np.round(per_unit)) < 1e-6 * per_unit
+    snapped = np.where(whole, count / np.where(whole, np.round(per_unit), 1.0), count * safe_step)
+    return np.where(step > 0, snapped, values)
+
+# Normalize problem flags, combined bitwise per element
+PRICE_FILTER, LOT_SIZE, NOTIONAL = 1, 2, 4
+PROBLEM_NAMES = ((PRICE_FILTER, 'PRICE_FILTER'), (LOT_SIZE, 'LOT_SIZE'), (NOTIONAL, 'NOTIONAL'))
+
+def describe_problems(flags):
+    """Filter names for one element's problem flags"""
+    return ', '.join(name for bit, name in PROBLEM_NAMES if int(flags) & bit)
+
+def normalize(rules, entry, exit, position_size):
+    """
+    Snap orders to what the exchange would accept, as arrays that broadcast
+    against each other and the rules fields.
+
+    Prices go to the nearest tick. The base quantity bought with
+    position_size USDT at the snapped entry is rounded down to the lot step,
+    and position_size becomes what that quantity actually costs. Returns a
+    dict of same-shape entry, exit, quantity and position_size arrays plus a
+    `problems` array of PRICE_FILTER / LOT_SIZE / NOTIONAL flags (0 when valid).
+    """
+    entry = snap(entry, rules.tick_size)
+    exit = snap(exit, rules.tick_size)
+    quantity = snap(np.asarray(position_size, dtype=np.float64) / entry, rules.step_size, 'down')
+    cost = quantity * entry
+
+    max_price = np.where(np.asarray(rules.max_price) > 0, rules.max_price, np.inf)
+    max_qty = np.where(np.asarray(rules.max_qty) > 0, rules.max_qty, np.inf)
+    max_notional = np.where(np.asarray(rules.max_notional) > 0, rules.max_notional, np.inf)
+    price_ok = (exit >= rules.min_price) & (exit <= max_price) & (entry >= rules.min_price) & (entry <= max_price)
+    qty_ok = (quantity > 0) & (quantity >= rules.min_qty) & (quantity <= max_qty)
+    notional_ok = (cost >= rules.min_notional) & (cost <= max_notional)
+    problems = (np.where(price_ok, 0, PRICE_FILTER) | np.where(qty_ok, 0, LOT_SIZE)
+                | np.where(notional_ok, 0, NOTIONAL)).astype(np.int8)
+
+    return dict(zip(('entry', 'exit', 'quantity', 'position_size', 'problems'),
+                    np.broadcast_arrays(entry, exit, quantity, cost, problems)))
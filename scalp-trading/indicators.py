@@ -0,0 +1,271 @@
+# indicators.py
+# Streaming indicator engine with O(1) updates per new or revised candle
+
+import threading
+from collections import deque
+
+# Window used for the high_10/low_10/trend/avg_volume fields of analyze_candles
+ANALYSIS_WINDOW = 10
+EMA_PERIOD = 20
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+
+# Indicator state is split into values committed from closed candles and a
+# non-mutating peek() for the latest candle, so revising the still-open candle
+# never has to replay history.
+
+class RollingExtreme:
+    """Rolling max (or min) over a fixed window using a monotonic deque"""
+
+    def __init__(self, window, highest=True):
+        self.window = window
+        self.highest = highest
+        self.count = 0
+        self.items = deque()  # (index, value), values monotonic from front to back
+
+    def _better(self, a, b):
+        return a >= b if self.highest else a <= b
+
+    def commit(self, value):
+        while self.items and self._better(value, self.items[-1][1]):
+            self.items.pop()
+        self.items.append((self.count, value))
+        self.count += 1
+        # Keep only indices that share a window with the next (uncommitted) candle
+        while self.items[0][0] <= self.count - self.window:
+            self.items.popleft()
+
+    def peek(self, value):
+        if not self.items:
+            return value
+        best = self.items[0][1]
+        return value if self._better(value, best) else best
+
+class RollingWindow:
+    """Last window-1 committed values with a running sum"""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window - 1)
+        self.total = 0.0
+
+    def commit(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def peek_mean(self, value):
+        return (self.total + value) / (len(self.values) + 1)
+
+class EMA:
+    """Exponential moving average seeded with the simple average of the first period values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def _next(self, value):
+        if self.count + 1 < self.period:
+            return None, self.total + value
+        if self.count + 1 == self.period:
+            return (self.total + value) / self.period, self.total + value
+        return self.alpha * value + (1 - self.alpha) * self.value, self.total
+
+    def commit(self, value):
+        self.value, self.total = self._next(value)
+        self.count += 1
+
+    def peek(self, value):
+        return self._next(value)[0]
+
+class WilderAverage:
+    """Wilder-smoothed average (used by ATR and RSI), seeded with a simple average"""
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def _next(self, value):
+        if self.count + 1 < self.period:
+            return None, self.total + value
+        if self.count + 1 == self.period:
+            return (self.total + value) / self.period, self.total + value
+        return (self.value * (self.period - 1) + value) / self.period, self.total
+
+    def commit(self, value):
+        self.value, self.total = self._next(value)
+        self.count += 1
+
+    def peek(self, value):
+        return self._next(value)[0]
+
+class IndicatorEngine:
+    """
+    Rolling indicator state for one (symbol, interval) series.
+
+    Feed candles with update(); a candle with the same timestamp as the latest
+    one revises it, a newer one commits the latest and becomes the new latest.
+    Every update is O(1). snapshot() returns the analyze_candles fields plus
+    EMA, ATR, RSI and VWAP. VWAP covers the last `vwap_window` candles, which
+    feed() sets to the snapshot length, so a long-lived engine gives the same
+    VWAP as a fresh one fed the same snapshot. Engines are shared between threads; hold `lock`
+    around updates and the snapshot that reads them.
+    """
+
+    def __init__(self, timeframe, window=ANALYSIS_WINDOW, ema_period=EMA_PERIOD, atr_period=ATR_PERIOD, rsi_period=RSI_PERIOD,
+                 vwap_window=ANALYSIS_WINDOW):
+        self.timeframe = timeframe
+        self.window = window
+        self.vwap_window = vwap_window
+        self.ema_period = ema_period
+        self.atr_period = atr_period
+        self.rsi_period = rsi_period
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.latest = None  # (timestamp, open, high, low, close, volume)
+        self.prev_close = None
+        self.highs = RollingExtreme(self.window, highest=True)
+        self.lows = RollingExtreme(self.window, highest=False)
+        self.volumes = RollingWindow(self.window)
+        self.closes = deque(maxlen=self.window - 1)
+        self.ema = EMA(self.ema_period)
+        self.atr = WilderAverage(self.atr_period)
+        self.avg_gain = WilderAverage(self.rsi_period)
+        self.avg_loss = WilderAverage(self.rsi_period)
+        # (typical price * volume, volume) of the committed candles inside the VWAP window
+        self.vwap_rows = deque(maxlen=max(self.vwap_window - 1, 1))
+
+    @property
+    def latest_timestamp(self):
+        return self.latest[0] if self.latest else None
+
+    def _true_range(self, high, low):
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _change(self, close):
+        if self.prev_close is None:
+            return None
+        return close - self.prev_close
+
+    def _commit_latest(self):
+        _, _, high, low, close, volume = self.latest
+        self.highs.commit(high)
+        self.lows.commit(low)
+        self.volumes.commit(volume)
+        self.closes.append(close)
+        self.ema.commit(close)
+        self.atr.commit(self._true_range(high, low))
+        change = self._change(close)
+        if change is not None:
+            self.avg_gain.commit(max(change, 0.0))
+            self.avg_loss.commit(max(-change, 0.0))
+        self.vwap_rows.append(((high + low + close) / 3 * volume, volume))
+        self.prev_close = close
+
+    def update(self, timestamp, open, high, low, close, volume):
+        """Add a new candle or revise the latest one; older candles are ignored"""
+        if self.latest is not None:
+            if timestamp < self.latest[0]:
+                return
+            if timestamp > self.latest[0]:
+                self._commit_latest()
+                self.count += 1
+        else:
+            self.count += 1
+        self.latest = (timestamp, open, high, low, close, volume)
+
+    def feed(self, candles):
+        """Feed a REST snapshot (Candles); only rows at or after the latest candle cost anything"""
+        if not len(candles):
+            return
+        timestamps = candles.timestamp
+        # No overlap with what we have means candles were missed, rebuild from the snapshot;
+        # so does a new snapshot length, which is the VWAP window
+        if (self.latest is not None and timestamps[0] > self.latest[0]) or len(candles) != self.vwap_window:
+            self.vwap_window = len(candles)
+            self.reset()
+        start = 0
+        if self.latest is not None:
+            start = int(timestamps.searchsorted(self.latest[0]))
+        columns = (candles.timestamp[start:], candles.open[start:], candles.high[start:],
+                   candles.low[start:], candles.close[start:], candles.volume[start:])
+        for row in zip(*(column.tolist() for column in columns)):
+            self.update(*row)
+
+    def snapshot(self):
+        """Current analysis dict (same keys as analyze_candles plus indicators)"""
+        if self.count < 5:
+            return f"Insufficient {self.timeframe} data"
+
+        _, _, high, low, close, volume = self.latest
+        high_10 = self.highs.peek(high)
+        low_10 = self.lows.peek(low)
+        closes = list(self.closes) + [close]
+
+        if closes[-1] > closes[0]:
+            trend = "upward"
+        elif closes[-1] < closes[0]:
+            trend = "downward"
+        else:
+            trend = "sideways"
+
+        rsi = None
+        change = self._change(close)
+        if change is not None:
+            avg_gain = self.avg_gain.peek(max(change, 0.0))
+            avg_loss = self.avg_loss.peek(max(-change, 0.0))
+            if avg_gain is not None:
+                rsi = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+
+        # Summed over the window in a fixed order (not kept as running totals) so the
+        # result is exactly what a fresh engine computes from the same snapshot
+        vwap_pv = sum(pv for pv, _ in self.vwap_rows) + (high + low + close) / 3 * volume
+        vwap_volume = sum(v for _, v in self.vwap_rows) + volume
+        vwap = vwap_pv / vwap_volume if vwap_volume > 0 else None
+
+        return {
+            'timeframe': self.timeframe,
+            'current_price': close,
+            'high_10': high_10,
+            'low_10': low_10,
+            'trend': trend,
+            'volatility_pct': ((high_10 - low_10) / close) * 100,
+            'avg_volume': self.volumes.peek_mean(volume),
+            'recent_closes': closes[-5:],
+            'ema': self.ema.peek(close),
+            'atr': self.atr.peek(self._true_range(high, low)),
+            'rsi': rsi,
+            'vwap': vwap
+        }
+
+# Engines kept per (symbol, interval) so repeated analysis in one process is incremental
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(symbol, interval):
+    """Return the shared engine for a series, creating it on first use"""
+    key = (symbol, interval)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = IndicatorEngine(interval)
+        return _engines[key]
+
+def analyze(symbol, interval, candles):
+    """Feed a candle snapshot (or pass through an error string) and return the analysis"""
+    if isinstance(candles, str):  # Error message
+        return candles
+    engine = get_engine(symbol, interval)
+    # The scheduler analyzes tokens concurrently, possibly the same one twice
+    with engine.lock:
+        engine.feed(candles)
+        return engine.snapshot()
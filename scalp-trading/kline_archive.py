@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# kline_archive.py
+# Streaming loader for Binance public kline ZIP-CSV dumps into memory-mappable columnar files
+
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+from candles import Candles, CANDLE_FIELDS
+
+# Root directory of the columnar store: <root>/<PAIR>/<interval>/<field>.bin
+KLINE_ARCHIVE_PATH = os.getenv('KLINE_ARCHIVE_PATH', os.path.expanduser('~/.cache/trading-scripts/archive'))
+
+# On-disk dtype per column, little-endian so files are portable
+COLUMN_DTYPES = {
+    'timestamp': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8'),
+}
+
+# CSV lines parsed per chunk, bounds memory regardless of archive size
+INGEST_CHUNK_LINES = 100_000
+
+# Archive names look like SOLUSDT-1m-2024-01.zip or SOLUSDT-1m-2024-01-15.zip
+ARCHIVE_NAME = re.compile(r'^([A-Z0-9]+)-(\w+)-\d{4}-\d{2}(?:-\d{2})?\.zip$')
+
+def series_dir(pair, interval, root=None):
+    return os.path.join(root or KLINE_ARCHIVE_PATH, pair, interval)
+
+def column_path(pair, interval, field, root=None):
+    return os.path.join(series_dir(pair, interval, root), f'{field}.bin')
+
+def stored_rows(pair, interval, root=None):
+    """Number of complete rows in the store (the shortest column wins after an interrupted write)"""
+    sizes = []
+    for field, dtype in COLUMN_DTYPES.items():
+        path = column_path(pair, interval, field, root)
+        sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+    return min(sizes)
+
+def open_series(pair, interval, root=None):
+    """Memory-map a stored series as Candles; nothing is read until the arrays are touched"""
+    rows = stored_rows(pair, interval, root)
+    if rows == 0:
+        return Candles.empty()
+    columns = [np.memmap(column_path(pair, interval, field, root), dtype=COLUMN_DTYPES[field], mode='r', shape=(rows,))
+               for field in CANDLE_FIELDS]
+    return Candles(*columns)
+
+def slice_range(candles, start_ms=None, end_ms=None):
+    """Zero-copy view of candles with start_ms <= timestamp < end_ms"""
+    lo = 0 if start_ms is None else int(np.searchsorted(candles.timestamp, start_ms, side='left'))
+    hi = len(candles) if end_ms is None else int(np.searchsorted(candles.timestamp, end_ms, side='left'))
+    return candles[lo:hi]
+
+def load_range(pair, interval, start_ms=None, end_ms=None, root=None):
+    """Memory-mapped Candles for a time range of a stored series"""
+    return slice_range(open_series(pair, interval, root), start_ms, end_ms)
+
+def last_timestamp(pair, interval, root=None):
+    rows = stored_rows(pair, interval, root)
+    if rows == 0:
+        return None
+    ts = np.memmap(column_path(pair, interval, 'timestamp', root), dtype=COLUMN_DTYPES['timestamp'], mode='r', shape=(rows,))
+    return int(ts[-1])
+
+def iter_csv_chunks(lines, chunk_lines=INGEST_CHUNK_LINES):
+    """Yield (timestamp, open, high, low, close, volume) arrays for chunks of kline CSV lines"""
+    buffer = []
+    for line in lines:
+        if not line or not line[0].isdigit():  # header or blank line
+            continue
+        buffer.append(line)
+        if len(buffer) >= chunk_lines:
+            yield parse_csv_lines(buffer)
+            buffer = []
+    if buffer:
+        yield parse_csv_lines(buffer)
+
+def parse_csv_lines(lines):
+    table = np.loadtxt(lines, delimiter=',', usecols=range(6), dtype=np.float64, ndmin=2)
+    timestamp = table[:, 0].astype(np.int64)
+    # Spot archives switched to microsecond timestamps in 2025, store milliseconds
+    micro = timestamp > 10 ** 14
+    timestamp[micro] //= 1000
+    return (timestamp, *table[:, 1:6].T)
+
+def ingest_archive(path, pair=None, interval=None, root=None):
+    """
+    Append one kline ZIP-CSV archive to the columnar store and return
+    (rows_added, rows_skipped). Rows at or before the last stored timestamp
+    are skipped, so ingest archives in chronological order. Memory use is
+    bounded by INGEST_CHUNK_LINES whatever the archive size.
+    """
+    name = os.path.basename(path)
+    if pair is None or interval is None:
+        match = ARCHIVE_NAME.match(name)
+        if not match:
+            raise ValueError(f"Cannot infer pair/interval from '{name}', expected e.g. SOLUSDT-1m-2024-01.zip")
+        pair, interval = pair or match.group(1), interval or match.group(2)
+
+    directory = series_dir(pair, interval, root)
+    os.makedirs(directory, exist_ok=True)
+
+    # Drop any partially written row left by an interrupted ingest
+    rows = stored_rows(pair, interval, root)
+    for field, dtype in COLUMN_DTYPES.items():
+        column = column_path(pair, interval, field, root)
+        if os.path.exists(column) and os.path.getsize(column) != rows * dtype.itemsize:
+            with open(column, 'r+b') as f:
+                f.truncate(rows * dtype.itemsize)
+
+    last = last_timestamp(pair, interval, root)
+    added = skipped = 0
+    files = {field: open(column_path(pair, interval, field, root), 'ab') for field in CANDLE_FIELDS}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if not member.endswith('.csv'):
+                    continue
+                with archive.open(member) as raw:
+                    lines = io.TextIOWrapper(raw, encoding='ascii')
+                    for columns in iter_csv_chunks(lines):
+                        timestamp = columns[0]
+                        keep = np.ones(len(timestamp), dtype=bool) if last is None else timestamp > last
+                        if np.any(np.diff(timestamp[keep]) <= 0):
+                            raise ValueError(f"{member} is not sorted by open time")
+                        skipped += int((~keep).sum())
+                        if not keep.any():
+                            continue
+                        for field, values in zip(CANDLE_FIELDS, columns):
+                            files[field].write(np.ascontiguousarray(values[keep], dtype=COLUMN_DTYPES[field]).tobytes())
+                        added += int(keep.sum())
+                        last = int(timestamp[keep][-1])
+    finally:
+        for f in files.values():
+            f.close()
+    return added, skipped
+
+def warm_cache(pair, interval, days, root=None):
+    """Copy the last `days` days of a stored series into the SQLite kline cache"""
+    import kline_cache
+
+    start_ms = int((time.time() - days * 86400) * 1000)
+    candles = load_range(pair, interval, start_ms, root=root)
+    rows = list(zip(candles.timestamp.tolist(), candles.open.tolist(), candles.high.tolist(),
+                    candles.low.tolist(), candles.close.tolist(), candles.volume.tolist()))
+    conn = kline_cache.connect()
+    try:
+        kline_cache.store_klines(conn, pair, interval, rows)
+    finally:
+        conn.close()
+    return len(rows)
+
+def format_ms(ms):
+    return time.strftime('%Y-%m-%d %H:%M', time.gmtime(ms / 1000))
+
+def main():
+    """Main function to handle archive commands"""
+    if len(sys.argv) < 3 or sys.argv[1] not in ('ingest', 'info', 'warm'):
+        print("Usage: python kline_archive.py ingest <archive.zip> [archive.zip ...]")
+        print("       python kline_archive.py info <pair> <interval>")
+        print("       python kline_archive.py warm <pair> <interval> [days]")
+        print("  ingest: append Binance public kline ZIP-CSV dumps (e.g. SOLUSDT-1m-2024-01.zip)")
+        print("  info: show rows and time range of a stored series")
+        print("  warm: copy the last days (default 2) of a series into the kline cache")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'ingest':
+        # Archive names sort chronologically, which is the order the store needs
+        for path in sorted(sys.argv[2:], key=os.path.basename):
+            try:
+                added, skipped = ingest_archive(path)
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                print(f"Error ingesting {path}: {e}")
+                sys.exit(1)
+            note = f" ({skipped} already stored)" if skipped else ""
+            print(f"{os.path.basename(path)}: {added} rows{note}")
+        return
+
+    if len(sys.argv) < 4:
+        print("Missing interval")
+        sys.exit(1)
+    pair, interval = sys.argv[2].upper(), sys.argv[3]
+
+    if command == 'info':
+        candles = open_series(pair, interval)
+        if not len(candles):
+            print(f"No stored {interval} data for {pair}")
+            return
+        print(f"{pair} {interval}: {len(candles)} rows | {format_ms(candles.timestamp[0])} -> {format_ms(candles.timestamp[-1])} UTC")
+    else:
+        days = float(sys.argv[4]) if len(sys.argv) > 4 else 2
+        print(f"Copied {warm_cache(pair, interval, days)} rows into the kline cache")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# kline_cache.py
+# Local SQLite store of closed Binance klines with incremental top-up fetches
+
+import os
+import sqlite3
+import time
+
+# Cache location and on/off switch (set KLINE_CACHE=0 to always hit the API)
+KLINE_CACHE_PATH = os.getenv('KLINE_CACHE_PATH', os.path.expanduser('~/.cache/trading-scripts/klines.db'))
+KLINE_CACHE_ENABLED = os.getenv('KLINE_CACHE', '1') != '0'
+
+# Binance returns at most this many klines per request
+MAX_KLINES_PER_REQUEST = 1000
+
+# Candles closing within this many ms of the local clock still count as open, so a clock running
+# ahead of Binance never stores a partial candle (stored candles are not refetched)
+CLOSE_MARGIN_MS = 5000
+
+# Interval lengths in milliseconds (1M is an upper bound, months vary in length)
+INTERVAL_MS = {
+    '1s': 1000,
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '6h': 21_600_000,
+    '8h': 28_800_000,
+    '12h': 43_200_000,
+    '1d': 86_400_000,
+    '3d': 259_200_000,
+    '1w': 604_800_000,
+    '1M': 2_678_400_000,
+}
+
+def connect(path=None):
+    """Open the kline store, creating the schema on first use"""
+    path = path or KLINE_CACHE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS klines (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            PRIMARY KEY (symbol, interval, timestamp)
+        ) WITHOUT ROWID
+    """)
+    return conn
+
+def load_klines(conn, symbol, interval, limit):
+    """Return the newest `limit` stored klines as (timestamp, open, high, low, close, volume) rows, oldest first"""
+    rows = conn.execute(
+        "SELECT timestamp, open, high, low, close, volume FROM klines "
+        "WHERE symbol = ? AND interval = ? ORDER BY timestamp DESC LIMIT ?",
+        (symbol, interval, limit)
+    ).fetchall()
+    rows.reverse()
+    return rows
+
+def load_range(conn, symbol, interval, start_ms=None, end_ms=None):
+    """Return stored klines with start_ms <= timestamp < end_ms, oldest first"""
+    return conn.execute(
+        "SELECT timestamp, open, high, low, close, volume FROM klines "
+        "WHERE symbol = ? AND interval = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+        (symbol, interval, start_ms or 0, end_ms or 2 ** 62)
+    ).fetchall()
+
+def store_klines(conn, symbol, interval, rows):
+    """Insert or replace closed kline rows"""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO klines (symbol, interval, timestamp, open, high, low, close, volume) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(symbol, interval, *row) for row in rows]
+        )
+
+def parse_klines(data, now_ms):
+    """
+    Split a raw /api/v3/klines payload into closed rows and the rows still
+    open: the current candle, plus the previous one while it closed less than
+    CLOSE_MARGIN_MS before now_ms.
+    """
+    closed, open_rows = [], []
+    for candle in data:
+        row = (int(candle[0]), float(candle[1]), float(candle[2]), float(candle[3]), float(candle[4]), float(candle[5]))
+        if int(candle[6]) < now_ms - CLOSE_MARGIN_MS:
+            closed.append(row)
+        else:
+            open_rows.append(row)
+    return closed, open_rows
+
+def is_contiguous(rows, interval):
+    """Check that stored rows have no gaps larger than one interval"""
+    if len(rows) < 2:
+        return True
+    return rows[-1][0] - rows[0][0] <= INTERVAL_MS[interval] * (len(rows) - 1)
+
+def get_klines(symbol, interval, limit, fetch, path=None):
+    """
+    Return the newest `limit` klines as rows, serving closed candles from disk.
+
+    `fetch(params)` must perform the /api/v3/klines request for the given extra
+    params ('limit' and optionally 'startTime') and return the decoded JSON list.
+    Only candles newer than the last stored timestamp are requested; candles
+    still open are always refetched and never stored.
+    """
+    now_ms = int(time.time() * 1000)
+    if not KLINE_CACHE_ENABLED:
+        closed, open_rows = parse_klines(fetch({'limit': limit}), now_ms)
+        return (closed + open_rows)[-limit:]
+
+    try:
+        conn = connect(path)
+    except sqlite3.Error:
+        conn = None
+
+    try:
+        cached = load_klines(conn, symbol, interval, limit) if conn else []
+        step = INTERVAL_MS[interval]
+
+        # Top up from the last stored candle when the stored window is complete and recent enough
+        if (cached and len(cached) >= limit - 1 and is_contiguous(cached, interval)
+                and now_ms - cached[-1][0] <= step * (MAX_KLINES_PER_REQUEST - 1)):
+            # Ask only for the candles we expect, request weight grows with the limit
+            expected = (now_ms - cached[-1][0]) // step + 2
+            params = {'startTime': cached[-1][0] + 1, 'limit': min(expected, MAX_KLINES_PER_REQUEST)}
+        else:
+            cached = []
+            params = {'limit': limit}
+
+        closed, open_rows = parse_klines(fetch(params), now_ms)
+        if conn and closed:
+            store_klines(conn, symbol, interval, closed)
+
+        rows = {row[0]: row for row in cached}
+        rows.update((row[0], row) for row in closed)
+        rows.update((row[0], row) for row in open_rows)
+        return [rows[ts] for ts in sorted(rows)][-limit:]
+    except sqlite3.Error:
+        closed, open_rows = parse_klines(fetch({'limit': limit}), now_ms)
+        return (closed + open_rows)[-limit:]
+    finally:
+        if conn:
+            conn.close()
+
+def backfill(symbol, interval, start_ms, fetch, path=None):
+    """
+    Page closed klines from start_ms up to now into the store and return how
+    many rows were added. Pages that are already fully stored are skipped, so
+    an interrupted backfill resumes without refetching.
+    """
+    now_ms = int(time.time() * 1000)
+    page_ms = INTERVAL_MS[interval] * MAX_KLINES_PER_REQUEST
+    conn = connect(path)
+    try:
+        cursor = start_ms
+        added = 0
+        while cursor < now_ms:
+            stored = conn.execute(
+                "SELECT COUNT(*), MAX(timestamp) FROM klines "
+                "WHERE symbol = ? AND interval = ? AND timestamp >= ? AND timestamp < ?",
+                (symbol, interval, cursor, cursor + page_ms)
+            ).fetchone()
+            if stored[0] >= MAX_KLINES_PER_REQUEST:
+                cursor = stored[1] + 1
+                continue
+
+            closed, _ = parse_klines(fetch({'startTime': cursor, 'limit': MAX_KLINES_PER_REQUEST}), now_ms)
+            if not closed:
+                break
+            store_klines(conn, symbol, interval, closed)
+            added += len(closed)
+            cursor = closed[-1][0] + 1
+        return added
+    finally:
+        conn.close()
@@ -0,0 +1,194 @@
+# monte_carlo.py
+# Bootstrapped Monte Carlo estimate of TP-before-SL probability, split across a process pool
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scalp_calc import calc_profit, calc_profit_grid
+
+# Defaults: paths simulated, minutes per path and 1m candles to resample from
+MC_PATHS = 100_000
+MC_HORIZON = 240
+MC_HISTORY = 1000
+
+# Paths simulated per vectorized block (bounds memory to ~block x horizon x 12 bytes),
+# extended FIRST_CHUNK candles at a time, doubling like backtest.first_hit
+MC_BLOCK = 8192
+MC_FIRST_CHUNK = 16
+
+# Below this many paths a pool costs more to start than it saves
+MC_MIN_PARALLEL_PATHS = 20_000
+
+# Outcome codes in the shared result array
+OUTCOME_OPEN, OUTCOME_TP, OUTCOME_SL = 0, 1, 2
+
+def candle_moves(candles, is_long=True):
+    """
+    Per-candle (close, high, low) log moves relative to the previous close, as
+    a float32 (n - 1, 3) array. Resampling whole candles keeps each minute's
+    wick together with its close, so intrabar touches are simulated too.
+
+    For a short the moves are mirrored (negated, high and low swapped), so
+    the simulation always runs a long against rising TP and falling SL levels.
+    """
+    prev_close = np.log(candles.close[:-1])
+    high, low = (candles.high, candles.low) if is_long else (candles.low, candles.high)
+    sign = 1 if is_long else -1
+    moves = np.empty((len(candles) - 1, 3), dtype=np.float32)
+    moves[:, 0] = sign * (np.log(candles.close[1:]) - prev_close)
+    moves[:, 1] = sign * (np.log(high[1:]) - prev_close)
+    moves[:, 2] = sign * (np.log(low[1:]) - prev_close)
+    return moves
+
+def simulate_block(moves, count, horizon, tp_level, sl_level, rng):
+    """
+    Simulate `count` long paths of `horizon` resampled candles from log price 0
+    (shorts arrive as mirrored moves, see candle_moves).
+
+    Returns (outcome, bars, final) arrays: which level was touched first (the
+    stop loss when one candle touches both, like backtest.first_hit), after
+    how many candles, and the final log price of paths that hit neither.
+    Paths are extended in doubling chunks of candles and dropped once
+    resolved, so quick exits stay cheap.
+    """
+    outcome = np.full(count, OUTCOME_OPEN, dtype=np.int8)
+    bars = np.full(count, horizon, dtype=np.int32)
+    level = np.zeros(count, dtype=np.float32)
+    active = np.arange(count)
+    t, chunk = 0, MC_FIRST_CHUNK
+    while t < horizon and active.size:
+        n = min(chunk, horizon - t)
+        picks = moves[rng.integers(0, len(moves), size=(active.size, n), dtype=np.int32)]
+        # Each candle's wick is measured from the previous close
+        prev = np.empty((active.size, n), dtype=np.float32)
+        prev[:, 0] = level[active]
+        closes = np.cumsum(picks[:, :, 0], axis=1) + prev[:, :1]
+        prev[:, 1:] = closes[:, :-1]
+        tp_hit = prev + picks[:, :, 1] >= tp_level
+        sl_hit = prev + picks[:, :, 2] <= sl_level
+
+        hit = tp_hit | sl_hit
+        first = hit.argmax(axis=1)
+        rows = np.arange(active.size)
+        resolved = hit[rows, first]
+        done = active[resolved]
+        outcome[done] = np.where(sl_hit[rows, first][resolved], OUTCOME_SL, OUTCOME_TP)
+        bars[done] = t + first[resolved] + 1
+        level[active] = closes[:, -1]
+        active = active[~resolved]
+        t += n
+        chunk *= 2
+    return outcome, bars, level
+
+# Shared memory blocks attached by each pool worker
+_worker = {}
+
+def _attach(name, shape, dtype):
+    block = shared_memory.SharedMemory(name=name)
+    _worker.setdefault('blocks', []).append(block)  # keep the mapping alive while the array is used
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _init_worker(moves_spec, result_specs):
+    _worker['moves'] = _attach(*moves_spec)
+    _worker['results'] = [_attach(*spec) for spec in result_specs]
+
+def _run_slice(start, stop, horizon, tp_level, sl_level, seed):
+    """Simulate paths [start, stop) in blocks, writing straight into the shared result arrays"""
+    rng = np.random.default_rng(seed)
+    outcome, bars, final = _worker['results']
+    for i in range(start, stop, MC_BLOCK):
+        j = min(i + MC_BLOCK, stop)
+        outcome[i:j], bars[i:j], final[i:j] = simulate_block(_worker['moves'], j - i, horizon, tp_level, sl_level, rng)
+    return stop - start
+
+def _shared_array(shape, dtype, blocks):
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+    blocks.append(block)
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf), (block.name, shape, dtype)
+
+def simulate(moves, paths, horizon, tp_level, sl_level, workers=None, seed=None):
+    """
+    Run `paths` simulations, in-process or split across `workers` processes
+    sharing the candle moves and result arrays. Returns (outcome, bars, final, workers used).
+    """
+    workers = workers or os.cpu_count() or 1
+    if paths < MC_MIN_PARALLEL_PATHS:
+        workers = 1
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    blocks = []
+    try:
+        shared_moves, moves_spec = _shared_array(moves.shape, moves.dtype, blocks)
+        shared_moves[:] = moves
+        outcome, outcome_spec = _shared_array((paths,), np.int8, blocks)
+        bars, bars_spec = _shared_array((paths,), np.int32, blocks)
+        final, final_spec = _shared_array((paths,), np.float32, blocks)
+        bounds = np.linspace(0, paths, workers + 1).astype(int)
+
+        if workers == 1:
+            _worker.update(moves=shared_moves, results=(outcome, bars, final))
+            try:
+                _run_slice(0, paths, horizon, tp_level, sl_level, seeds[0])
+            finally:
+                _worker.clear()
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(moves_spec, (outcome_spec, bars_spec, final_spec))) as pool:
+                futures = [pool.submit(_run_slice, int(bounds[k]), int(bounds[k + 1]), horizon, tp_level, sl_level, seeds[k])
+                           for k in range(workers)]
+                for future in futures:
+                    future.result()
+
+        return outcome.copy(), bars.copy(), final.copy(), workers
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def estimate(candles, entry, take_profit, stop_loss, position_size, use_bnb_discount=False, slippage=None,
+             paths=MC_PATHS, horizon=MC_HORIZON, workers=None, seed=None):
+    """
+    Estimate how a TP/SL trade entered at `entry` plays out over the next
+    `horizon` minutes by resampling the candles' 1m moves. A take profit
+    below entry makes it a short (booked with leverage -1 like backtest.py).
+    Paths hitting neither level close at market after the horizon. Net values
+    come from calc_profit, so fees (and slippage, if given) are included;
+    slippage must be priced for the trade's side (OrderBook.slippage side=).
+    """
+    started = time.perf_counter()
+    is_long = take_profit >= entry
+    sign = 1 if is_long else -1
+    moves = candle_moves(candles, is_long)
+    if len(moves) < 2:
+        return None
+    outcome, bars, final, used = simulate(moves, paths, horizon, sign * np.log(take_profit / entry),
+                                          sign * np.log(stop_loss / entry), workers=workers, seed=seed)
+
+    leverage = 1 if is_long else -1
+    tp_net = calc_profit(entry, take_profit, position_size, use_bnb_discount=use_bnb_discount, leverage=leverage,
+                         slippage=slippage)['net_amount']
+    sl_net = calc_profit(entry, stop_loss, position_size, use_bnb_discount=use_bnb_discount, leverage=leverage,
+                         slippage=slippage)['net_amount']
+    is_open = outcome == OUTCOME_OPEN
+    open_net = calc_profit_grid(entry, entry * np.exp(sign * final[is_open].astype(np.float64)), position_size,
+                                use_bnb_discount=use_bnb_discount, leverage=leverage, slippage=slippage)['net_amount']
+
+    tp_count = int((outcome == OUTCOME_TP).sum())
+    sl_count = int((outcome == OUTCOME_SL).sum())
+    resolved = ~is_open
+    return {
+        'paths': paths,
+        'horizon': horizon,
+        'history': len(candles),
+        'tp_prob': tp_count / paths,
+        'sl_prob': sl_count / paths,
+        'open_prob': float(is_open.mean()),
+        'expected_net': (tp_count * tp_net + sl_count * sl_net + float(open_net.sum())) / paths,
+        'median_bars': float(np.median(bars[resolved])) if resolved.any() else None,
+        'workers': used,
+        'elapsed': time.perf_counter() - started,
+    }
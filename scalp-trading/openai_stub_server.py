@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# openai_stub_server.py
+# Local stand-in for the OpenAI chat completions API that streams a canned answer as server-sent events
+
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned answer shared with the benchmarks
+CANNED_COMPLETION = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_fixtures', 'openai_chat_completion.json')
+
+PLAIN_TEXT_ANSWER = ("The setup looks reasonable but momentum is fading on the 15m chart. "
+                     "Consider waiting for a retest of support before entering.")
+
+def load_answer(mode):
+    """Answer text for a mode: json (as the model should reply), fenced (```json block) or text (not JSON)"""
+    if mode == 'text':
+        return PLAIN_TEXT_ANSWER
+    with open(CANNED_COMPLETION) as f:
+        content = json.load(f)['choices'][0]['message']['content']
+    return f"```json\n{content}\n```" if mode == 'fenced' else content
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the stream can use chunked transfer encoding like the real API
+    protocol_version = 'HTTP/1.1'
+    answer = ''
+    chunk_chars = 8
+    chunk_delay = 0.02
+    first_token_delay = 0.3
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != '/v1/chat/completions':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(self.first_token_delay)
+
+        if not body.get('stream'):
+            data = json.dumps({'object': 'chat.completion', 'choices': [
+                {'index': 0, 'message': {'role': 'assistant', 'content': self.answer}, 'finish_reason': 'stop'}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i in range(0, len(self.answer), self.chunk_chars):
+            chunk = {'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': {'content': self.answer[i:i + self.chunk_chars]}, 'finish_reason': None}]}
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(self.chunk_delay)
+        done = {'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        self.write_chunk(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help'):
+        print("Usage: python openai_stub_server.py [port] [--mode json|fenced|text] [--chunk N] [--delay SEC] [--first-token SEC]")
+        print("  port: listen port (default 8090)")
+        print("  --mode: answer as plain JSON (default), inside a ```json fence, or as non-JSON text")
+        print("  --chunk N: characters per streamed event (default 8)")
+        print("  --delay SEC: pause between events (default 0.02)")
+        print("  --first-token SEC: pause before the first event (default 0.3)")
+        print()
+        print("Then run: OPENAI_CHAT_URL=http://127.0.0.1:8090/v1/chat/completions python trading_strategy.py SOL 190 180 1000 --ai")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8090
+    mode = get_flag_value('--mode', 'json')
+    StubHandler.answer = load_answer(mode)
+    StubHandler.chunk_chars = int(get_flag_value('--chunk', 8))
+    StubHandler.chunk_delay = float(get_flag_value('--delay', 0.02))
+    StubHandler.first_token_delay = float(get_flag_value('--first-token', 0.3))
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    print(f"OpenAI stub on http://127.0.0.1:{port}/v1/chat/completions | {mode} answer in "
+          f"{StubHandler.chunk_chars}-character events every {StubHandler.chunk_delay}s", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# order_book.py
+# Order book snapshot with cumulative depth arrays for VWAP fill and slippage estimates
+
+import numpy as np
+
+class BookSide:
+    """
+    One side of a depth snapshot, best level first.
+
+    cum_qty / cum_quote hold the base and quote amounts available up to and
+    including each level, with a leading zero, so the level an order reaches
+    is a binary search away and any number of order sizes can be priced
+    against one snapshot.
+    """
+
+    __slots__ = ('prices', 'cum_qty', 'cum_quote')
+
+    def __init__(self, prices, quantities):
+        self.prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        self.cum_qty = np.concatenate(([0.0], np.cumsum(quantities)))
+        self.cum_quote = np.concatenate(([0.0], np.cumsum(self.prices * quantities)))
+
+    @classmethod
+    def from_levels(cls, levels):
+        """Build from a [[price, qty], ...] list as returned by /api/v3/depth"""
+        if not levels:
+            return cls([], [])
+        prices, quantities = np.array(levels, dtype=np.float64).T
+        return cls(prices, quantities)
+
+    def __len__(self):
+        return len(self.prices)
+
+    @property
+    def best(self):
+        return self.prices[0] if len(self) else np.nan
+
+    @property
+    def total_quote(self):
+        return self.cum_quote[-1]
+
+    def _level(self, cum, amount):
+        """Level each amount ends in, and whether the snapshot is deep enough for it"""
+        i = np.searchsorted(cum, amount, side='left')  # cum[i - 1] < amount <= cum[i]
+        return np.clip(i - 1, 0, len(self) - 1), i <= len(self)
+
+    def vwap_for_quote(self, quote):
+        """Average fill price spending `quote` (e.g. USDT) into this side; NaN beyond the snapshot's depth"""
+        quote = np.asarray(quote, dtype=np.float64)
+        if not len(self):
+            return np.full(quote.shape, np.nan)
+        level, deep = self._level(self.cum_quote, quote)
+        qty = self.cum_qty[level] + (quote - self.cum_quote[level]) / self.prices[level]
+        vwap = np.divide(quote, qty, out=np.full(quote.shape, self.best), where=quote > 0)
+        return np.where(deep, vwap, np.nan)
+
+    def vwap_for_base(self, qty):
+        """Average fill price trading `qty` base units against this side; NaN beyond the snapshot's depth"""
+        qty = np.asarray(qty, dtype=np.float64)
+        if not len(self):
+            return np.full(qty.shape, np.nan)
+        level, deep = self._level(self.cum_qty, qty)
+        quote = self.cum_quote[level] + (qty - self.cum_qty[level]) * self.prices[level]
+        vwap = np.divide(quote, qty, out=np.full(qty.shape, self.best), where=qty > 0)
+        return np.where(deep, vwap, np.nan)
+
+class OrderBook:
+    """Bid and ask sides of one /api/v3/depth snapshot"""
+
+    __slots__ = ('bids', 'asks')
+
+    def __init__(self, bids, asks):
+        self.bids = bids
+        self.asks = asks
+
+    @classmethod
+    def from_depth(cls, data):
+        """Build from a raw /api/v3/depth JSON payload"""
+        return cls(BookSide.from_levels(data.get('bids', [])), BookSide.from_levels(data.get('asks', [])))
+
+    @property
+    def mid(self):
+        return (self.bids.best + self.asks.best) / 2
+
+    def slippage(self, position_size, side='long'):
+        """
+        Estimated (entry, exit) slippage of a position as fractions of the mid price.
+
+        A long enters by spending `position_size` USDT into the asks and exits
+        by selling the bought quantity into the bids; a short ('short') sells
+        into the bids and buys back from the asks, so crossing the spread
+        counts too. Works on arrays of sizes; sizes deeper than the snapshot
+        give NaN. Both fractions are costs, as calc_profit expects them.
+        """
+        if side not in ('long', 'short'):
+            raise ValueError(f"side must be 'long' or 'short', not {side!r}")
+        position_size = np.asarray(position_size, dtype=np.float64)
+        mid = self.mid
+        if side == 'long':
+            entry_vwap = self.asks.vwap_for_quote(position_size)
+            exit_vwap = self.bids.vwap_for_base(position_size / entry_vwap)
+            return entry_vwap / mid - 1, 1 - exit_vwap / mid
+        entry_vwap = self.bids.vwap_for_quote(position_size)
+        exit_vwap = self.asks.vwap_for_base(position_size / entry_vwap)
+        return 1 - entry_vwap / mid, exit_vwap / mid - 1
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# price_alerts.py
+# Watch mode firing TP/SL alerts for a watchlist of positions, using per-symbol sorted level indexes
+
+import json
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+import numpy as np
+
+import profiler
+from binance_price_calc import (colorize_negative, colorize_positive, get_current_prices, get_flag_value,
+                                read_watchlist)
+from scalp_calc import calc_profit, format_currency
+
+# Seconds between REST price polls
+POLL_INTERVAL = 1.0
+
+# Level kinds, in the order a row lists them
+TAKE_PROFIT, STOP_LOSS = 0, 1
+LEVEL_TITLES = ('TAKE PROFIT', 'STOP LOSS')
+
+class LevelIndex:
+    """
+    Trigger levels of one symbol, sorted by price.
+
+    The levels crossed by a move from `previous` to `price` form one
+    contiguous run of the sorted list, found with two bisections, so a tick
+    costs O(log n + hits) however many levels are watched. Levels of closed
+    positions are skipped and compacted away once they make up half the list.
+    """
+
+    def __init__(self, prices, positions, kinds):
+        order = np.argsort(prices, kind='stable')
+        self.prices = np.asarray(prices, dtype=np.float64)[order].tolist()
+        self.positions = np.asarray(positions, dtype=np.int64)[order].tolist()
+        self.kinds = np.asarray(kinds, dtype=np.int8)[order].tolist()
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.prices)
+
+    def crossed(self, previous, price):
+        """Indexes of the levels crossed moving from previous to price, nearest to previous first"""
+        if price > previous:
+            # previous < level <= price
+            return range(bisect_right(self.prices, previous), bisect_right(self.prices, price))
+        # price <= level < previous
+        return range(bisect_left(self.prices, previous) - 1, bisect_left(self.prices, price) - 1, -1)
+
+    def compact(self, active):
+        """Drop levels of positions no longer active"""
+        keep = [i for i, position in enumerate(self.positions) if active[position]]
+        self.prices = [self.prices[i] for i in keep]
+        self.positions = [self.positions[i] for i in keep]
+        self.kinds = [self.kinds[i] for i in keep]
+        self.dead = 0
+
+class AlertEngine:
+    """
+    Positions from token,tp,sl,size rows, each closed by whichever of its TP
+    or SL level the price crosses first. The first price seen for a symbol
+    is used as the entry of its positions, like batch mode.
+    """
+
+    def __init__(self, rows, use_bnb=False):
+        self.rows = rows
+        self.use_bnb = use_bnb
+        self.active = [True] * len(rows)
+        self.entry = {}
+        self.last = {}
+        self.ticks = 0
+
+        by_symbol = {}
+        for position, (token, take_profit, stop_loss, _) in enumerate(rows):
+            levels = by_symbol.setdefault(f"{token}USDT", ([], [], []))
+            for kind, level in ((TAKE_PROFIT, take_profit), (STOP_LOSS, stop_loss)):
+                levels[0].append(level)
+                levels[1].append(position)
+                levels[2].append(kind)
+        self.indexes = {symbol: LevelIndex(*levels) for symbol, levels in by_symbol.items()}
+
+    @property
+    def symbols(self):
+        return sorted(self.indexes)
+
+    def open_positions(self):
+        return sum(self.active)
+
+    def on_price(self, symbol, price, timestamp=None):
+        """Feed one price, returning the alerts it triggers"""
+        index = self.indexes.get(symbol)
+        if index is None:
+            return []
+        self.ticks += 1
+        previous = self.last.get(symbol)
+        self.last[symbol] = price
+        if previous is None:
+            self.entry[symbol] = price
+            return []
+        if price == previous:
+            return []
+
+        alerts = []
+        for i in index.crossed(previous, price):
+            position = index.positions[i]
+            if not self.active[position]:
+                continue
+            self.active[position] = False
+            index.dead += 2  # both levels of the position
+            alerts.append(self.alert(symbol, position, index.kinds[i], index.prices[i], price, timestamp))
+
+        if index.dead * 2 > len(index):
+            index.compact(self.active)
+        return alerts
+
+    def alert(self, symbol, position, kind, level, price, timestamp):
+        token, take_profit, stop_loss, size = self.rows[position]
+        entry = self.entry[symbol]
+        result = calc_profit(entry, level, size, use_bnb_discount=self.use_bnb)
+        return {
+            'time': timestamp if timestamp is not None else int(time.time() * 1000),
+            'token': token,
+            'level': LEVEL_TITLES[kind],
+            'trigger': level,
+            'price': price,
+            'entry': entry,
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'position_size': size,
+            **result,
+        }
+
+def format_alert(alert):
+    """One colored alert line"""
+    clock = datetime.fromtimestamp(alert['time'] / 1000).strftime('%H:%M:%S')
+    values = (f"{alert['token']} {alert['level']} {alert['trigger']:.4f} (price {alert['price']:.4f}, entry {alert['entry']:.4f}) "
+              f"| {alert['price_change']:.2f}% | Net: {format_currency(alert['net_amount'])}")
+    colorize = colorize_positive if alert['net_amount'] >= 0 else colorize_negative
+    return f"🔔 {clock} {colorize(values)}"
+
+def print_alerts(alerts, output_format='text'):
+    for alert in alerts:
+        print(json.dumps(alert) if output_format == 'jsonl' else format_alert(alert), flush=True)
+
+def poll_prices(engine, interval, output_format):
+    """Feed the engine from one REST request per interval covering every symbol"""
+    tokens = [symbol[:-4] for symbol in engine.symbols]
+    while engine.open_positions():
+        started = time.monotonic()
+        prices = get_current_prices(tokens)
+        now = int(time.time() * 1000)
+        for token, price in prices.items():
+            print_alerts(engine.on_price(f"{token}USDT", price, now), output_format)
+        time.sleep(max(interval - (time.monotonic() - started), 0))
+
+def stream_prices(engine, output_format, use_book=False):
+    """Feed the engine every tick of the combined WebSocket stream (or ws_replay_server.py)"""
+    import asyncio
+    import websockets
+    from price_stream import combined_stream_url, parse_symbol_tick
+
+    async def watch():
+        url = combined_stream_url([symbol[:-4] for symbol in engine.symbols], 'bookTicker' if use_book else 'trade')
+        async with websockets.connect(url) as ws:
+            async for message in ws:
+                tick = parse_symbol_tick(message)
+                if tick is None:
+                    continue
+                print_alerts(engine.on_price(*tick), output_format)
+                if not engine.open_positions():
+                    return
+
+    asyncio.run(watch())
+
+def replay_prices(engine, path, output_format):
+    """Feed the engine recorded stream messages (as written by --stream --record) as fast as possible"""
+    from price_stream import parse_symbol_tick
+
+    with open(path) as f:
+        for line in f:
+            tick = parse_symbol_tick(line)
+            if tick is None:
+                continue
+            print_alerts(engine.on_price(*tick), output_format)
+
+def main():
+    """Main function to watch a watchlist and print alerts as levels are crossed"""
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print("Usage: python price_alerts.py <watchlist|-> [--poll SEC] [--stream [--book]] [--replay file] [--bnb] [--format text|jsonl]")
+        print("  watchlist: token,tp,sl,size rows (as for binance_price_calc.py --batch), - for stdin")
+        print(f"  --poll SEC: fetch all prices with one REST request every SEC seconds (default, {POLL_INTERVAL}s)")
+        print("  --stream: follow every trade of the combined WebSocket stream instead")
+        print("    --book: use the bookTicker mid price instead of trades")
+        print("  --replay file: feed recorded stream messages (--stream --record) as fast as possible")
+        print("  --bnb: use BNB discount fee rate")
+        print("  --format: text (default) or jsonl")
+        print("The first price seen for a token is the entry of its positions; each position alerts once.")
+        sys.exit(1)
+
+    source = sys.argv[1]
+    output_format = get_flag_value('--format', 'text')
+    if output_format not in ('text', 'jsonl'):
+        print(f"Unknown format '{output_format}', choose from: text, jsonl")
+        sys.exit(1)
+
+    if source == '-':
+        rows = read_watchlist(sys.stdin)
+    else:
+        with open(source, newline='') as f:
+            rows = read_watchlist(f)
+    if not rows:
+        print("No positions to watch")
+        sys.exit(1)
+
+    with profiler.span('alerts.index', positions=len(rows)):
+        engine = AlertEngine(rows, use_bnb="--bnb" in sys.argv)
+    print(f"Watching {len(rows)} positions ({2 * len(rows)} levels) on {len(engine.symbols)} symbols", file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        if "--replay" in sys.argv:
+            replay_prices(engine, get_flag_value('--replay'), output_format)
+        elif "--stream" in sys.argv:
+            stream_prices(engine, output_format, use_book="--book" in sys.argv)
+        else:
+            poll_prices(engine, float(get_flag_value('--poll', POLL_INTERVAL)), output_format)
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = time.perf_counter() - started
+    closed = len(rows) - engine.open_positions()
+    print(f"{engine.ticks} ticks in {elapsed:.2f}s | {closed} alerts | {engine.open_positions()} positions still open",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    with profiler.profiled('price_alerts'):
+        main()
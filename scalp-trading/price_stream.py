@@ -0,0 +1,103 @@
+# price_stream.py
+# Binance WebSocket price stream with change detection and coalesced refreshes
+
+import asyncio
+import json
+import os
+
+import websockets
+
+# Base URL for raw streams (point at ws_replay_server.py for offline testing)
+BINANCE_WS_URL = os.getenv('BINANCE_WS_URL', 'wss://stream.binance.com:9443/ws')
+
+# Minimum seconds between two refreshes, bursts in between are coalesced to the latest price
+STREAM_REFRESH_INTERVAL = 0.25
+
+def stream_url(symbol, stream='trade'):
+    """Raw stream URL for a USDT pair, stream is 'trade' or 'bookTicker'"""
+    return f"{BINANCE_WS_URL.rstrip('/')}/{symbol.lower()}usdt@{stream}"
+
+def combined_stream_url(symbols, stream='trade'):
+    """Combined stream URL for several USDT pairs; messages arrive wrapped as {'stream': ..., 'data': ...}"""
+    base = BINANCE_WS_URL.rstrip('/')
+    if base.endswith('/ws'):
+        base = base[:-3]
+    return f"{base}/stream?streams=" + '/'.join(f"{symbol.lower()}usdt@{stream}" for symbol in symbols)
+
+def decode_tick(message):
+    """Decoded payload of a stream message (unwrapping combined streams), None if it is not an object"""
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    data = data.get('data', data)  # combined stream wrapper
+    return data if isinstance(data, dict) else None
+
+def tick_price(data):
+    """Price of a decoded trade or bookTicker payload, None for anything else"""
+    try:
+        if 'p' in data:  # trade
+            return float(data['p'])
+        if 'b' in data and 'a' in data:  # bookTicker, use the mid price
+            return (float(data['b']) + float(data['a'])) / 2
+    except (TypeError, ValueError):
+        return None
+    return None
+
+def parse_tick(message):
+    """Extract a price from a trade or bookTicker message, None for anything else"""
+    data = decode_tick(message)
+    return tick_price(data) if data is not None else None
+
+def parse_symbol_tick(message):
+    """
+    Extract (symbol, price, event time ms or None) from a trade or bookTicker
+    message, None for anything else
+    """
+    data = decode_tick(message)
+    if data is None or not isinstance(data.get('s'), str):
+        return None
+    price = tick_price(data)
+    return (data['s'], price, data.get('E') or data.get('T')) if price is not None else None
+
+async def watch_price(url, on_price, refresh_interval=STREAM_REFRESH_INTERVAL, record=None):
+    """
+    Call on_price(price) whenever the streamed price changes, at most once per
+    refresh_interval. Returns when the server closes the stream.
+
+    If record is an open text file, every raw message is appended to it so the
+    session can be replayed later with ws_replay_server.py.
+    """
+    latest = None
+    shown = None
+    changed = asyncio.Event()
+
+    async def refresh():
+        nonlocal shown
+        while True:
+            await changed.wait()
+            changed.clear()
+            if latest != shown:
+                shown = latest
+                on_price(latest)
+                await asyncio.sleep(refresh_interval)
+
+    refresher = asyncio.create_task(refresh())
+    try:
+        async with websockets.connect(url) as ws:
+            async for message in ws:
+                if isinstance(message, bytes):
+                    message = message.decode()
+                if record:
+                    record.write(message + '\n')
+                price = parse_tick(message)
+                if price is not None and price != latest:
+                    latest = price
+                    changed.set()
+    finally:
+        refresher.cancel()
+        # Show the last price of a burst that arrived inside the final refresh window
+        if latest is not None and latest != shown:
+            on_price(latest)
@@ -0,0 +1,212 @@
+# profiler.py
+# Named timing spans for the hot paths, exported as Chrome trace JSON and in-process metrics
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Default output of --profile when no file is given; open it in chrome://tracing or ui.perfetto.dev
+PROFILE_TRACE_PATH = 'scalp-trace.json'
+
+_local = threading.local()
+_lock = threading.Lock()
+_origin_ns = time.perf_counter_ns()
+
+# Raw trace events are only kept while tracing, metrics are always aggregated
+_tracing = False
+_events = []
+_thread_names = {}
+_metrics = {}
+
+# Span annotations added up across calls, and categorical ones kept per call
+# (a retried or hedged request records e.g. status [503, 200])
+COUNTER_ANNOTATIONS = ('bytes', 'requests', 'retries', 'hedged')
+LIST_ANNOTATIONS = ('status',)
+
+def start_tracing():
+    """Start recording individual span events (cleared on each start)"""
+    global _tracing
+    with _lock:
+        _tracing = True
+        _events.clear()
+        _thread_names.clear()
+
+def stop_tracing():
+    global _tracing
+    with _lock:
+        _tracing = False
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+@contextmanager
+def span(name, **args):
+    """
+    Time a named phase. Yields the span's args dict, which callers and the
+    HTTP response hook may annotate (e.g. bytes, retries, cache_hit).
+    """
+    stack = _stack()
+    stack.append(args)
+    started = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter_ns() - started
+        stack.pop()
+        _record(name, started, duration, args)
+
+def current_span():
+    """Args dict of this thread's innermost open span, or None"""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+@contextmanager
+def attached(args):
+    """Make annotations from this (worker) thread land on a span opened by another thread"""
+    if args is None:
+        yield
+        return
+    stack = _stack()
+    stack.append(args)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+def annotate(**values):
+    """
+    Add values to the innermost open span of this thread: COUNTER_ANNOTATIONS
+    are summed, LIST_ANNOTATIONS collect every value in order, others are set.
+    """
+    stack = _stack()
+    if not stack:
+        return
+    args = stack[-1]
+    with _lock:
+        for key, value in values.items():
+            if key in COUNTER_ANNOTATIONS:
+                args[key] = args.get(key, 0) + value
+            elif key in LIST_ANNOTATIONS:
+                args.setdefault(key, []).append(value)
+            else:
+                args[key] = value
+
+def _accumulate(table, name, ms, args):
+    metric = table.get(name)
+    if metric is None:
+        metric = table[name] = {'count': 0, 'total_ms': 0.0, 'min_ms': ms, 'max_ms': ms,
+                                'bytes': 0, 'requests': 0, 'retries': 0, 'hedged': 0, 'errors': 0}
+    metric['count'] += 1
+    metric['total_ms'] += ms
+    metric['min_ms'] = min(metric['min_ms'], ms)
+    metric['max_ms'] = max(metric['max_ms'], ms)
+    metric['bytes'] += args.get('bytes', 0)
+    metric['requests'] += args.get('requests', 0)
+    metric['retries'] += args.get('retries', 0)
+    metric['hedged'] += args.get('hedged', 0)
+    metric['errors'] += 'error' in args
+
+def _record(name, started, duration, args):
+    with _lock:
+        _accumulate(_metrics, name, duration / 1e6, args)
+        if _tracing:
+            thread = threading.current_thread()
+            _thread_names[thread.ident] = thread.name
+            _events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': (started - _origin_ns) / 1000,
+                'dur': duration / 1000,
+                'pid': os.getpid(),
+                'tid': thread.ident,
+                'args': dict(args),
+            })
+
+def response_hook(response, *args, **kwargs):
+    """requests response hook adding bytes, request and retry counts to the current span"""
+    if kwargs.get('stream'):
+        # Reading the body here would consume the stream, count what the server announced
+        size = int(response.headers.get('Content-Length', 0) or 0)
+    else:
+        size = len(response.content)
+    retries = getattr(getattr(response.raw, 'retries', None), 'history', ())
+    annotate(bytes=size, requests=1, retries=len(retries), status=response.status_code)
+
+def instrument(session):
+    """Report every response of a requests session to the enclosing span"""
+    if response_hook not in session.hooks['response']:
+        session.hooks['response'].append(response_hook)
+    return session
+
+def metrics():
+    """Snapshot of the aggregated per-span metrics: {name: {count, total_ms, min_ms, max_ms, bytes, ...}}"""
+    with _lock:
+        return {name: dict(metric) for name, metric in _metrics.items()}
+
+def reset_metrics():
+    with _lock:
+        _metrics.clear()
+
+def trace_metrics():
+    """Metrics of the spans recorded since start_tracing, in the same shape as metrics()"""
+    table = {}
+    with _lock:
+        for event in _events:
+            _accumulate(table, event['name'], event['dur'] / 1000, event['args'])
+    return table
+
+def chrome_trace():
+    """Recorded events in Chrome trace event format"""
+    with _lock:
+        names = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                 for tid, name in _thread_names.items()]
+        return {'traceEvents': names + list(_events), 'displayTimeUnit': 'ms'}
+
+def write_trace(path):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(), f)
+
+def format_metrics(snapshot=None):
+    """Per-span summary table, slowest total first"""
+    snapshot = metrics() if snapshot is None else snapshot
+    lines = [f"{'span':<24} {'count':>6} {'total ms':>10} {'max ms':>9} {'bytes':>10} {'retries':>7} {'hedged':>6}"]
+    for name, metric in sorted(snapshot.items(), key=lambda item: -item[1]['total_ms']):
+        lines.append(f"{name:<24} {metric['count']:>6} {metric['total_ms']:>10.1f} {metric['max_ms']:>9.1f} "
+                     f"{metric['bytes']:>10} {metric['retries']:>7} {metric.get('hedged', 0):>6}")
+    return "\n".join(lines)
+
+@contextmanager
+def profiled(name, argv=None):
+    """
+    Wrap a script's main(): always aggregates metrics under `name`, and with
+    --profile [file] in argv also records a Chrome trace, writes it to the file
+    and prints this run's per-span summary to stderr when it ends (including sys.exit).
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = "--profile" in argv
+    path = PROFILE_TRACE_PATH
+    if enabled:
+        index = argv.index("--profile")
+        if index + 1 < len(argv) and not argv[index + 1].startswith('--'):
+            path = argv[index + 1]
+        start_tracing()
+    try:
+        with span(name):
+            yield
+    finally:
+        if enabled:
+            stop_tracing()
+            write_trace(path)
+            # stderr keeps csv/jsonl output on stdout machine-readable
+            print(file=sys.stderr)
+            print(format_metrics(trace_metrics()), file=sys.stderr)
+            print(f"Trace written to {path}", file=sys.stderr)
@@ -0,0 +1,124 @@
+# resample.py
+# Derive higher-timeframe klines from a finer series with Binance's bucket alignment
+
+import threading
+
+import numpy as np
+
+from candles import Candles
+from kline_cache import INTERVAL_MS, MAX_KLINES_PER_REQUEST
+
+# Finer interval each timeframe can be built from
+RESAMPLE_SOURCES = {
+    '15m': '1m',
+    '1h': '15m',
+    '1w': '1d',
+    '1M': '1d',
+}
+
+# Binance weeks open on Monday 00:00 UTC; the epoch was a Thursday
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+# Closed buckets kept per derived series
+MAX_MEMO_BUCKETS = 5000
+
+def bucket_start(timestamps, interval):
+    """Open time of the `interval` kline containing each millisecond timestamp (UTC, as Binance aligns them)"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if interval == '1M':
+        return timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    step = INTERVAL_MS[interval]
+    if interval == '1w':
+        return timestamps - (timestamps - WEEK_OFFSET_MS) % step
+    if 86_400_000 % step:
+        raise ValueError(f"Cannot align {interval} buckets")
+    return timestamps - timestamps % step
+
+def aggregate(candles, interval):
+    """
+    OHLCV of every `interval` bucket the candles fall in. A first bucket the
+    candles only partly cover is dropped; the last one may still be forming.
+    """
+    if not len(candles):
+        return Candles.empty()
+    starts = bucket_start(candles.timestamp, interval)
+    first = np.flatnonzero(np.concatenate(([True], starts[1:] != starts[:-1])))
+    last = np.concatenate((first[1:], [len(candles)])) - 1
+    buckets = Candles(starts[first], candles.open[first], np.maximum.reduceat(candles.high, first),
+                      np.minimum.reduceat(candles.low, first), candles.close[last], np.add.reduceat(candles.volume, first))
+    return buckets[1:] if candles.timestamp[0] != starts[0] else buckets
+
+class Resampler:
+    """
+    Incrementally derived `interval` series. Closed buckets are kept between
+    updates, so a new source series only aggregates from the newest bucket on.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.closed = Candles.empty()
+        self.lock = threading.Lock()
+
+    def update(self, source):
+        """Return the derived series for the source candles (oldest first, last bucket possibly open)"""
+        with self.lock:
+            start = 0
+            if len(self.closed) and len(source):
+                # Resume at the first source candle past the last closed bucket
+                starts = bucket_start(source.timestamp, self.interval)
+                start = int(np.searchsorted(starts, self.closed.timestamp[-1], side='right'))
+                if start == 0 or (start < len(source) and source.timestamp[start] != starts[start]):
+                    self.closed = Candles.empty()  # source does not continue the memo, start over
+                    start = 0
+            elif len(self.closed):
+                return self.closed[:]
+
+            fresh = aggregate(source[start:], self.interval)
+            if not len(fresh):
+                return self.closed[:]
+            # Everything but the newest bucket is complete
+            self.closed = Candles.concat([self.closed, fresh[:-1]])[-MAX_MEMO_BUCKETS:]
+            return Candles.concat([self.closed, fresh[-1:]])
+
+_resamplers = {}
+_resamplers_lock = threading.Lock()
+
+def resampler(symbol, source, interval):
+    """Shared Resampler for one symbol's source -> interval series"""
+    with _resamplers_lock:
+        key = (symbol, source, interval)
+        if key not in _resamplers:
+            _resamplers[key] = Resampler(interval)
+        return _resamplers[key]
+
+def source_limit(interval, source, limit):
+    """Source candles needed for `limit` buckets, with one extra bucket since the first is usually partial"""
+    ratio = -(-INTERVAL_MS[interval] // INTERVAL_MS[source])
+    return (limit + 1) * ratio
+
+def plan_fetches(timeframes):
+    """
+    Split (interval, limit) timeframes into the klines to fetch and the ones to derive.
+
+    An interval is derived when its source fits in one request, and the
+    source's own requirement grows accordingly. Returns ({interval: limit}
+    to fetch, [(interval, source), ...] to derive, finest first).
+    """
+    needed = {}
+    for interval, limit in timeframes:
+        needed[interval] = max(needed.get(interval, 0), limit)
+
+    derived = []
+    # Coarsest first, so a derived interval's requirement lands on its source before the source is planned
+    for interval in sorted(INTERVAL_MS, key=INTERVAL_MS.get, reverse=True):
+        source = RESAMPLE_SOURCES.get(interval)
+        if interval not in needed or source is None:
+            continue
+        limit = source_limit(interval, source, needed[interval])
+        if max(limit, needed.get(source, 0)) > MAX_KLINES_PER_REQUEST:
+            continue
+        needed[source] = max(limit, needed.get(source, 0))
+        derived.append((interval, source))
+        del needed[interval]
+
+    return needed, derived[::-1]
@@ -31,9 +31,13 @@ def colorize_negative(s):
     # fallback to bright ANSI
     return f"{BOLD}\033[91m{s}{RESET}"
 
-def calc_profit(entry, exit, position_size, use_bnb_discount=False, leverage=1):
+def calc_profit(entry, exit, position_size, use_bnb_discount=False, leverage=1, slippage=None):
     """
     Calculate profit/loss for a trade
+
+    slippage: optional (entry, exit) fill slippage as fractions of price, e.g.
+    from OrderBook.slippage; its cost is reported and taken off the net amount.
+    A negative leverage is a short, so its fills move the other way.
     """
     # Determine fee rate based on BNB discount
     fee_rate = BINANCE_BNB_FEE if use_bnb_discount else BINANCE_NORMAL_FEE
@@ -44,13 +48,130 @@ def calc_profit(entry, exit, position_size, use_bnb_discount=False, leverage=1):
     total_fees = position_size * fee_rate
     net_profit = gross_profit - total_fees
     
-    return {
+    result = {
         "price_change": round(price_change_pct * 100, 3),
         "gross_amount": round(gross_profit, 2),
         "fees": round(total_fees, 2),
         "net_amount": round(net_profit, 2)
     }
 
+    if slippage is not None:
+        # A long buys above the entry and sells below the exit, a short sells below the entry
+        # and buys back above the exit, so slippage is always a cost
+        side = 1 if leverage >= 0 else -1
+        entry_fill = entry * (1 + side * slippage[0])
+        exit_fill = exit * (1 - side * slippage[1])
+        slippage_cost = gross_profit - position_size * (exit_fill - entry_fill) / entry_fill * leverage
+        result["slippage"] = round(float(slippage_cost), 2)
+        result["net_amount"] = round(float(net_profit - slippage_cost), 2)
+
+    return result
+
+# Field layout of calc_profit_grid results (same keys as the calc_profit dict)
+PROFIT_FIELDS = ("price_change", "gross_amount", "fees", "net_amount")
+
+def round_like_builtin(values, ndigits):
+    """
+    Round an array (or 0-d value) exactly like Python's round().
+
+    np.round scales by 10**ndigits first, which can tip values sitting on a
+    .5 boundary the other way, so those few entries are rounded with round().
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    flat = np.atleast_1d(values)
+    rounded = np.round(flat, ndigits)
+    scaled = flat * 10 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(v, ndigits) for v in flat[near_tie].tolist()]
+    return rounded.reshape(values.shape)
+
+def calc_profit_grid(entry, exit, position_size, use_bnb_discount=False, leverage=1, slippage=None):
+    """
+    Vectorized calc_profit over arrays of inputs.
+
+    entry, exit, position_size, leverage and the slippage pair broadcast
+    against each other, so e.g. exit[:, None] with position_size[None, :]
+    gives an exit x size grid. Returns a structured array with the
+    calc_profit fields, identical to calling calc_profit on every element.
+    """
+    # NumPy is only needed here, keep the plain calculator startup light
+    import numpy as np
+
+    fee_rate = BINANCE_BNB_FEE if use_bnb_discount else BINANCE_NORMAL_FEE
+
+    entry, exit, position_size, leverage = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (entry, exit, position_size, leverage))
+    )
+
+    price_change_pct = (exit - entry) / entry
+    gross_pct = price_change_pct * leverage
+    gross_profit = position_size * gross_pct
+    total_fees = position_size * fee_rate
+    net_profit = gross_profit - total_fees
+
+    fields = PROFIT_FIELDS if slippage is None else PROFIT_FIELDS + ("slippage",)
+    result = np.empty(entry.shape, dtype=[(field, np.float64) for field in fields])
+    result["price_change"] = round_like_builtin(price_change_pct * 100, 3)
+    result["gross_amount"] = round_like_builtin(gross_profit, 2)
+    result["fees"] = round_like_builtin(total_fees, 2)
+
+    if slippage is not None:
+        side = np.where(leverage >= 0, 1.0, -1.0)
+        entry_fill = entry * (1 + side * np.asarray(slippage[0], dtype=np.float64))
+        exit_fill = exit * (1 - side * np.asarray(slippage[1], dtype=np.float64))
+        slippage_cost = gross_profit - position_size * (exit_fill - entry_fill) / entry_fill * leverage
+        result["slippage"] = round_like_builtin(slippage_cost, 2)
+        net_profit = net_profit - slippage_cost
+
+    result["net_amount"] = round_like_builtin(net_profit, 2)
+    return result
+
+# Grid mode layout: exit price rows between TP and SL, position size multiplier columns
+GRID_ROWS = 9
+GRID_SIZE_MULTIPLIERS = (0.25, 0.5, 1, 2, 4)
+
+def heat_colorize(s, value, max_abs):
+    """Colorize a grid cell with intensity proportional to |value|"""
+    if not supports_truecolor() or max_abs == 0:
+        return colorize_positive(s) if value >= 0 else colorize_negative(s)
+    level = 80 + int(175 * min(abs(value) / max_abs, 1))
+    color = rgb(0, level, 0) if value >= 0 else rgb(level, 0, 0)
+    return f"{BOLD}{color}{s}{RESET}"
+
+def print_grid(entry, take_profit, stop_loss, position_size, use_bnb_discount=False, book=None, rules=None):
+    """
+    Print a heatmap-style net P&L table of exit prices (TP..SL) x position sizes.
+    With an OrderBook, each size includes its own estimated slippage. With
+    SymbolRules, exits are snapped to the tick size, sizes to what a whole
+    number of lots costs, and orders Binance would reject show as n/a.
+    """
+    import numpy as np
+
+    exits = np.linspace(take_profit, stop_loss, GRID_ROWS)
+    sizes = position_size * np.array(GRID_SIZE_MULTIPLIERS)
+    rejected = False
+    if rules is not None:
+        from exchange_rules import normalize
+
+        order = normalize(rules, entry, exits[:, None], sizes[None, :])
+        exits, sizes, rejected = order['exit'][:, 0], order['position_size'][0], order['problems'] != 0
+    slippage = None
+    if book is not None:
+        entry_slippage, exit_slippage = book.slippage(sizes)
+        slippage = (entry_slippage[None, :], exit_slippage[None, :])
+    grid = calc_profit_grid(entry, exits[:, None], sizes[None, :], use_bnb_discount=use_bnb_discount, slippage=slippage)
+    net = np.where(rejected, np.nan, grid["net_amount"])
+    max_abs = float(np.nanmax(np.abs(net))) if not np.isnan(net).all() else 0.0
+
+    print(f"{'Exit':>12} {'Change':>8} " + " ".join(f"{format_currency(size):>11}" for size in sizes))
+    for exit_price, row, row_net in zip(exits, grid, net):
+        change = f"{row['price_change'][0]:>7.2f}%"
+        # Sizes deeper than the order book snapshot (or rejected by the exchange) have no estimate
+        cells = " ".join(f"{'n/a':>11}" if np.isnan(value) else heat_colorize(f"{format_currency(value):>11}", value, max_abs)
+                         for value in row_net)
+        print(f"{exit_price:>12.4f} {change} {cells}")
 
 def format_currency(value):
     """Format value as currency with dollar sign"""
@@ -67,15 +188,17 @@ def print_scenario(title, result):
 
     print(f"{colorized_title:<12}: {colorized_values}")
 
-if __name__ == "__main__":
+def main():
+    """Main function to handle command line arguments and calculations"""
     # Get all parameters from command line arguments
     if len(sys.argv) < 5:
-        print("Usage: python scalp_calc.py <entry_price> <take_profit> <stop_loss> <position_size> [--bnb]")
+        print("Usage: python scalp_calc.py <entry_price> <take_profit> <stop_loss> <position_size> [--bnb] [--grid]")
         print("  entry_price: your entry price")
         print("  take_profit: take profit exit price")
         print("  stop_loss: stop loss exit price")
         print("  position_size: USD size of position")
         print("  --bnb: use BNB discount fee rate (optional)")
+        print("  --grid: print net P&L heatmap of exit prices x position sizes (optional)")
         sys.exit(1)
     
     entry = float(sys.argv[1])
@@ -83,6 +206,7 @@ if __name__ == "__main__":
     stop_loss = float(sys.argv[3])
     position_size = float(sys.argv[4])
     use_bnb = "--bnb" in sys.argv
+    use_grid = "--grid" in sys.argv
     
     # Calculate profit scenario
     profit_result = calc_profit(entry, take_profit, position_size, use_bnb_discount=use_bnb, leverage=1)
@@ -92,3 +216,10 @@ if __name__ == "__main__":
 
     print_scenario("TAKE PROFIT", profit_result)
     print_scenario("STOP LOSS", loss_result)
+
+    if use_grid:
+        print()
+        print_grid(entry, take_profit, stop_loss, position_size, use_bnb_discount=use_bnb)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# scalp_client.py
+# Thin client forwarding CLI calls to scalp_daemon.py, falls back to running the script in-process
+
+# Only stdlib modules that load in a few milliseconds; the scripts themselves are imported lazily
+import json
+import os
+import socket
+import sys
+
+# Socket path shared with scalp_daemon.py
+DAEMON_SOCKET = os.getenv('SCALP_DAEMON_SOCKET', os.path.expanduser('~/.cache/trading-scripts/daemon.sock'))
+
+SCRIPTS = ('scalp_calc', 'binance_price_calc', 'trading_strategy')
+
+# Environment that affects output formatting, passed along with each request
+FORWARDED_ENV = ('COLORTERM',)
+
+def needs_terminal(argv):
+    """Runs that read the keyboard or stdin, or redraw the terminal, stay in this process"""
+    if "--manual" in argv or "--stream" in argv:
+        return True
+    if "--batch" in argv:
+        index = argv.index("--batch")
+        source = argv[index + 1] if index + 1 < len(argv) else '-'
+        return source == '-' or source.startswith('--')
+    return False
+
+def forward(script, argv, path=None):
+    """Run the script in the daemon, streaming its output; returns the exit code or None if no daemon answers"""
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(path or DAEMON_SOCKET)
+    except OSError:
+        return None
+
+    with conn:
+        request = {
+            'script': script,
+            'argv': argv,
+            'env': {name: os.environ[name] for name in FORWARDED_ENV if name in os.environ},
+            'cwd': os.getcwd(),
+        }
+        conn.sendall(json.dumps(request).encode() + b'\n')
+        for line in conn.makefile('rb'):
+            message = json.loads(line)
+            if 'stdout' in message:
+                sys.stdout.write(message['stdout'])
+                sys.stdout.flush()
+            elif 'stderr' in message:
+                sys.stderr.write(message['stderr'])
+                sys.stderr.flush()
+            elif 'exit' in message:
+                return message['exit']
+
+    print("Lost connection to scalp_daemon.py", file=sys.stderr)
+    return 1
+
+def run_local(script, argv):
+    """Import only the requested script and run its main(), profiled like a daemon run"""
+    import importlib
+    import profiler
+
+    sys.argv = [f'{script}.py', *argv]
+    module = importlib.import_module(script)
+    with profiler.profiled(script, argv):
+        module.main()
+
+def main():
+    """Main function to dispatch a script run to the daemon or the local interpreter"""
+    script = os.path.basename(sys.argv[1]) if len(sys.argv) > 1 else ''
+    if script.endswith('.py'):
+        script = script[:-3]
+    if script not in SCRIPTS:
+        print("Usage: python scalp_client.py <scalp_calc|binance_price_calc|trading_strategy> [script arguments]")
+        print("  forwards the arguments to a running scalp_daemon.py, or runs the script here if none is running")
+        print("  --manual, --stream and --batch from stdin always run here")
+        sys.exit(1)
+
+    argv = sys.argv[2:]
+    if not needs_terminal(argv):
+        try:
+            code = forward(script, argv)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        if code is not None:
+            sys.exit(code)
+    run_local(script, argv)
+
+if __name__ == "__main__":
+    main()
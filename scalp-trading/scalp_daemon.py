@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# scalp_daemon.py
+# Resident process serving scalp_calc/binance_price_calc/trading_strategy runs over a Unix socket
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+import binance_price_calc
+import profiler
+import scalp_calc
+import trading_strategy
+
+# Socket path shared with scalp_client.py
+DAEMON_SOCKET = os.getenv('SCALP_DAEMON_SOCKET', os.path.expanduser('~/.cache/trading-scripts/daemon.sock'))
+
+# Scripts the daemon can run, imported once at startup
+SCRIPTS = {
+    'scalp_calc': scalp_calc,
+    'binance_price_calc': binance_price_calc,
+    'trading_strategy': trading_strategy,
+}
+
+def send_message(conn, message):
+    """Write one newline-delimited JSON message"""
+    conn.sendall(json.dumps(message).encode() + b'\n')
+
+class SocketWriter(io.TextIOBase):
+    """Text stream forwarding whole lines to the client as {'stdout'|'stderr': text} messages"""
+
+    def __init__(self, conn, stream):
+        self.conn = conn
+        self.stream = stream
+        self.buffer = ''
+        self.closed_by_peer = False
+
+    def write(self, s):
+        self.buffer += s
+        if '\n' in self.buffer or '\r' in self.buffer:
+            self.flush()
+        return len(s)
+
+    def flush(self):
+        if not self.buffer or self.closed_by_peer:
+            self.buffer = ''
+            return
+        try:
+            send_message(self.conn, {self.stream: self.buffer})
+        except OSError:
+            # Client went away (e.g. Ctrl-C), let the run finish quietly
+            self.closed_by_peer = True
+        self.buffer = ''
+
+    def isatty(self):
+        return False
+
+def exit_code(e):
+    """Process exit status sys.exit(e.code) would have produced"""
+    if e.code is None:
+        return 0
+    return e.code if isinstance(e.code, int) else 1
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, RequestHandler)
+        # Scripts read sys.argv, os.environ and the working directory, so runs take turns
+        self.run_lock = threading.Lock()
+        self.started = time.time()
+        self.served = 0
+
+    def run_script(self, script, argv, env, cwd, out, err):
+        """Run a script's main() as if invoked from the command line and return its exit code"""
+        module = SCRIPTS[script]
+        with self.run_lock:
+            saved_argv, saved_cwd = sys.argv, os.getcwd()
+            saved_env = {name: os.environ.get(name) for name in env}
+            sys.argv = [f'{script}.py', *argv]
+            os.environ.update(env)
+            try:
+                os.chdir(cwd)
+                with redirect_stdout(out), redirect_stderr(err), profiler.profiled(script, argv):
+                    module.main()
+                code = 0
+            except SystemExit as e:
+                code = exit_code(e)
+            except Exception:
+                err.write(traceback.format_exc())
+                code = 1
+            finally:
+                sys.argv = saved_argv
+                os.chdir(saved_cwd)
+                for name, value in saved_env.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+                out.flush()
+                err.flush()
+                self.served += 1
+            return code
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        command = request.get('command', 'run')
+        if command == 'status':
+            send_message(self.connection, {'pid': os.getpid(), 'uptime': time.time() - self.server.started,
+                                           'served': self.server.served})
+        elif command == 'metrics':
+            send_message(self.connection, {'metrics': profiler.metrics()})
+        elif command == 'stop':
+            send_message(self.connection, {'exit': 0})
+            threading.Thread(target=self.server.shutdown).start()
+        elif request.get('script') not in SCRIPTS:
+            send_message(self.connection, {'stderr': f"Unknown script: {request.get('script')}\n"})
+            send_message(self.connection, {'exit': 2})
+        else:
+            out = SocketWriter(self.connection, 'stdout')
+            err = SocketWriter(self.connection, 'stderr')
+            code = self.server.run_script(request['script'], request.get('argv', []), request.get('env', {}),
+                                          request.get('cwd', os.getcwd()), out, err)
+            if not out.closed_by_peer:
+                try:
+                    send_message(self.connection, {'exit': code})
+                except OSError:
+                    pass
+
+def request(message, path=None):
+    """Send a control message to a running daemon and return its reply, or None if none is running"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(path or DAEMON_SOCKET)
+            send_message(conn, message)
+            return json.loads(conn.makefile('rb').readline())
+    except (OSError, ValueError):
+        return None
+
+def warm_up():
+    """Open the Binance TLS connections up front so the first request is as fast as the rest"""
+    for client in (binance_price_calc.binance, trading_strategy.binance):
+        try:
+            client.get('/api/v3/ping')
+        except Exception:
+            pass
+
+def serve(path=None):
+    """Listen on the Unix socket until stopped"""
+    path = path or DAEMON_SOCKET
+    if request({'command': 'status'}, path) is not None:
+        print(f"Daemon already running on {path}")
+        sys.exit(1)
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a daemon that did not shut down cleanly
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    warm_up()
+    server = DaemonServer(path)
+    os.chmod(path, 0o600)
+    print(f"Listening on {path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+def main():
+    """Main function to start, stop or query the daemon"""
+    command = sys.argv[1] if len(sys.argv) > 1 else 'start'
+    if command not in ('start', 'stop', 'status', 'metrics'):
+        print("Usage: python scalp_daemon.py [start|stop|status|metrics]")
+        print("  start: serve scalp_client.py requests on the Unix socket (default)")
+        print("  stop: shut down a running daemon")
+        print("  status: show pid, uptime and requests served")
+        print("  metrics: per-phase timings aggregated over every request served")
+        sys.exit(1)
+
+    if command == 'start':
+        serve()
+        return
+
+    reply = request({'command': command})
+    if reply is None:
+        print(f"No daemon running on {DAEMON_SOCKET}")
+        sys.exit(1)
+    if command == 'stop':
+        print("Daemon stopped")
+    elif command == 'metrics':
+        print(profiler.format_metrics(reply['metrics']))
+    else:
+        print(f"pid {reply['pid']} | up {reply['uptime']:.0f}s | {reply['served']} requests served")
+
+if __name__ == "__main__":
+    main()
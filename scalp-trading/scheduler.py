@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# scheduler.py
+# Rate-limit-aware multi-token AI analysis runner with Binance and OpenAI token buckets
+
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, parse_qs
+
+from requests.adapters import HTTPAdapter
+
+import ai_cache
+import profiler
+import signal_filter
+import trade_journal
+import trading_strategy
+from binance_price_calc import get_current_prices, get_flag_value, read_watchlist
+from scalp_calc import calc_profit, colorize_positive, colorize_negative, format_currency
+
+# Binance spot REQUEST_WEIGHT limit per minute, and the share of it we allow ourselves
+BINANCE_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_PER_MINUTE', 6000))
+BINANCE_WEIGHT_HEADROOM = 0.8
+
+# OpenAI limits for gpt-4o-mini (override for your account tier)
+OPENAI_RPM = int(os.getenv('OPENAI_RPM', 500))
+OPENAI_TPM = int(os.getenv('OPENAI_TPM', 200_000))
+
+class TokenBucket:
+    """Thread-safe token bucket refilling `capacity` tokens per `period` seconds"""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cost=1):
+        """Block until `cost` tokens are available and take them"""
+        cost = min(cost, self.capacity)
+        started = time.monotonic()
+        with self.cond:
+            while True:
+                self._refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    break
+                self.cond.wait((cost - self.tokens) / self.rate)
+        self.waited += time.monotonic() - started
+
+    def limit_remaining(self, remaining):
+        """Clamp the local budget to what the server reports as remaining (negative means wait)"""
+        with self.cond:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+def binance_request_weight(url):
+    """Request weight of a Binance REST call (https://developers.binance.com/docs/binance-spot-api-docs/rest-api)"""
+    parsed = urlparse(url)
+    params = parse_qs(parsed.query)
+    if parsed.path.endswith('/klines'):
+        limit = int(params.get('limit', ['500'])[0])
+        return 2 if limit < 100 else 5 if limit < 500 else 10 if limit <= 1000 else 20
+    if parsed.path.endswith('/ticker/price'):
+        return 2 if 'symbol' in params else 4
+    if parsed.path.endswith('/depth'):
+        limit = int(params.get('limit', ['100'])[0])
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if parsed.path.endswith('/exchangeInfo'):
+        return 20
+    return 2
+
+def openai_request_tokens(request):
+    """Estimated tokens of a chat completion: ~4 characters per prompt token plus the completion budget"""
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return 1000
+    prompt_chars = sum(len(m.get('content', '')) for m in body.get('messages', []))
+    return prompt_chars // 4 + body.get('max_completion_tokens', 400)
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTPAdapter that takes from rate-limit buckets before sending and adapts to response headers"""
+
+    def __init__(self, reserve, observe, **kwargs):
+        self.reserve = reserve
+        self.observe = observe
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.reserve(request)
+        response = super().send(request, **kwargs)
+        self.observe(response)
+        return response
+
+class RateLimiter:
+    """Binance weight and OpenAI request/token budgets shared by all workers"""
+
+    def __init__(self):
+        self.binance_limit = int(BINANCE_WEIGHT_PER_MINUTE * BINANCE_WEIGHT_HEADROOM)
+        self.binance = TokenBucket(self.binance_limit)
+        self.openai_requests = TokenBucket(OPENAI_RPM)
+        self.openai_tokens = TokenBucket(OPENAI_TPM)
+        self.used_weight = 0
+
+    def reserve_binance(self, request):
+        self.binance.acquire(binance_request_weight(request.url))
+
+    def observe_binance(self, response):
+        used = response.headers.get('X-MBX-USED-WEIGHT-1M') or response.headers.get('X-MBX-USED-WEIGHT')
+        if used and used.isdigit():
+            self.used_weight = int(used)
+            self.binance.limit_remaining(self.binance_limit - self.used_weight)
+        if response.status_code in (418, 429):
+            # Rate limited anyway: stop spending until the server's Retry-After has passed
+            retry_after = response.headers.get('Retry-After', '60')
+            self.binance.limit_remaining(-self.binance.rate * (int(retry_after) if retry_after.isdigit() else 60))
+
+    def reserve_openai(self, request):
+        self.openai_requests.acquire(1)
+        self.openai_tokens.acquire(openai_request_tokens(request))
+
+    def observe_openai(self, response):
+        remaining_requests = response.headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = response.headers.get('x-ratelimit-remaining-tokens')
+        if remaining_requests and remaining_requests.isdigit():
+            self.openai_requests.limit_remaining(int(remaining_requests))
+        if remaining_tokens and remaining_tokens.isdigit():
+            self.openai_tokens.limit_remaining(int(remaining_tokens))
+
+    def install(self, workers):
+        """Route the shared Binance and OpenAI sessions through the buckets"""
+        pool_size = workers * len(trading_strategy.TIMEFRAMES)
+        binance_adapter = ThrottledAdapter(self.reserve_binance, self.observe_binance, pool_maxsize=pool_size)
+        # Failover and hedged requests spend the same per-IP weight, whichever host they go to
+        for base_url in trading_strategy.binance.base_urls():
+            trading_strategy.session.mount(base_url, binance_adapter)
+        openai_adapter = ThrottledAdapter(self.reserve_openai, self.observe_openai, pool_maxsize=workers)
+        trading_strategy.openai_session.mount(_origin(trading_strategy.OPENAI_CHAT_URL), openai_adapter)
+
+def _origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def analyze_token(token, entry_price, take_profit, stop_loss, position_size, use_bnb=False, journal=False):
+    """Run the full --ai pipeline for one token without progress output"""
+    started = time.monotonic()
+    profit_result = calc_profit(entry_price, take_profit, position_size, use_bnb_discount=use_bnb)
+    loss_result = calc_profit(entry_price, stop_loss, position_size, use_bnb_discount=use_bnb)
+    suggestion = trading_strategy.get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size,
+                                                    entry_price, verbose=False)
+    if journal:
+        trade_journal.record('scheduler', token, entry_price, take_profit, stop_loss, position_size,
+                             profit_result, loss_result, suggestion)
+    return {
+        'token': token,
+        'entry': entry_price,
+        'profit': profit_result,
+        'loss': loss_result,
+        'suggestion': suggestion,
+        'elapsed': time.monotonic() - started,
+    }
+
+def format_result_line(result):
+    """One-line summary of a token's analysis"""
+    profit, loss = result['profit'], result['loss']
+    tp = colorize_positive(format_currency(profit['net_amount'])) if profit['net_amount'] >= 0 else colorize_negative(format_currency(profit['net_amount']))
+    sl = colorize_positive(format_currency(loss['net_amount'])) if loss['net_amount'] >= 0 else colorize_negative(format_currency(loss['net_amount']))
+    try:
+        data = trading_strategy.parse_ai_response(result['suggestion'])
+        ai = (f"{data['strategic_recommendation']} {data['direction']} {data['confidence_score']}% "
+              f"({data['risk_assessment']['level']} risk{', local' if data.get('source') == 'local' else ''})")
+    except (ValueError, KeyError, TypeError):
+        ai = result['suggestion'].splitlines()[0][:60] if result['suggestion'] else "no answer"
+    return (f"{result['token']:<8} ${result['entry']:.4f} | TP {profit['price_change']:.2f}% {tp} | "
+            f"SL {loss['price_change']:.2f}% {sl} | AI: {ai} | {result['elapsed']:.1f}s")
+
+def run_cycle(rows, last_run, limiter, workers, use_bnb=False, full=False, journal=False):
+    """Analyze every watchlist row once, stalest tokens first, printing results as they complete"""
+    # Stalest first: never-run tokens (last_run 0) go ahead in watchlist order
+    queue = [(last_run.get(row[0], 0.0), index, row) for index, row in enumerate(rows)]
+    heapq.heapify(queue)
+    ordered = [heapq.heappop(queue)[2] for _ in range(len(queue))]
+
+    prices = get_current_prices([row[0] for row in ordered], client=trading_strategy.binance)
+    print_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for token, take_profit, stop_loss, position_size in ordered:
+            if token not in prices:
+                print(f"No Binance price for {token}USDT, skipping", file=sys.stderr)
+                continue
+            future = executor.submit(analyze_token, token, prices[token], take_profit, stop_loss, position_size, use_bnb, journal)
+            futures[future] = token
+
+        for future in as_completed(futures):
+            token = futures[future]
+            last_run[token] = time.time()
+            try:
+                result = future.result()
+            except Exception as e:
+                with print_lock:
+                    print(f"{token:<8} ❌ {e}")
+                continue
+            with print_lock:
+                print(format_result_line(result), flush=True)
+                if full:
+                    trading_strategy.format_ai_response(result['suggestion'])
+                    print()
+
+def main():
+    """Main function to handle command line arguments and run analysis cycles"""
+    if len(sys.argv) < 2:
+        print("Usage: python scheduler.py <watchlist|-> [--workers N] [--cycles N] [--interval SEC] [--bnb] [--full] [--journal] [--profile [file]]")
+        print("  watchlist: file of token,tp,sl,size rows (- for stdin)")
+        print("  --workers N: tokens analyzed concurrently (default 4)")
+        print("  --cycles N: number of passes over the watchlist, 0 runs forever (default 1)")
+        print("  --interval SEC: seconds between the start of two cycles (default 60)")
+        print("  --bnb: use BNB discount fee rate")
+        print("  --full: print the full AI analysis for every token")
+        print("  --journal: record every analyzed scenario in the trade journal (see trade_journal.py)")
+        print("  --profile [file]: print per-phase timings and write a Chrome trace (default scalp-trace.json)")
+        sys.exit(1)
+
+    source = sys.argv[1]
+    workers = int(get_flag_value('--workers', 4))
+    cycles = int(get_flag_value('--cycles', 1))
+    interval = float(get_flag_value('--interval', 60))
+    use_bnb = "--bnb" in sys.argv
+    full = "--full" in sys.argv
+
+    if source == '-':
+        rows = read_watchlist(sys.stdin)
+    else:
+        with open(source, newline='') as f:
+            rows = read_watchlist(f)
+    if not rows:
+        print("Watchlist is empty")
+        sys.exit(1)
+
+    limiter = RateLimiter()
+    limiter.install(workers)
+    last_run = {}
+
+    cycle = 0
+    try:
+        while cycles == 0 or cycle < cycles:
+            started = time.monotonic()
+            cycle += 1
+            print(f"— Cycle {cycle}: {len(rows)} tokens —")
+            run_cycle(rows, last_run, limiter, workers, use_bnb=use_bnb, full=full, journal=trade_journal.requested())
+            print(f"Binance weight used: {limiter.used_weight}/{BINANCE_WEIGHT_PER_MINUTE} | "
+                  f"throttle wait (all workers): Binance {limiter.binance.waited:.1f}s, OpenAI {limiter.openai_requests.waited + limiter.openai_tokens.waited:.1f}s | "
+                  f"AI cache {ai_cache.response_cache.stats_line()}")
+            if signal_filter.AI_PREFILTER_ENABLED:
+                print(f"Local signal pre-filter {signal_filter.prefilter_stats.stats_line()}")
+            if cycles == 0 or cycle < cycles:
+                time.sleep(max(interval - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        print()
+
+if __name__ == "__main__":
+    with profiler.profiled('scheduler'):
+        main()
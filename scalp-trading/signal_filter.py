@@ -0,0 +1,186 @@
+# signal_filter.py
+# Deterministic local scoring of the multi-timeframe analysis, deciding when an OpenAI call is worth it
+
+import math
+import os
+import re
+import threading
+
+import ai_cache
+
+# "low-high" with optional signs and decimals on either bound, e.g. "0-75", "-10-60.5"
+BAND_PATTERN = re.compile(r'\s*([+-]?\d+(?:\.\d*)?)\s*-\s*([+-]?\d+(?:\.\d*)?)\s*')
+DEFAULT_AMBIGUITY_BAND = (0.0, 75.0)
+
+def parse_band(value, default=DEFAULT_AMBIGUITY_BAND):
+    """(low, high) from a "low-high" setting; a malformed or inverted band warns and gives the default"""
+    match = BAND_PATTERN.fullmatch(value)
+    if match and float(match.group(1)) <= float(match.group(2)):
+        return float(match.group(1)), float(match.group(2))
+    print(f"⚠️  Ignoring AI_AMBIGUITY_BAND={value!r}, expected low-high (e.g. 0-75); using {default[0]:g}-{default[1]:g}")
+    return default
+
+# Local answers with a confidence inside [low, high) are ambiguous and go to OpenAI
+# (set AI_PREFILTER=0 to always call OpenAI)
+AI_PREFILTER_ENABLED = os.getenv('AI_PREFILTER', '1') != '0'
+AI_AMBIGUITY_BAND = parse_band(os.getenv('AI_AMBIGUITY_BAND', '0-75'))
+
+# A trade risking more than twice its reward is a Wait whatever the trend says
+POOR_RISK_REWARD = 0.5
+POOR_RISK_REWARD_CONFIDENCE = 80
+
+# Average 10-period range (%) above which a setup counts as high risk
+HIGH_VOLATILITY_PCT = 5.0
+
+# RSI bounds treated as stretched
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+TREND_SIGNS = {'upward': 1, 'downward': -1, 'sideways': 0}
+
+def timeframe_vote(analysis):
+    """Market direction of one timeframe in [-1, 1]: its trend, price vs EMA and stretched RSI"""
+    votes = [TREND_SIGNS.get(analysis['trend'], 0)]
+    if analysis.get('ema') is not None:
+        votes.append(math.copysign(1, analysis['current_price'] - analysis['ema']) if analysis['current_price'] != analysis['ema'] else 0)
+    rsi = analysis.get('rsi')
+    if rsi is not None and (rsi >= RSI_OVERBOUGHT or rsi <= RSI_OVERSOLD):
+        votes.append(-1 if rsi >= RSI_OVERBOUGHT else 1)  # stretched moves tend to revert
+    return sum(votes) / len(votes)
+
+def nearest_level(levels, price, above):
+    """Closest level strictly above (or below) price, or None"""
+    candidates = [level for level in levels if (level > price if above else level < price)]
+    if not candidates:
+        return None
+    return min(candidates) if above else max(candidates)
+
+def score(entry_price, take_profit, stop_loss, position_size, analyses):
+    """
+    Local answer in the OpenAI JSON schema for the trade and per-timeframe
+    analyses (error strings are ignored). The confidence score is how
+    unanimously the timeframes agree with (or against) the trade's direction,
+    scaled down for a risk/reward below 1. Mixed timeframes give a low score.
+    Returns None when no timeframe could be analyzed: there is nothing to score.
+    """
+    frames = [analysis for analysis in analyses if isinstance(analysis, dict)]
+    if not frames:
+        return None
+    is_long = take_profit >= entry_price
+    trade_sign = 1 if is_long else -1
+
+    risk = abs(entry_price - stop_loss)
+    reward = abs(take_profit - entry_price)
+    risk_reward = reward / risk if risk > 0 else 0.0
+
+    votes = [timeframe_vote(analysis) for analysis in frames]
+    market = sum(votes) / len(votes)
+    agreement = market * trade_sign
+
+    if risk_reward < POOR_RISK_REWARD:
+        recommendation = 'Wait'
+        confidence = max(round(abs(agreement) * 100) if agreement < 0 else 0, POOR_RISK_REWARD_CONFIDENCE)
+    elif agreement > 0:
+        recommendation = 'Enter'
+        confidence = round(agreement * min(risk_reward, 1.0) * 100)
+    else:
+        recommendation = 'Wait'
+        confidence = round(-agreement * 100)
+
+    volatility = sum(analysis['volatility_pct'] for analysis in frames) / len(frames)
+    if risk_reward < 1 or volatility > HIGH_VOLATILITY_PCT or agreement < -0.5:
+        risk_level = 'High'
+    elif risk_reward >= 2 and agreement > 0.5:
+        risk_level = 'Low'
+    else:
+        risk_level = 'Medium'
+
+    # Levels from the technical data: the nearest recent high/low beyond entry on each side
+    highs = [analysis['high_10'] for analysis in frames]
+    lows = [analysis['low_10'] for analysis in frames]
+    suggested_tp = nearest_level(highs if is_long else lows, entry_price, above=is_long) or take_profit
+    suggested_sl = nearest_level(lows if is_long else highs, entry_price, above=not is_long) or stop_loss
+
+    trends = ', '.join(f"{analysis['timeframe']} {analysis['trend']}" for analysis in frames)
+    aligned = sum(1 for vote in votes if vote * trade_sign > 0)
+    if recommendation == 'Wait':
+        size_advice = "Skip this trade"
+    elif risk_level == 'High':
+        size_advice = f"Halve to ${position_size / 2:,.2f}"
+    else:
+        size_advice = f"Keep ${position_size:,.2f}"
+
+    return {
+        'risk_assessment': {
+            'level': risk_level,
+            'reasoning': f"R:R {risk_reward:.2f}, {aligned}/{len(votes)} timeframes with the trade, "
+                         f"average 10-period range {volatility:.2f}%",
+        },
+        'direction': 'Long' if market >= 0 else 'Short',
+        'strategic_recommendation': recommendation,
+        'suggested_levels': {
+            'take_profit': round(suggested_tp, 8),
+            'stop_loss': round(suggested_sl, 8),
+        },
+        'technical_considerations': f"Local signal score (no AI): {trends}",
+        'position_size_adjustment': size_advice,
+        'confidence_score': confidence,
+    }
+
+def is_ambiguous(answer, band=None):
+    """True when there is no local answer or its confidence falls inside the ambiguity band"""
+    if answer is None:
+        return True
+    low, high = band or AI_AMBIGUITY_BAND
+    return low <= answer['confidence_score'] < high
+
+class PrefilterStats:
+    """
+    Local vs escalated decisions and the OpenAI time the local ones saved.
+    Counts are kept for this process and added to the AI cache's cumulative
+    counters, so single runs can report totals across runs too.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or ai_cache.response_cache
+        self.lock = threading.Lock()
+        self.local = 0
+        self.escalated = 0
+        self.openai_calls = 0
+        self.openai_seconds = 0.0
+
+    def record_local(self):
+        with self.lock:
+            self.local += 1
+        self.store.add_stats(prefilter_local=1)
+
+    def record_escalated(self, openai_seconds=None):
+        """Count an escalation; openai_seconds is the round trip, if OpenAI was actually called"""
+        with self.lock:
+            self.escalated += 1
+            if openai_seconds is not None:
+                self.openai_calls += 1
+                self.openai_seconds += openai_seconds
+        amounts = {'prefilter_escalated': 1}
+        if openai_seconds is not None:
+            amounts.update(openai_calls=1, openai_ms=round(openai_seconds * 1000))
+        self.store.add_stats(**amounts)
+
+    def stats_line(self):
+        if self.store.enabled:
+            totals = self.store.totals()
+            scope = "all runs"
+            local, escalated = totals.get('prefilter_local', 0), totals.get('prefilter_escalated', 0)
+            calls, seconds = totals.get('openai_calls', 0), totals.get('openai_ms', 0) / 1000
+        else:
+            scope = "this run"
+            local, escalated, calls, seconds = self.local, self.escalated, self.openai_calls, self.openai_seconds
+        decided = local + escalated
+        rate = f"{escalated / decided * 100:.0f}%" if decided else "n/a"
+        # Each local answer saved one average OpenAI round trip
+        saved = f"~{local * seconds / calls:.1f}s OpenAI time saved at {seconds / calls:.1f}s/call" if calls else "no OpenAI call timed yet"
+        return (f"local: {self.local} | escalated: {self.escalated} "
+                f"({scope}: {local} local / {escalated} escalated, {rate} escalated, {saved})")
+
+# Shared counters used by get_ai_suggestion
+prefilter_stats = PrefilterStats()
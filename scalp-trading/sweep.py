@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# sweep.py
+# Parallel TP/SL/position-size parameter sweep over many symbols' history, ranked by net expectancy
+
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import kline_cache
+import profiler
+from backtest import simulate_trades
+from candles import Candles, CANDLE_FIELDS
+from scalp_calc import calc_profit_grid, colorize_positive, colorize_negative, format_currency
+
+# Partial results of running sweeps, one JSON-lines file per sweep
+SWEEP_CHECKPOINT_DIR = os.getenv('SWEEP_CHECKPOINT_DIR', os.path.expanduser('~/.cache/trading-scripts/sweeps'))
+
+# Defaults: TP/SL percent ranges as start:stop:step (inclusive), USD sizes, history days and rows shown
+SWEEP_TP_RANGE = '0.2:2:0.2'
+SWEEP_SL_RANGE = '0.2:2:0.2'
+SWEEP_SIZES = '1000'
+SWEEP_DAYS = 30
+SWEEP_TOP = 20
+
+# Configurations with fewer trades than this are listed but not ranked ahead of others
+SWEEP_MIN_TRADES = 10
+
+# Result columns, in order
+SWEEP_FIELDS = ('token', 'tp_pct', 'sl_pct', 'position_size', 'bnb', 'trades', 'win_rate', 'expectancy',
+                'total_net', 'total_fees', 'max_drawdown')
+
+class CheckpointMismatchError(Exception):
+    """The checkpoint file holds results of a sweep with other parameters"""
+
+def parse_values(text):
+    """Percent or size values from 'start:stop:step' (stop inclusive) or 'a,b,c'"""
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        return np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+    return [float(v) for v in text.split(',')]
+
+def book(trades, sizes, is_long):
+    """
+    Book one replay at every position size, with and without the BNB fee
+    discount, using the calc_profit fee model. Returns one stats dict per
+    (size, bnb) pair.
+    """
+    count = len(trades['entry'])
+    results = []
+    for use_bnb in (False, True):
+        if count:
+            grid = calc_profit_grid(trades['entry'][None, :], trades['exit'][None, :], np.asarray(sizes)[:, None],
+                                    use_bnb_discount=use_bnb, leverage=1 if is_long else -1)
+            net, fees = grid['net_amount'], grid['fees']
+            equity = np.cumsum(net, axis=1)
+            drawdown = (np.maximum.accumulate(np.maximum(equity, 0), axis=1) - equity).max(axis=1)
+        for k, size in enumerate(sizes):
+            stats = {'position_size': size, 'bnb': use_bnb, 'trades': count}
+            if count:
+                stats.update(win_rate=float((net[k] > 0).mean() * 100), expectancy=float(net[k].mean()),
+                             total_net=float(equity[k, -1]), total_fees=float(fees[k].sum()),
+                             max_drawdown=float(drawdown[k]))
+            else:
+                stats.update(win_rate=0.0, expectancy=0.0, total_net=0.0, total_fees=0.0, max_drawdown=0.0)
+            results.append(stats)
+    return results
+
+# Per-worker state: how to reach each symbol's candles, and the series opened so far
+_worker = {}
+
+def _shared_array(array, blocks):
+    """Copy an array into a new shared memory block, returning its (name, shape, dtype) spec"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block.name, array.shape, array.dtype.str
+
+def _attach(name, shape, dtype):
+    block = shared_memory.SharedMemory(name=name)
+    _worker.setdefault('blocks', []).append(block)  # keep the mapping alive while the array is used
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _init_worker(sources):
+    _worker['sources'] = sources
+    _worker['series'] = {}
+
+def _series(token):
+    """
+    Candles of one token, attached without copying: archive series are
+    memory-mapped from disk, kline cache history comes from shared memory.
+    """
+    series = _worker['series'].get(token)
+    if series is None:
+        kind, *spec = _worker['sources'][token]
+        if kind == 'archive':
+            import kline_archive
+            pair, start, stop, root = spec
+            series = kline_archive.open_series(pair, '1m', root)[start:stop]
+        else:
+            series = Candles(*(_attach(*column) for column in spec[0]))
+        _worker['series'][token] = series
+    return series
+
+def _run_task(token, tp_pct, sl_values, sizes, is_long, max_bars):
+    """Replay one token at one TP distance against every SL distance"""
+    candles = _series(token)
+    rows = []
+    for sl_pct in sl_values:
+        trades = simulate_trades(candles, tp_pct, sl_pct, is_long, max_bars)
+        for stats in book(trades, sizes, is_long):
+            rows.append({'token': token, 'tp_pct': tp_pct, 'sl_pct': sl_pct, **stats})
+    return rows
+
+def task_key(token, tp_pct):
+    return f"{token}:{tp_pct}"
+
+def checkpoint_path(params):
+    """Default checkpoint file for a sweep: the same command line resumes the same file"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(SWEEP_CHECKPOINT_DIR, f'sweep-{digest}.jsonl')
+
+def read_checkpoint(path, params):
+    """Return (header, {task key: rows}) of an existing checkpoint for these params, or (None, {})"""
+    if not os.path.exists(path):
+        return None, {}
+    header, done = None, {}
+    with open(path, 'rb+') as f:
+        for line in iter(f.readline, b''):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line of an interrupted run: cut it so new results append cleanly
+                f.truncate(f.tell() - len(line))
+                break
+            if header is None:
+                header = record
+                if header.get('params') != params:
+                    raise CheckpointMismatchError(f"Checkpoint {path} belongs to a different sweep")
+            else:
+                done[record['task']] = record['rows']
+    return header, done
+
+def load_sources(tokens, start_ms, end_ms, use_archive, blocks):
+    """
+    Locate each token's history for the workers: (spec, rows) per token, specs
+    being row ranges of the memory-mapped archive or shared memory copies of
+    the kline cache history. Tokens without history are left out.
+    """
+    sources = {}
+    conn = None if use_archive else kline_cache.connect()
+    try:
+        for token in tokens:
+            pair = f'{token}USDT'
+            if use_archive:
+                import kline_archive
+                series = kline_archive.open_series(pair, '1m')
+                start = int(np.searchsorted(series.timestamp, start_ms, side='left'))
+                stop = int(np.searchsorted(series.timestamp, end_ms, side='left'))
+                spec, rows = ('archive', pair, start, stop, None), stop - start
+            else:
+                candles = Candles.from_rows(kline_cache.load_range(conn, pair, '1m', start_ms, end_ms))
+                spec = ('shared', [_shared_array(getattr(candles, field), blocks) for field in CANDLE_FIELDS])
+                rows = len(candles)
+            if rows >= 2:
+                sources[token] = (spec, rows)
+    finally:
+        if conn is not None:
+            conn.close()
+    return sources
+
+def run_sweep(tokens, tp_values, sl_values, sizes, days=SWEEP_DAYS, is_long=True, max_bars=None, use_archive=False,
+              workers=None, checkpoint=None, fresh=False, verbose=True):
+    """
+    Sweep every (token, TP, SL, size, BNB discount) combination and return
+    the result rows. Tasks (one token at one TP) are spread over a process
+    pool; each finished task is appended to a checkpoint file, and a rerun
+    of the same sweep skips the tasks already there, replaying the same
+    history window. verbose=False skips progress lines on stderr.
+    """
+    params = {'tokens': sorted(tokens), 'tp': tp_values, 'sl': sl_values, 'sizes': sizes, 'days': days,
+              'long': is_long, 'max_bars': max_bars, 'archive': use_archive}
+    path = checkpoint or checkpoint_path(params)
+    if fresh and os.path.exists(path):
+        os.remove(path)
+    header, done = read_checkpoint(path, params)
+    if header is None:
+        end_ms = int(time.time() * 1000)
+        header = {'params': params, 'start_ms': end_ms - int(days * 86_400_000), 'end_ms': end_ms}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+
+    rows = [row for task_rows in done.values() for row in task_rows]
+    blocks = []
+    try:
+        with profiler.span('sweep.load', tokens=len(tokens)):
+            sources = load_sources(params['tokens'], header['start_ms'], header['end_ms'], use_archive, blocks)
+        tasks = [(token, tp_pct) for token in sources for tp_pct in tp_values if task_key(token, tp_pct) not in done]
+        total = len(done) + len(tasks)
+        if verbose:
+            for token in sorted(set(params['tokens']) - sources.keys()):
+                print(f"No stored 1m history for {token}USDT, skipping", file=sys.stderr)
+            print(f"Sweeping {len(tp_values) * len(sl_values) * len(sizes) * 2} configurations x {len(sources)} "
+                  f"token{'s' if len(sources) != 1 else ''} "
+                  f"({sum(count for _, count in sources.values())} candles): {total} tasks, {len(done)} done in {path}",
+                  file=sys.stderr)
+        started = time.perf_counter()
+
+        workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+        specs = {token: spec for token, (spec, _) in sources.items()}
+        with open(path, 'a') as f:
+            def finish(token, tp_pct, task_rows):
+                f.write(json.dumps({'task': task_key(token, tp_pct), 'rows': task_rows}) + '\n')
+                f.flush()
+                rows.extend(task_rows)
+                done[task_key(token, tp_pct)] = task_rows
+                if verbose and sys.stderr.isatty():
+                    print(f"\r{len(done)}/{total} tasks ({time.perf_counter() - started:.1f}s)", end='',
+                          file=sys.stderr, flush=True)
+
+            if workers == 1:
+                _init_worker(specs)
+                try:
+                    for token, tp_pct in tasks:
+                        finish(token, tp_pct, _run_task(token, tp_pct, sl_values, sizes, is_long, max_bars))
+                finally:
+                    _worker.clear()
+            else:
+                with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(specs,)) as pool:
+                    futures = {pool.submit(_run_task, token, tp_pct, sl_values, sizes, is_long, max_bars): (token, tp_pct)
+                               for token, tp_pct in tasks}
+                    for future in as_completed(futures):
+                        finish(*futures[future], future.result())
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    if verbose and tasks:
+        print(f"\r{len(tasks)} tasks in {time.perf_counter() - started:.1f}s with {workers} worker{'s' if workers > 1 else ''}",
+              file=sys.stderr)
+    return rows, path
+
+def rank(rows):
+    """Best net expectancy first; configurations with too few trades go last"""
+    return sorted(rows, key=lambda r: (r['trades'] >= SWEEP_MIN_TRADES, r['expectancy']), reverse=True)
+
+def print_results(rows, output_format='table'):
+    """Print ranked rows as a colored table, CSV or JSON lines"""
+    if output_format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    if output_format == 'jsonl':
+        for row in rows:
+            print(json.dumps(row))
+        return
+
+    print(f"{'TOKEN':<8} {'TP %':>6} {'SL %':>6} {'SIZE':>11} {'FEES':<6} {'TRADES':>7} {'WIN %':>6} {'EXPECTANCY':>11} "
+          f"{'TOTAL NET':>12} {'MAX DD':>11}")
+    for r in rows:
+        colorize = colorize_positive if r['expectancy'] >= 0 else colorize_negative
+        expectancy = colorize(f"{format_currency(r['expectancy']):>11}")
+        total_net = colorize(f"{format_currency(r['total_net']):>12}")
+        print(f"{r['token']:<8} {r['tp_pct']:>6.2f} {r['sl_pct']:>6.2f} {format_currency(r['position_size']):>11} "
+              f"{'BNB' if r['bnb'] else 'normal':<6} {r['trades']:>7} {r['win_rate']:>6.1f} {expectancy} {total_net} "
+              f"{format_currency(r['max_drawdown']):>11}")
+
+def main():
+    """Main function to handle command line arguments and run the sweep"""
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print("Usage: python sweep.py <token[,token...]> [--tp RANGE] [--sl RANGE] [--sizes LIST] [--days N] [--max-bars N] [--short]")
+        print("                       [--archive] [--workers N] [--top N] [--format table|csv|jsonl] [--checkpoint file] [--fresh] [--profile [file]]")
+        print("  token: one or more comma-separated symbols (e.g., SOL,BTC,ETH) with stored 1m history")
+        print(f"  --tp / --sl RANGE: distances in percent as start:stop:step or a,b,c (default {SWEEP_TP_RANGE})")
+        print(f"  --sizes LIST: USD position sizes as a,b,c or start:stop:step (default {SWEEP_SIZES})")
+        print(f"  --days N: history length in days (default {SWEEP_DAYS})")
+        print("  --max-bars N: close trades at market after N candles")
+        print("  --short: sweep short trades instead of long")
+        print("  --archive: read history from the kline_archive.py store instead of the kline cache")
+        print("  --workers N: worker processes (default: one per CPU)")
+        print(f"  --top N: rows shown, 0 for all (default {SWEEP_TOP})")
+        print("  --format: table (default), csv or jsonl")
+        print("  --checkpoint file: partial results file (default: one per sweep under the cache directory)")
+        print("  --fresh: discard the checkpoint instead of resuming it")
+        print("Every configuration is booked with and without the BNB fee discount. An interrupted sweep")
+        print("resumes where it stopped when run again with the same arguments.")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    tokens = [token.strip().upper() for token in sys.argv[1].split(',') if token.strip()]
+    tp_values = parse_values(get_flag_value('--tp', SWEEP_TP_RANGE))
+    sl_values = parse_values(get_flag_value('--sl', SWEEP_SL_RANGE))
+    sizes = parse_values(get_flag_value('--sizes', SWEEP_SIZES))
+    days = float(get_flag_value('--days', SWEEP_DAYS))
+    max_bars = get_flag_value('--max-bars')
+    max_bars = int(max_bars) if max_bars else None
+    workers = get_flag_value('--workers')
+    top = int(get_flag_value('--top', SWEEP_TOP))
+    output_format = get_flag_value('--format', 'table')
+    if output_format not in ('table', 'csv', 'jsonl'):
+        print(f"Unknown format '{output_format}', choose from: table, csv, jsonl")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        rows, path = run_sweep(tokens, tp_values, sl_values, sizes, days=days, is_long="--short" not in sys.argv,
+                               max_bars=max_bars, use_archive="--archive" in sys.argv,
+                               workers=int(workers) if workers else None, checkpoint=get_flag_value('--checkpoint'),
+                               fresh="--fresh" in sys.argv)
+    except CheckpointMismatchError as e:
+        print(f"Error: {e} (use --fresh or another --checkpoint)")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nInterrupted, run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
+
+    if not rows:
+        print("No stored 1m history for any token; backfill it with backtest.py --fetch or kline_archive.py first")
+        sys.exit(1)
+
+    ranked = rank(rows)
+    print_results(ranked[:top] if top else ranked, output_format)
+    if output_format == 'table':
+        print(f"{len(rows)} results in {time.perf_counter() - started:.1f}s | checkpoint: {path}")
+
+if __name__ == "__main__":
+    with profiler.profiled('sweep'):
+        main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# trade_journal.py
+# Append-only SQLite journal of evaluated and closed trades with trigger-maintained P&L rollups
+
+import os
+import sqlite3
+import sys
+import time
+
+import profiler
+from scalp_calc import calc_profit, colorize_positive, colorize_negative, format_currency
+
+# Journal location; scenarios are only recorded with --journal or TRADE_JOURNAL=1
+TRADE_JOURNAL_PATH = os.getenv('TRADE_JOURNAL_PATH', os.path.expanduser('~/.cache/trading-scripts/journal.db'))
+TRADE_JOURNAL_ENABLED = os.getenv('TRADE_JOURNAL', '0') == '1'
+
+DAY_MS = 86_400_000
+
+# AI confidence scores are rolled up in buckets of this width
+CONFIDENCE_BUCKET = 10
+
+SCENARIO_COLUMNS = ('ts', 'symbol', 'source', 'entry', 'take_profit', 'stop_loss', 'position_size', 'fees',
+                    'tp_net', 'sl_net', 'ai_direction', 'ai_recommendation', 'ai_confidence', 'ai_source')
+
+# Rows are only ever inserted, apart from the executed flag `take` sets on a scenario the user
+# actually traded. The rollup tables are kept current by triggers, so reports read one row per
+# symbol and day (or confidence bucket) however long the journal grows.
+SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS scenarios (
+        id INTEGER PRIMARY KEY,
+        ts INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        source TEXT NOT NULL,
+        entry REAL NOT NULL,
+        take_profit REAL NOT NULL,
+        stop_loss REAL NOT NULL,
+        position_size REAL NOT NULL,
+        fees REAL NOT NULL,
+        tp_net REAL NOT NULL,
+        sl_net REAL NOT NULL,
+        ai_direction TEXT,
+        ai_recommendation TEXT,
+        ai_confidence INTEGER,
+        ai_source TEXT,
+        executed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS scenarios_symbol_ts ON scenarios (symbol, ts);
+    CREATE INDEX IF NOT EXISTS scenarios_ts ON scenarios (ts);
+
+    CREATE TABLE IF NOT EXISTS outcomes (
+        scenario_id INTEGER PRIMARY KEY REFERENCES scenarios (id),
+        ts INTEGER NOT NULL,
+        outcome TEXT NOT NULL,
+        exit_price REAL NOT NULL,
+        fees REAL NOT NULL,
+        net REAL NOT NULL,
+        executed INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS outcomes_ts ON outcomes (ts);
+
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        symbol TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        scenarios INTEGER NOT NULL DEFAULT 0,
+        planned_fees REAL NOT NULL DEFAULT 0,
+        closed INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        realized_net REAL NOT NULL DEFAULT 0,
+        realized_fees REAL NOT NULL DEFAULT 0,
+        hypothetical_closed INTEGER NOT NULL DEFAULT 0,
+        hypothetical_wins INTEGER NOT NULL DEFAULT 0,
+        hypothetical_net REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (symbol, day)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS ai_rollup (
+        symbol TEXT NOT NULL,
+        source TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        resolved INTEGER NOT NULL DEFAULT 0,
+        hits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (symbol, source, bucket)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS scenarios_rollup AFTER INSERT ON scenarios BEGIN
+        INSERT INTO daily_rollup (symbol, day, scenarios, planned_fees) VALUES (NEW.symbol, NEW.ts / {DAY_MS}, 1, NEW.fees)
+        ON CONFLICT (symbol, day) DO UPDATE SET scenarios = scenarios + 1, planned_fees = planned_fees + excluded.planned_fees;
+    END;
+
+    -- P&L counts on the day the trade closed, as realized for executed trades and as
+    -- hypothetical for scenarios that were only evaluated; an AI call is a hit when
+    -- "Enter" met a winning trade or any other recommendation met a losing one
+    CREATE TRIGGER IF NOT EXISTS outcomes_rollup AFTER INSERT ON outcomes BEGIN
+        INSERT INTO daily_rollup (symbol, day, closed, wins, realized_net, realized_fees,
+                                  hypothetical_closed, hypothetical_wins, hypothetical_net)
+        SELECT symbol, NEW.ts / {DAY_MS}, NEW.executed, NEW.executed AND NEW.net > 0, NEW.executed * NEW.net,
+               NEW.executed * NEW.fees, 1 - NEW.executed, NOT NEW.executed AND NEW.net > 0, (1 - NEW.executed) * NEW.net
+        FROM scenarios WHERE id = NEW.scenario_id
+        ON CONFLICT (symbol, day) DO UPDATE SET closed = closed + excluded.closed, wins = wins + excluded.wins,
+            realized_net = realized_net + excluded.realized_net, realized_fees = realized_fees + excluded.realized_fees,
+            hypothetical_closed = hypothetical_closed + excluded.hypothetical_closed,
+            hypothetical_wins = hypothetical_wins + excluded.hypothetical_wins,
+            hypothetical_net = hypothetical_net + excluded.hypothetical_net;
+
+        INSERT INTO ai_rollup (symbol, source, bucket, resolved, hits)
+        SELECT symbol, ai_source, ai_confidence / {CONFIDENCE_BUCKET} * {CONFIDENCE_BUCKET}, 1, (ai_recommendation = 'Enter') = (NEW.net > 0)
+        FROM scenarios WHERE id = NEW.scenario_id AND ai_confidence IS NOT NULL AND ai_recommendation IS NOT NULL
+            AND ai_source IS NOT NULL
+        ON CONFLICT (symbol, source, bucket) DO UPDATE SET resolved = resolved + 1, hits = hits + excluded.hits;
+    END;
+"""
+
+def connect(path=None):
+    """Open the journal, creating the schema on first use"""
+    path = path or TRADE_JOURNAL_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def requested(argv=None):
+    """True when this run should journal its scenarios (--journal flag or TRADE_JOURNAL=1)"""
+    return TRADE_JOURNAL_ENABLED or "--journal" in (sys.argv if argv is None else argv)
+
+def ai_fields(suggestion):
+    """
+    (direction, recommendation, confidence, source) of an AI answer, Nones if
+    it is not valid JSON. source is 'local' for signal_filter answers and
+    'openai' for everything else.
+    """
+    if not suggestion:
+        return None, None, None, None
+    from trading_strategy import parse_ai_response
+
+    try:
+        data = parse_ai_response(suggestion)
+        return (data.get('direction'), data.get('strategic_recommendation'), int(data['confidence_score']),
+                'local' if data.get('source') == 'local' else 'openai')
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None, None, None, None
+
+def scenario_row(source, token, entry, take_profit, stop_loss, position_size, fees, tp_net, sl_net, suggestion=None, ts=None):
+    """One scenarios row; fees are those of the take profit scenario and suggestion is the AI answer text, if any"""
+    ts = ts if ts is not None else int(time.time() * 1000)
+    return (ts, f'{token}USDT', source, entry, take_profit, stop_loss, position_size, fees, tp_net, sl_net,
+            *ai_fields(suggestion))
+
+def record_rows(rows, path=None):
+    """Append scenario rows in one transaction, returning the id of the last one (None if nothing was written)"""
+    if not rows:
+        return None
+    try:
+        with profiler.span('journal.record', rows=len(rows)):
+            conn = connect(path)
+            try:
+                with conn:
+                    conn.executemany(f"INSERT INTO scenarios ({', '.join(SCENARIO_COLUMNS)}) "
+                                     f"VALUES ({', '.join('?' * len(SCENARIO_COLUMNS))})", rows)
+                    return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            finally:
+                conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Trade journal not updated: {e}", file=sys.stderr)
+        return None
+
+def record(source, token, entry, take_profit, stop_loss, position_size, profit, loss, suggestion=None, path=None):
+    """Journal one evaluated scenario from its calc_profit TP/SL results and return its id"""
+    return record_rows([scenario_row(source, token, entry, take_profit, stop_loss, position_size, profit['fees'],
+                                     profit['net_amount'], loss['net_amount'], suggestion)], path)
+
+def _open_scenario(conn, scenario_id):
+    """(entry, take profit, position size, executed) of a scenario without an outcome yet"""
+    row = conn.execute("SELECT entry, take_profit, position_size, executed FROM scenarios WHERE id = ?",
+                       (scenario_id,)).fetchone()
+    if row is None:
+        raise KeyError(scenario_id)
+    if conn.execute("SELECT 1 FROM outcomes WHERE scenario_id = ?", (scenario_id,)).fetchone():
+        raise ValueError(f"scenario #{scenario_id} is already closed")
+    return row
+
+def take(conn, scenario_id):
+    """Mark a journaled scenario as a trade the user actually entered (KeyError / ValueError as for close)"""
+    _open_scenario(conn, scenario_id)
+    with conn:
+        conn.execute("UPDATE scenarios SET executed = 1 WHERE id = ?", (scenario_id,))
+
+def close(conn, scenario_id, outcome, exit_price, ts=None, use_bnb_discount=False, executed=None):
+    """
+    Record how a journaled trade ended ('tp', 'sl' or 'manual') and return
+    its calc_profit result. The outcome is realized P&L if the scenario was
+    executed (executed=True marks it so first), hypothetical otherwise.
+    Raises KeyError for an unknown id and ValueError if the trade already
+    has an outcome.
+    """
+    entry, take_profit, position_size, was_executed = _open_scenario(conn, scenario_id)
+    executed = bool(was_executed) if executed is None else executed
+    # A take profit below entry makes it a short, booked with leverage -1 like backtest.py
+    result = calc_profit(entry, exit_price, position_size, use_bnb_discount=use_bnb_discount, leverage=1 if take_profit >= entry else -1)
+    with conn:
+        if executed and not was_executed:
+            conn.execute("UPDATE scenarios SET executed = 1 WHERE id = ?", (scenario_id,))
+        conn.execute("INSERT INTO outcomes (scenario_id, ts, outcome, exit_price, fees, net, executed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (scenario_id, ts if ts is not None else int(time.time() * 1000), outcome, exit_price,
+                      result['fees'], result['net_amount'], int(executed)))
+    return result
+
+def resolve_open(conn, use_bnb_discount=False, fetch=None, hypothetical=False):
+    """
+    Close open executed trades whose TP or SL was touched in the stored 1m
+    klines after they were journaled (SL first when one candle touches both,
+    like backtest.py). With hypothetical=True, scenarios that were only
+    evaluated are resolved too, as hypothetical outcomes. fetch(symbol,
+    start_ms) may backfill the kline cache first. Returns the number closed.
+    """
+    import kline_cache
+    from backtest import first_hit
+    from candles import Candles
+
+    open_rows = conn.execute(
+        "SELECT s.id, s.ts, s.symbol, s.entry, s.take_profit, s.stop_loss FROM scenarios s "
+        "LEFT JOIN outcomes o ON o.scenario_id = s.id WHERE o.scenario_id IS NULL "
+        f"{'' if hypothetical else 'AND s.executed = 1 '}ORDER BY s.symbol, s.ts"
+    ).fetchall()
+    closed = 0
+    cache = kline_cache.connect()
+    try:
+        by_symbol = {}
+        for row in open_rows:
+            by_symbol.setdefault(row[2], []).append(row)
+        for symbol, rows in by_symbol.items():
+            # Candles from the minute after the oldest open trade, shared by all of the symbol's trades
+            start_ms = rows[0][1] // 60_000 * 60_000 + 60_000
+            if fetch:
+                fetch(symbol, start_ms)
+            candles = Candles.from_rows(kline_cache.load_range(cache, symbol, '1m', start_ms))
+            for scenario_id, ts, _, entry, take_profit, stop_loss in rows:
+                start = int(candles.timestamp.searchsorted(ts // 60_000 * 60_000 + 60_000))
+                j, outcome = first_hit(candles.high, candles.low, start, take_profit, stop_loss, is_long=take_profit >= entry)
+                if j is None:
+                    continue
+                close(conn, scenario_id, outcome, take_profit if outcome == 'tp' else stop_loss,
+                      ts=int(candles.timestamp[j]) + 59_999, use_bnb_discount=use_bnb_discount)
+                closed += 1
+    finally:
+        cache.close()
+    return closed
+
+def rebuild_rollups(conn):
+    """Recompute the rollup tables from the raw rows (after manual edits or a schema change)"""
+    with conn:
+        conn.execute("DELETE FROM daily_rollup")
+        conn.execute("DELETE FROM ai_rollup")
+        conn.execute(f"""
+            INSERT INTO daily_rollup (symbol, day, scenarios, planned_fees, closed, wins, realized_net, realized_fees,
+                                      hypothetical_closed, hypothetical_wins, hypothetical_net)
+            SELECT symbol, day, SUM(scenarios), SUM(planned_fees), SUM(closed), SUM(wins), SUM(net), SUM(fees),
+                   SUM(hypothetical_closed), SUM(hypothetical_wins), SUM(hypothetical_net) FROM (
+                SELECT symbol, ts / {DAY_MS} AS day, 1 AS scenarios, fees AS planned_fees, 0 AS closed, 0 AS wins, 0 AS net,
+                       0 AS fees, 0 AS hypothetical_closed, 0 AS hypothetical_wins, 0 AS hypothetical_net
+                FROM scenarios
+                UNION ALL
+                SELECT s.symbol, o.ts / {DAY_MS}, 0, 0, o.executed, o.executed AND o.net > 0, o.executed * o.net,
+                       o.executed * o.fees, 1 - o.executed, NOT o.executed AND o.net > 0, (1 - o.executed) * o.net
+                FROM outcomes o JOIN scenarios s ON s.id = o.scenario_id
+            ) GROUP BY symbol, day
+        """)
+        conn.execute(f"""
+            INSERT INTO ai_rollup (symbol, source, bucket, resolved, hits)
+            SELECT s.symbol, s.ai_source, s.ai_confidence / {CONFIDENCE_BUCKET} * {CONFIDENCE_BUCKET}, COUNT(*),
+                   SUM((s.ai_recommendation = 'Enter') = (o.net > 0))
+            FROM outcomes o JOIN scenarios s ON s.id = o.scenario_id
+            WHERE s.ai_confidence IS NOT NULL AND s.ai_recommendation IS NOT NULL AND s.ai_source IS NOT NULL
+            GROUP BY s.symbol, s.ai_source, s.ai_confidence / {CONFIDENCE_BUCKET} * {CONFIDENCE_BUCKET}
+        """)
+
+def daily_report(conn, symbol=None, days=None):
+    """
+    Rollup rows (symbol, day start ms, scenarios, planned fees, closed, wins,
+    realized net, realized fees, hypothetical closed, hypothetical wins,
+    hypothetical net), newest first
+    """
+    where, params = [], []
+    if symbol:
+        where.append("symbol = ?")
+        params.append(symbol)
+    if days:
+        where.append("day >= ?")
+        params.append(int(time.time() * 1000) // DAY_MS - int(days) + 1)
+    return conn.execute(
+        "SELECT symbol, day * ?, scenarios, planned_fees, closed, wins, realized_net, realized_fees, "
+        "hypothetical_closed, hypothetical_wins, hypothetical_net FROM daily_rollup "
+        f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY day DESC, symbol",
+        [DAY_MS, *params]
+    ).fetchall()
+
+def ai_report(conn, symbol=None):
+    """(answer source, confidence bucket, resolved, hits) over all symbols or one"""
+    return conn.execute(
+        f"SELECT source, bucket, SUM(resolved), SUM(hits) FROM ai_rollup {'WHERE symbol = ?' if symbol else ''} "
+        "GROUP BY source, bucket ORDER BY source DESC, bucket",
+        (symbol,) if symbol else ()
+    ).fetchall()
+
+def colorize_amount(value, width=11):
+    text = f"{format_currency(value):>{width}}"
+    return colorize_positive(text) if value >= 0 else colorize_negative(text)
+
+def print_report(conn, symbol=None, days=None):
+    """Print P&L per symbol and day, fee totals and the AI hit rate by answer source and confidence"""
+    from datetime import datetime, timezone
+
+    started = time.perf_counter()
+    daily = daily_report(conn, symbol, days)
+    ai = ai_report(conn, symbol)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'DAY':<10} {'SYMBOL':<10} {'SCENARIOS':>9} {'CLOSED':>6} {'WINS':>5} {'REALIZED':>11} {'FEES':>10} "
+          f"{'HYPO':>5} {'HYPO NET':>11}")
+    for sym, day_ms, scenarios, _, closed, wins, realized_net, realized_fees, hypo_closed, _, hypo_net in daily:
+        day = datetime.fromtimestamp(day_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        print(f"{day:<10} {sym:<10} {scenarios:>9} {closed:>6} {wins:>5} {colorize_amount(realized_net)} "
+              f"{format_currency(realized_fees):>10} {hypo_closed:>5} {colorize_amount(hypo_net)}")
+
+    planned_fees = sum(row[3] for row in daily)
+    realized_fees = sum(row[7] for row in daily)
+    realized_net = sum(row[6] for row in daily)
+    hypo_closed = sum(row[8] for row in daily)
+    hypo_wins = sum(row[9] for row in daily)
+    hypo_net = sum(row[10] for row in daily)
+    print()
+    print(f"Realized (trades taken): {colorize_amount(realized_net, 0)} net | Fees paid: {format_currency(realized_fees)}")
+    print(f"Hypothetical (evaluated only): {colorize_amount(hypo_net, 0)} net over {hypo_closed} resolved, {hypo_wins} wins | "
+          f"Fees of all evaluated scenarios: {format_currency(planned_fees)}")
+
+    # OpenAI answers and signal_filter's local answers are scored separately
+    for source, label in (('openai', "OpenAI hit rate"), ('local', "Local signal hit rate")):
+        rows = [row[1:] for row in ai if row[0] == source]
+        if not rows:
+            continue
+        resolved = sum(row[1] for row in rows)
+        hits = sum(row[2] for row in rows)
+        buckets = " | ".join(f"{bucket}-{bucket + CONFIDENCE_BUCKET - 1}%: {row_hits}/{row_resolved}"
+                             for bucket, row_resolved, row_hits in rows)
+        print(f"{label}: {hits / resolved * 100:.1f}% of {resolved} closed scenarios (taken or hypothetical) | "
+              f"by confidence: {buckets}")
+    print(f"Report read from rollups in {elapsed * 1000:.2f} ms")
+
+def print_scenarios(conn, symbol=None, limit=20):
+    """Print the newest journaled scenarios with their outcomes"""
+    from datetime import datetime
+
+    rows = conn.execute(
+        "SELECT s.id, s.ts, s.symbol, s.source, s.entry, s.take_profit, s.stop_loss, s.position_size, "
+        "s.ai_recommendation, s.ai_confidence, s.executed, o.outcome, o.net FROM scenarios s "
+        "LEFT JOIN outcomes o ON o.scenario_id = s.id "
+        f"{'WHERE s.symbol = ?' if symbol else ''} ORDER BY s.ts DESC LIMIT ?",
+        (symbol, limit) if symbol else (limit,)
+    ).fetchall()
+    print(f"{'ID':>7} {'TIME':<16} {'SYMBOL':<10} {'SOURCE':<8} {'ENTRY':>12} {'TP':>12} {'SL':>12} {'SIZE':>11} {'AI':<10} {'OUTCOME':>18}")
+    for scenario_id, ts, sym, source, entry, tp, sl, size, recommendation, confidence, executed, outcome, net in rows:
+        when = datetime.fromtimestamp(ts / 1000).strftime('%Y-%m-%d %H:%M')
+        ai = f"{recommendation} {confidence}%" if recommendation else "-"
+        if outcome:
+            result = f"{outcome} {format_currency(net)}{'' if executed else ' hypo'}"
+        else:
+            result = "taken, open" if executed else "open"
+        print(f"{scenario_id:>7} {when:<16} {sym:<10} {source:<8} {entry:>12.4f} {tp:>12.4f} {sl:>12.4f} "
+              f"{format_currency(size):>11} {ai:<10} {result:>18}")
+
+def main():
+    """Main function to handle journal commands"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('list', 'take', 'close', 'resolve', 'report', 'rebuild'):
+        print("Usage: python trade_journal.py list [--symbol TOKEN] [--limit N]")
+        print("       python trade_journal.py take <id>")
+        print("       python trade_journal.py close <id> <exit_price> [--bnb]")
+        print("       python trade_journal.py resolve [--all] [--fetch] [--bnb]")
+        print("       python trade_journal.py report [--symbol TOKEN] [--days N]")
+        print("       python trade_journal.py rebuild")
+        print("  list: newest journaled scenarios and their outcomes")
+        print("  take: mark a scenario as a trade you entered, so its outcome counts as realized P&L")
+        print("  close: record the exit of a trade you took (marks it taken)")
+        print("  resolve: close taken trades whose TP or SL was touched in the stored 1m klines")
+        print("    --all: also resolve scenarios you only evaluated, as hypothetical outcomes")
+        print("    --fetch: backfill the needed 1m klines from Binance first")
+        print("  report: realized and hypothetical P&L per symbol and day, fee totals and AI hit rate, from the rollup tables")
+        print("  rebuild: recompute the rollup tables from the raw journal")
+        print("Scenarios are journaled by binance_price_calc.py, trading_strategy.py and scheduler.py run with --journal (or TRADE_JOURNAL=1).")
+        sys.exit(1)
+
+    from binance_price_calc import get_flag_value
+
+    command = sys.argv[1]
+    symbol = get_flag_value('--symbol')
+    symbol = f"{symbol.upper()}USDT" if symbol else None
+    use_bnb = "--bnb" in sys.argv
+    conn = connect()
+    try:
+        if command == 'list':
+            print_scenarios(conn, symbol, int(get_flag_value('--limit', 20)))
+        elif command == 'take':
+            if len(sys.argv) < 3:
+                print("Usage: python trade_journal.py take <id>")
+                sys.exit(1)
+            try:
+                take(conn, int(sys.argv[2]))
+            except KeyError:
+                print(f"No journaled scenario #{sys.argv[2]}")
+                sys.exit(1)
+            except ValueError:
+                print(f"Scenario #{sys.argv[2]} is already closed")
+                sys.exit(1)
+            print(f"Marked #{sys.argv[2]} as taken")
+        elif command == 'close':
+            if len(sys.argv) < 4:
+                print("Usage: python trade_journal.py close <id> <exit_price> [--bnb]")
+                sys.exit(1)
+            try:
+                result = close(conn, int(sys.argv[2]), 'manual', float(sys.argv[3]), use_bnb_discount=use_bnb, executed=True)
+            except KeyError:
+                print(f"No journaled scenario #{sys.argv[2]}")
+                sys.exit(1)
+            except ValueError:
+                print(f"Scenario #{sys.argv[2]} is already closed")
+                sys.exit(1)
+            print(f"Closed #{sys.argv[2]}: {result['price_change']:.2f}% | Net: {colorize_amount(result['net_amount'], 0)}")
+        elif command == 'resolve':
+            fetch = None
+            if "--fetch" in sys.argv:
+                import kline_cache
+                from trading_strategy import binance, BINANCE_KLINES_PATH
+
+                def fetch(pair, start_ms):
+                    def page(extra_params):
+                        response = binance.get(BINANCE_KLINES_PATH, params={'symbol': pair, 'interval': '1m', **extra_params})
+                        response.raise_for_status()
+                        return response.json()
+
+                    print(f"Backfilling {pair} 1m klines...")
+                    kline_cache.backfill(pair, '1m', start_ms, page)
+
+            hypothetical = "--all" in sys.argv
+            closed = resolve_open(conn, use_bnb_discount=use_bnb, fetch=fetch, hypothetical=hypothetical)
+            print(f"Closed {closed} {'scenarios' if hypothetical else 'taken trades'} whose TP or SL was hit")
+        elif command == 'report':
+            days = get_flag_value('--days')
+            print_report(conn, symbol, int(days) if days else None)
+        else:
+            started = time.perf_counter()
+            rebuild_rollups(conn)
+            print(f"Rollups rebuilt in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
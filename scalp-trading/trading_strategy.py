@@ -3,10 +3,23 @@
 # Advanced trading strategy calculator with AI suggestions
 
 import os, sys
+import time
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from scalp_calc import calc_profit, format_currency
+import ai_cache
+import ai_stream
+import binance_http
+import indicators
+import kline_cache
+import profiler
+import resample
+import signal_filter
+import trade_journal
+from candles import Candles
+from scalp_calc import calc_profit, format_currency, print_grid
 
 # Load environment variables
 load_dotenv()
@@ -47,47 +60,102 @@ def colorize_warning(s):
         return f"{BOLD}{TRUE_YELLOW}{s}{RESET}"
     return f"{BOLD}\033[93m{s}{RESET}"
 
-# OpenAI API integration
-def get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size, current_price=None):
-    """Get AI-powered trading strategy suggestions with technical analysis"""
-    api_key = os.getenv('OPENAI_KEY')
-    if not api_key:
-        return "⚠️  OpenAI API key not found. Set OPENAI_KEY in .env file."
-
-    if api_key == 'your_openai_api_key_here' or api_key == 'your_actual_api_key_here':
-        return "⚠️  Please replace the placeholder with your actual OpenAI API key."
+# Extra indicator lines added to the technical analysis prompt when available
+INDICATOR_LABELS = [
+    ('ema', f'EMA({indicators.EMA_PERIOD})'),
+    ('atr', f'ATR({indicators.ATR_PERIOD})'),
+    ('rsi', f'RSI({indicators.RSI_PERIOD})'),
+    ('vwap', 'VWAP'),
+]
 
-    # Fetch candlestick data for multiple timeframes
-    print("📊 Fetching technical data...")
-    candle_1m = get_candlestick_data(token, '1m', 240)  # Last 4 hours (240 minutes)
-    status_1m = f"✅ {len(candle_1m)} candles" if isinstance(candle_1m, list) else f"❌ {str(candle_1m)[:50]}..."
-    print(f"   1m candles: {status_1m}")
+# OpenAI API integration (override the URL to point at a local stand-in)
+OPENAI_CHAT_URL = os.getenv('OPENAI_CHAT_URL', 'https://api.openai.com/v1/chat/completions')
 
-    candle_15m = get_candlestick_data(token, '15m', 26)  # Same day (~26 periods)
-    status_15m = f"✅ {len(candle_15m)} candles" if isinstance(candle_15m, list) else f"❌ {str(candle_15m)[:50]}..."
-    print(f"   15m candles: {status_15m}")
+# Separate keep-alive session for OpenAI calls
+openai_session = profiler.instrument(requests.Session())
 
-    candle_1h = get_candlestick_data(token, '1h', 48)  # Last 48 hours
-    status_1h = f"✅ {len(candle_1h)} candles" if isinstance(candle_1h, list) else f"❌ {str(candle_1h)[:50]}..."
-    print(f"   1h candles: {status_1h}")
-
-    candle_1w = get_candlestick_data(token, '1w', 3)   # Last 3 weeks
-    status_1w = f"✅ {len(candle_1w)} candles" if isinstance(candle_1w, list) else f"❌ {str(candle_1w)[:50]}..."
-    print(f"   1w candles: {status_1w}")
-
-    candle_1M = get_candlestick_data(token, '1M', 12)  # Last 12 months
-    status_1M = f"✅ {len(candle_1M)} candles" if isinstance(candle_1M, list) else f"❌ {str(candle_1M)[:50]}..."
-    print(f"   1M candles: {status_1M}")
-
-    print("\n🤖 Analyzing with AI...")
+def get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size, current_price=None, verbose=True, on_text=None):
+    """
+    Get AI-powered trading strategy suggestions with technical analysis.
+    verbose=False skips progress lines; on_text(chunk) receives the answer as it streams in.
+    Answers from the local pre-filter carry "source": "local"; the OpenAI key is
+    only needed when the model is actually asked. An ambiguous local answer is
+    still returned when OpenAI can't be asked or its request fails.
+    """
+    # Fetch candlestick data for multiple timeframes concurrently
+    if verbose:
+        print("📊 Fetching technical data...")
+    with profiler.span('klines'):
+        candle_sets = get_candlestick_data_multi(token, TIMEFRAMES)
+    if verbose:
+        for (interval, _), candles in zip(TIMEFRAMES, candle_sets):
+            status = f"✅ {len(candles)} candles" if not isinstance(candles, str) else f"❌ {str(candles)[:50]}..."
+            print(f"   {interval} candles: {status}")
+
+        print("\n🤖 Analyzing with AI...")
+
+    # Analyze each timeframe with the incremental indicator engines
+    with profiler.span('analysis'):
+        analyses = [indicators.analyze(token, interval, candles) for (interval, _), candles in zip(TIMEFRAMES, candle_sets)]
+
+    # Clear-cut setups are answered locally in the same JSON schema, only ambiguous ones go to OpenAI
+    local_answer = None
+    if signal_filter.AI_PREFILTER_ENABLED:
+        with profiler.span('prefilter') as phase:
+            local_answer = signal_filter.score(entry_price, take_profit, stop_loss, position_size, analyses)
+            phase['escalated'] = signal_filter.is_ambiguous(local_answer)
+        if not phase['escalated']:
+            signal_filter.prefilter_stats.record_local()
+            if verbose:
+                print(f"🧮 Local signal {local_answer['strategic_recommendation']} at {local_answer['confidence_score']}% confidence, "
+                      f"OpenAI skipped | {signal_filter.prefilter_stats.stats_line()}")
+            return json.dumps({'source': 'local', **local_answer})
+
+    def local_fallback(problem):
+        # Without an OpenAI answer, the ambiguous local one beats an error message
+        if local_answer is None:
+            return problem
+        if verbose:
+            print(f"{problem}\n🧮 Falling back to the local signal ({local_answer['confidence_score']}% confidence)")
+        return json.dumps({'source': 'local', **local_answer})
 
-    # Analyze each timeframe
-    analysis_1m = analyze_candles(candle_1m, '1m')
-    analysis_15m = analyze_candles(candle_15m, '15m')
-    analysis_1h = analyze_candles(candle_1h, '1h')
-    analysis_1w = analyze_candles(candle_1w, '1w')
-    analysis_1M = analyze_candles(candle_1M, '1M')
+    api_key = os.getenv('OPENAI_KEY')
+    if not api_key:
+        return local_fallback("⚠️  OpenAI API key not found. Set OPENAI_KEY in .env file.")
 
+    if api_key == 'your_openai_api_key_here' or api_key == 'your_actual_api_key_here':
+        return local_fallback("⚠️  Please replace the placeholder with your actual OpenAI API key.")
+
+    with profiler.span('prompt'):
+        prompt = build_prompt(token, entry_price, take_profit, stop_loss, position_size, current_price, analyses)
+
+    # Reuse a recent answer for the same (quantized) trade and closed-candle state
+    cache_key = ai_cache.make_key(token, entry_price, take_profit, stop_loss, position_size, current_price, candle_sets)
+    started = time.monotonic()
+    completion = []
+    def ask_openai():
+        completion.append(request_ai_completion(api_key, prompt, on_text))
+        return completion[0]
+    with profiler.span('ai.answer') as phase:
+        suggestion, cache_hit = ai_cache.response_cache.get_or_call(cache_key, ask_openai)
+        phase['cache_hit'] = cache_hit
+    # Errors come back as non-cacheable messages (a miss without our own cacheable completion
+    # means we were coalesced onto a failed call) and don't count as timed OpenAI calls
+    failed = not cache_hit and not (completion and completion[0][1])
+    if signal_filter.AI_PREFILTER_ENABLED:
+        signal_filter.prefilter_stats.record_escalated(None if cache_hit or failed else time.monotonic() - started)
+    if verbose:
+        print(f"💾 AI cache {'hit' if cache_hit else 'miss'} | {ai_cache.response_cache.stats_line()}")
+        if signal_filter.AI_PREFILTER_ENABLED:
+            reason = (f"{local_answer['confidence_score']}% confidence is ambiguous" if local_answer is not None
+                      else "unavailable (no timeframe data)")
+            print(f"🧮 Local signal {reason}, asked OpenAI | {signal_filter.prefilter_stats.stats_line()}")
+    if failed:
+        return local_fallback(suggestion)
+    return suggestion
+
+def build_prompt(token, entry_price, take_profit, stop_loss, position_size, current_price, analyses):
+    """Build the OpenAI prompt from the trade and the per-timeframe analyses"""
     # Calculate risk metrics
     risk_amount = abs(entry_price - stop_loss) / entry_price * 100
     reward_amount = abs(take_profit - entry_price) / entry_price * 100
@@ -98,7 +166,7 @@ def get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size,
 
     # Build technical analysis string
     tech_analysis = ""
-    for analysis in [analysis_1m, analysis_15m, analysis_1h, analysis_1w, analysis_1M]:
+    for analysis in analyses:
         if isinstance(analysis, dict):
             tech_analysis += f"""
 {analysis['timeframe']} Analysis:
@@ -108,6 +176,9 @@ def get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size,
 - 10-period Low: ${analysis['low_10']:.4f}
 - Recent closes: {[f'{c:.4f}' for c in analysis['recent_closes']]}
 """
+            for key, label in INDICATOR_LABELS:
+                if analysis.get(key) is not None:
+                    tech_analysis += f"- {label}: {analysis[key]:.4f}\n"
         else:
             tech_analysis += f"{analysis}\n"
 
@@ -151,45 +222,76 @@ def get_ai_suggestion(token, entry_price, take_profit, stop_loss, position_size,
 
     Return ONLY the JSON object. Use specific price levels from the technical data. Direction should be "Long" for buying/expecting price increase, "Short" for selling/expecting price decrease. Confidence score should be 0-100 based on signal strength.
     """
+    return prompt
 
+def request_ai_completion(api_key, prompt, on_text=None):
+    """
+    Send the prompt to OpenAI and stream the answer, passing each text chunk to
+    on_text. Returns (text, cacheable); errors come back as non-cacheable messages.
+    """
     try:
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'model': 'gpt-4o-mini',
-                'messages': [{'role': 'user', 'content': prompt}],
-                'max_completion_tokens': 400,
-                'temperature': 0.7
-            },
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content'].strip()
-        else:
-            try:
-                error_data = response.json()
-                error_message = error_data.get('error', {}).get('message', 'Unknown error')
-                return f"❌ OpenAI API Error ({response.status_code}): {error_message}"
-            except:
-                return f"❌ API Error: {response.status_code} - {response.text[:200]}"
+        with profiler.span('openai.chat'):
+            response = openai_session.post(
+                OPENAI_CHAT_URL,
+                headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Content-Type': 'application/json'
+                },
+                json={
+                    'model': 'gpt-4o-mini',
+                    'messages': [{'role': 'user', 'content': prompt}],
+                    'max_completion_tokens': 400,
+                    'temperature': 0.7,
+                    'stream': True
+                },
+                timeout=10,
+                stream=True
+            )
+
+            if response.status_code == 200:
+                chunks = []
+                for text in ai_stream.iter_chat_deltas(response.iter_lines(chunk_size=None)):
+                    chunks.append(text)
+                    profiler.annotate(bytes=len(text.encode()))
+                    if on_text:
+                        on_text(text)
+                return ''.join(chunks).strip(), True
+
+        try:
+            error_data = response.json()
+            error_message = error_data.get('error', {}).get('message', 'Unknown error')
+            return f"❌ OpenAI API Error ({response.status_code}): {error_message}", False
+        except:
+            return f"❌ API Error: {response.status_code} - {response.text[:200]}", False
 
     except Exception as e:
-        return f"❌ Connection Error: {str(e)}"
+        return f"❌ Connection Error: {str(e)}", False
 
-# Binance API endpoints
-BINANCE_PRICE_URL = "https://api.binance.com/api/v3/ticker/price"
-BINANCE_KLINES_URL = "https://api.binance.com/api/v3/klines"
+# Binance API endpoints (hosts come from binance_http.BINANCE_API_HOSTS)
+BINANCE_PRICE_PATH = "/api/v3/ticker/price"
+BINANCE_KLINES_PATH = "/api/v3/klines"
+
+# Timeframes used for AI analysis: (interval, limit)
+TIMEFRAMES = [
+    ('1m', 240),  # Last 4 hours (240 minutes)
+    ('15m', 26),  # Same day (~26 periods)
+    ('1h', 48),   # Last 48 hours
+    ('1w', 3),    # Last 3 weeks
+    ('1M', 12),   # Last 12 months
+]
+
+# Shared keep-alive connection pool so every Binance call reuses the same TLS connections
+session = profiler.instrument(requests.Session())
+session.mount('https://', HTTPAdapter(pool_connections=len(binance_http.BINANCE_API_HOSTS), pool_maxsize=len(TIMEFRAMES)))
+
+# Timeouts, retries, failover and hedging across the Binance hosts
+binance = binance_http.ResilientClient(session)
 
 def get_current_price(symbol):
     """Fetch current price from Binance API"""
     try:
-        response = requests.get(f"{BINANCE_PRICE_URL}?symbol={symbol}USDT")
+        with profiler.span('binance.price', symbol=symbol):
+            response = binance.get(BINANCE_PRICE_PATH, params={'symbol': f'{symbol}USDT'})
         response.raise_for_status()
         data = response.json()
         return float(data['price'])
@@ -201,35 +303,46 @@ def get_current_price(symbol):
         sys.exit(1)
 
 def get_candlestick_data(symbol, interval, limit=50):
-    """Fetch candlestick data from Binance API"""
-    try:
+    """Fetch candlestick data from Binance API, serving closed candles from the local kline cache"""
+    def fetch(extra_params):
         params = {
             'symbol': f'{symbol}USDT',
             'interval': interval,
-            'limit': limit
+            **extra_params
         }
-        response = requests.get(BINANCE_KLINES_URL, params=params)
+        with profiler.span('binance.klines', interval=interval, **extra_params):
+            response = binance.get(BINANCE_KLINES_PATH, params=params)
         response.raise_for_status()
-        data = response.json()
-
-        # Parse candlestick data
-        candles = []
-        for candle in data:
-            candles.append({
-                'timestamp': int(candle[0]),
-                'open': float(candle[1]),
-                'high': float(candle[2]),
-                'low': float(candle[3]),
-                'close': float(candle[4]),
-                'volume': float(candle[5])
-            })
+        return response.json()
 
-        return candles
+    try:
+        rows = kline_cache.get_klines(f'{symbol}USDT', interval, limit, fetch)
+        return Candles.from_rows(rows)
     except requests.exceptions.RequestException as e:
         return f"Error fetching candlestick data: {e}"
-    except (KeyError, ValueError) as e:
+    except (KeyError, ValueError, IndexError) as e:
         return f"Error parsing candlestick data: {e}"
 
+def get_candlestick_data_multi(symbol, timeframes):
+    """
+    Fetch several (interval, limit) timeframes, results in the same order.
+
+    Timeframes that can be aggregated from a finer series within one request
+    (1m -> 15m -> 1h, 1d -> 1w / 1M) are derived locally; the rest are
+    fetched concurrently.
+    """
+    fetches, derived = resample.plan_fetches(timeframes)
+    with ThreadPoolExecutor(max_workers=len(fetches)) as executor:
+        futures = {interval: executor.submit(get_candlestick_data, symbol, interval, limit) for interval, limit in fetches.items()}
+        series = {interval: future.result() for interval, future in futures.items()}
+
+    with profiler.span('resample', derived=len(derived)):
+        for interval, source in derived:
+            candles = series[source]
+            series[interval] = candles if isinstance(candles, str) else resample.resampler(symbol, source, interval).update(candles)
+
+    return [series[interval] if isinstance(series[interval], str) else series[interval][-limit:] for interval, limit in timeframes]
+
 def analyze_candles(candles, timeframe):
     """Analyze candlestick data for key levels and trends"""
     if isinstance(candles, str):  # Error message
@@ -238,17 +351,18 @@ def analyze_candles(candles, timeframe):
     if len(candles) < 5:
         return f"Insufficient {timeframe} data"
 
+    if not isinstance(candles, Candles):
+        candles = Candles.from_dicts(candles)
+
     recent_candles = candles[-10:]  # Last 10 candles for analysis
 
-    # Calculate key metrics
-    closes = [c['close'] for c in recent_candles]
-    highs = [c['high'] for c in recent_candles]
-    lows = [c['low'] for c in recent_candles]
+    # Calculate key metrics on the columnar arrays
+    closes = recent_candles.close
 
-    current_price = closes[-1]
-    high_10 = max(highs)
-    low_10 = min(lows)
-    avg_volume = sum([c['volume'] for c in recent_candles]) / len(recent_candles)
+    current_price = float(closes[-1])
+    high_10 = float(recent_candles.high.max())
+    low_10 = float(recent_candles.low.min())
+    avg_volume = float(recent_candles.volume.mean())
 
     # Trend analysis
     if closes[-1] > closes[0]:
@@ -269,99 +383,182 @@ def analyze_candles(candles, timeframe):
         'trend': trend,
         'volatility_pct': volatility,
         'avg_volume': avg_volume,
-        'recent_closes': closes[-5:]  # Last 5 closes for pattern analysis
+        'recent_closes': closes[-5:].tolist()  # Last 5 closes for pattern analysis
     }
 
 def print_scenario(title, result):
     """Print a concise scenario result with colors"""
+    values = f"{result['price_change']:.2f}% | Net: {format_currency(result['net_amount'])}"
+    if 'slippage' in result:
+        values += f" | Fees: {format_currency(result['fees'])} | Slippage: {format_currency(result['slippage'])}"
     if result['net_amount'] >= 0:
         colorized_title = colorize_positive(title)
-        colorized_values = colorize_positive(f"{result['price_change']:.2f}% | Net: {format_currency(result['net_amount'])}")
+        colorized_values = colorize_positive(values)
     else:
         colorized_title = colorize_negative(title)
-        colorized_values = colorize_negative(f"{result['price_change']:.2f}% | Net: {format_currency(result['net_amount'])}")
+        colorized_values = colorize_negative(values)
 
     print(f"{colorized_title:<12}: {colorized_values}")
 
-def format_ai_response(ai_response):
-    """Parse and format AI JSON response nicely"""
-    try:
-        # Clean the response by removing markdown code blocks
-        cleaned_response = ai_response.strip()
-        if cleaned_response.startswith('```json'):
-            cleaned_response = cleaned_response[7:]
-        if cleaned_response.endswith('```'):
-            cleaned_response = cleaned_response[:-3]
-        cleaned_response = cleaned_response.strip()
-
-        data = json.loads(cleaned_response)
-
+def print_monte_carlo(token, entry_price, take_profit, stop_loss, position_size, use_bnb=False, book=None):
+    """
+    Print the simulated odds of hitting TP before SL and the expected net value of the trade,
+    with the slippage of the trade's side priced from the order book snapshot, if given
+    """
+    import math
+    import monte_carlo
+    from binance_price_calc import get_flag_value
+
+    slippage = None
+    if book is not None:
+        # A take profit below entry is simulated as a short, which fills on the other sides of the book
+        side = 'long' if take_profit >= entry_price else 'short'
+        slippage = tuple(float(v) for v in book.slippage(position_size, side))
+        if any(math.isnan(v) for v in slippage):
+            slippage = None
+
+    paths = int(get_flag_value('--mc', monte_carlo.MC_PATHS))
+    horizon = int(get_flag_value('--horizon', monte_carlo.MC_HORIZON))
+    candles = get_candlestick_data(token, '1m', monte_carlo.MC_HISTORY)
+    if isinstance(candles, str):
+        print(f"❌ Monte Carlo skipped: {candles}")
+        return
+
+    result = monte_carlo.estimate(candles, entry_price, take_profit, stop_loss, position_size,
+                                  use_bnb_discount=use_bnb, slippage=slippage, paths=paths, horizon=horizon)
+    if result is None:
+        print("❌ Monte Carlo skipped: not enough 1m candles")
+        return
+
+    expected = format_currency(result['expected_net'])
+    expected = colorize_positive(expected) if result['expected_net'] >= 0 else colorize_negative(expected)
+    print(f"{colorize_info('Monte Carlo')}: TP first {result['tp_prob'] * 100:.1f}% | SL first {result['sl_prob'] * 100:.1f}% | "
+          f"Neither in {horizon}m {result['open_prob'] * 100:.1f}% | Expected net: {expected}")
+    print(f"   {paths:,} paths from {result['history']} 1m candles in {result['elapsed']:.2f}s "
+          f"({result['workers']} worker{'s' if result['workers'] > 1 else ''})")
+
+def parse_ai_response(ai_response):
+    """Decode the AI JSON response, tolerating markdown code fences (raises json.JSONDecodeError)"""
+    # Clean the response by removing markdown code blocks
+    cleaned_response = ai_response.strip()
+    if cleaned_response.startswith('```json'):
+        cleaned_response = cleaned_response[7:]
+    if cleaned_response.endswith('```'):
+        cleaned_response = cleaned_response[:-3]
+    cleaned_response = cleaned_response.strip()
+
+    return json.loads(cleaned_response)
+
+def ai_field_lines(key, value):
+    """Display lines for one field of the AI JSON answer (raises KeyError/TypeError/ValueError if malformed)"""
+    if key == 'risk_assessment':
         # Risk assessment with color
-        risk_level = data['risk_assessment']['level']
+        risk_level = value['level']
         if risk_level == 'Low':
             risk_color = colorize_positive
         elif risk_level == 'Medium':
             risk_color = colorize_warning
         else:  # High
             risk_color = colorize_negative
+        return [f"⚠️  Risk Assessment: {risk_color(risk_level)}", f"   {value['reasoning']}", ""]
 
-        print(f"🎯 {colorize_info('Strategic Analysis')}")
-        print("=" * 50)
-
-        # Risk Assessment
-        print(f"⚠️  Risk Assessment: {risk_color(risk_level)}")
-        print(f"   {data['risk_assessment']['reasoning']}")
-        print()
-
-        # Strategic Recommendation
-        rec_color = colorize_positive if data['strategic_recommendation'] in ['Enter'] else \
-                   colorize_warning if data['strategic_recommendation'] in ['Hold', 'Wait'] else \
+    if key == 'strategic_recommendation':
+        rec_color = colorize_positive if value in ['Enter'] else \
+                   colorize_warning if value in ['Hold', 'Wait'] else \
                    colorize_negative
-        print(f"📈 Strategic Recommendation: {rec_color(data['strategic_recommendation'])}")
+        return [f"📈 Strategic Recommendation: {rec_color(value)}"]
 
-        # Direction Recommendation
-        direction = data['direction']
-        dir_color = colorize_positive if direction == 'Long' else colorize_negative
-        print(f"📊 Direction: {dir_color(direction)}")
-        print()
+    if key == 'direction':
+        dir_color = colorize_positive if value == 'Long' else colorize_negative
+        return [f"📊 Direction: {dir_color(value)}", ""]
 
-        # Suggested Levels
-        print(f"🎯 {colorize_info('Suggested Levels')}:")
-        tp_price = data['suggested_levels']['take_profit']
-        sl_price = data['suggested_levels']['stop_loss']
-        print(f"   Take Profit: {colorize_positive(f'${tp_price:.4f}')}")
-        print(f"   Stop Loss:  {colorize_negative(f'${sl_price:.4f}')}")
-        print()
+    if key == 'suggested_levels':
+        tp_price = value['take_profit']
+        sl_price = value['stop_loss']
+        return [f"🎯 {colorize_info('Suggested Levels')}:",
+                f"   Take Profit: {colorize_positive(f'${tp_price:.4f}')}",
+                f"   Stop Loss:  {colorize_negative(f'${sl_price:.4f}')}",
+                ""]
 
-        # Technical Considerations
-        print(f"📊 {colorize_info('Technical Considerations')}:")
-        print(f"   {data['technical_considerations']}")
-        print()
+    if key == 'technical_considerations':
+        return [f"📊 {colorize_info('Technical Considerations')}:", f"   {value}", ""]
 
-        # Position Size Adjustment
-        print(f"💰 {colorize_info('Position Size')}: {data['position_size_adjustment']}")
-        print()
+    if key == 'position_size_adjustment':
+        return [f"💰 {colorize_info('Position Size')}: {value}", ""]
 
-        # Confidence Score
-        confidence = data['confidence_score']
-        confidence_color = colorize_positive if confidence >= 70 else \
-                          colorize_warning if confidence >= 50 else \
+    if key == 'source':
+        return [f"🧮 Source: {colorize_warning('local signal score, no OpenAI answer')}", ""] if value == 'local' else []
+
+    if key == 'confidence_score':
+        confidence_color = colorize_positive if value >= 70 else \
+                          colorize_warning if value >= 50 else \
                           colorize_negative
-        print(f"🎖️  Confidence Score: {confidence_color(f'{confidence}%')}")
+        return [f"🎖️  Confidence Score: {confidence_color(f'{value}%')}"]
+
+    return []
 
-    except json.JSONDecodeError as e:
-        # Fallback to plain text display if JSON parsing fails
-        print(f"📝 {colorize_info('AI Analysis')}:")
-        print("-" * 40)
-        print(ai_response)
-    except KeyError as e:
-        print(f"❌ Error parsing AI response: Missing key {e}")
-        print(f"📝 Raw response: {ai_response}")
+# Fields every AI answer must contain
+AI_RESPONSE_FIELDS = ('risk_assessment', 'direction', 'strategic_recommendation', 'suggested_levels',
+                      'technical_considerations', 'position_size_adjustment', 'confidence_score')
+
+# Fields shown when present: "source" is "local" on answers the signal pre-filter gave without OpenAI
+AI_OPTIONAL_FIELDS = ('source',)
+
+class AIResponseRenderer:
+    """Print the AI JSON answer field by field, as soon as each field is complete in the stream"""
+
+    def __init__(self):
+        self.parser = ai_stream.IncrementalObjectParser()
+        self.received = False
+        self.shown = []
+        self.error = None
+
+    def feed(self, text):
+        self.received = True
+        for key, value in self.parser.feed(text):
+            if key not in AI_RESPONSE_FIELDS + AI_OPTIONAL_FIELDS or self.error:
+                continue
+            try:
+                lines = ai_field_lines(key, value)
+            except KeyError as e:
+                self.error = f"Missing key {e}"
+                continue
+            except (TypeError, ValueError) as e:
+                self.error = f"Bad value for '{key}': {e}"
+                continue
+            if not lines:
+                continue
+            if not self.shown:
+                print(f"🎯 {colorize_info('Strategic Analysis')}")
+                print("=" * 50)
+            print("\n".join(lines), flush=True)
+            self.shown.append(key)
+
+    def finish(self, ai_response):
+        """Render whatever was not streamed (cache hits, errors) and report bad or missing fields"""
+        if not self.received:
+            self.feed(ai_response)
+
+        if not self.parser.complete:
+            # Fallback to plain text display if JSON parsing fails
+            print(f"📝 {colorize_info('AI Analysis')}:")
+            print("-" * 40)
+            print(ai_response)
+            return
+
+        missing = [key for key in AI_RESPONSE_FIELDS if key not in self.shown]
+        if self.error or missing:
+            print(f"❌ Error parsing AI response: {self.error or f'Missing key {missing[0]!r}'}")
+            print(f"📝 Raw response: {ai_response}")
+
+def format_ai_response(ai_response):
+    """Parse and format AI JSON response nicely"""
+    AIResponseRenderer().finish(ai_response)
 
 def main():
     """Main function to handle trading strategy analysis"""
     if len(sys.argv) < 5:
-        print("Usage: python trading_strategy.py <token> <take_profit_price> <stop_loss_price> <position_size> [--bnb] [--live] [--manual] [--ai]")
+        print("Usage: python trading_strategy.py <token> <take_profit_price> <stop_loss_price> <position_size> [--bnb] [--live] [--manual] [--ai] [--grid] [--depth [levels]] [--snap] [--mc [paths]] [--journal] [--profile [file]]")
         print("  token: cryptocurrency symbol (e.g., BTC, ETH, SOL)")
         print("  take_profit_price: take profit exit price")
         print("  stop_loss_price: stop loss exit price")
@@ -369,7 +566,14 @@ def main():
         print("  --bnb: use BNB discount fee rate (optional)")
         print("  --live: explicitly use live Binance price as entry")
         print("  --manual: manually enter entry price")
+        print("  --grid: print net P&L heatmap of exit prices x position sizes")
+        print("  --depth [levels]: include slippage estimated from an order book snapshot (default 1000 levels)")
+        print("  --snap: round prices to the symbol's tick size and the quantity to its lot size first")
         print("  --ai: enable AI-powered strategy suggestions")
+        print("  --mc [paths]: Monte Carlo odds of hitting TP before SL from resampled 1m candles (default 100000 paths)")
+        print("    --horizon MIN: minutes simulated per path before closing at market (default 240)")
+        print("  --journal: record the scenario (and AI answer) in the trade journal (see trade_journal.py)")
+        print("  --profile [file]: print per-phase timings and write a Chrome trace (default scalp-trace.json)")
         sys.exit(1)
 
     token = sys.argv[1].upper()
@@ -379,7 +583,10 @@ def main():
     use_bnb = "--bnb" in sys.argv
     use_live_price = "--live" in sys.argv
     use_manual_entry = "--manual" in sys.argv
+    use_grid = "--grid" in sys.argv
     use_ai = "--ai" in sys.argv
+    use_depth = "--depth" in sys.argv
+    use_mc = "--mc" in sys.argv
 
     # Get entry price
     if use_live_price:
@@ -393,28 +600,66 @@ def main():
         entry_price = get_current_price(token)
         print(f"{colorize_info(token + 'USDT-CURR')}: ${entry_price:.4f}")
 
-    # Calculate scenarios
-    profit_result = calc_profit(entry_price, take_profit_price, position_size, use_bnb_discount=use_bnb)
-    loss_result = calc_profit(entry_price, stop_loss_price, position_size, use_bnb_discount=use_bnb)
+    rules = None
+    if "--snap" in sys.argv:
+        from binance_price_calc import get_symbol_rules, snap_order
+        rules = get_symbol_rules(token, client=binance)
+        entry_price, take_profit_price, stop_loss_price, position_size = snap_order(
+            rules, entry_price, take_profit_price, stop_loss_price, position_size)
 
-    print()
-    print_scenario("TAKE PROFIT", profit_result)
-    print_scenario("STOP LOSS", loss_result)
+    book, slippage = None, None
+    if use_depth:
+        from binance_price_calc import DEPTH_LIMIT, depth_slippage, get_flag_value
+        book, slippage = depth_slippage(token, position_size, int(get_flag_value('--depth', DEPTH_LIMIT)), client=binance)
 
-    # Risk metrics
-    risk_pct = abs(stop_loss_price - entry_price) / entry_price * 100
-    reward_pct = abs(take_profit_price - entry_price) / entry_price * 100
-    rr_ratio = reward_pct / risk_pct if risk_pct > 0 else 0
+    with profiler.span('scenarios'):
+        # Calculate scenarios
+        profit_result = calc_profit(entry_price, take_profit_price, position_size, use_bnb_discount=use_bnb, slippage=slippage)
+        loss_result = calc_profit(entry_price, stop_loss_price, position_size, use_bnb_discount=use_bnb, slippage=slippage)
 
-    print()
-    print(f"{colorize_info('Risk/Reward')}: {rr_ratio:.2f} | Risk: {risk_pct:.2f}% | Reward: {reward_pct:.2f}%")
+        print()
+        print_scenario("TAKE PROFIT", profit_result)
+        print_scenario("STOP LOSS", loss_result)
+
+        # Risk metrics
+        risk_pct = abs(stop_loss_price - entry_price) / entry_price * 100
+        reward_pct = abs(take_profit_price - entry_price) / entry_price * 100
+        rr_ratio = reward_pct / risk_pct if risk_pct > 0 else 0
+
+        print()
+        print(f"{colorize_info('Risk/Reward')}: {rr_ratio:.2f} | Risk: {risk_pct:.2f}% | Reward: {reward_pct:.2f}%")
+
+    if use_mc:
+        with profiler.span('monte_carlo'):
+            print_monte_carlo(token, entry_price, take_profit_price, stop_loss_price, position_size,
+                              use_bnb=use_bnb, book=book)
+
+    if use_grid:
+        print()
+        with profiler.span('grid'):
+            print_grid(entry_price, take_profit_price, stop_loss_price, position_size, use_bnb_discount=use_bnb, book=book,
+                       rules=rules)
 
     # AI Strategy suggestion (only if --ai flag is used)
+    suggestion = None
     if use_ai:
         print()
 
-        suggestion = get_ai_suggestion(token, entry_price, take_profit_price, stop_loss_price, position_size, entry_price)
-        format_ai_response(suggestion)
+        # Fields are printed while the answer streams in, the rest once it is complete
+        renderer = AIResponseRenderer()
+        with profiler.span('ai'):
+            suggestion = get_ai_suggestion(token, entry_price, take_profit_price, stop_loss_price, position_size, entry_price,
+                                           on_text=renderer.feed)
+        with profiler.span('format'):
+            renderer.finish(suggestion)
+
+    if trade_journal.requested():
+        scenario_id = trade_journal.record('strategy', token, entry_price, take_profit_price, stop_loss_price, position_size,
+                                           profit_result, loss_result, suggestion)
+        if scenario_id is not None:
+            print()
+            print(f"📒 Journaled as #{scenario_id}")
 
 if __name__ == "__main__":
-    main()
+    with profiler.profiled('trading_strategy'):
+        main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# ws_replay_server.py
+# Local stand-in for the Binance WebSocket stream that replays recorded ticks
+
+import asyncio
+import json
+import sys
+
+import websockets
+
+def load_ticks(path):
+    """Load raw stream messages, one per line (as written by --stream --record)"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def tick_time(message):
+    """Event time in milliseconds, or None when the message has none"""
+    try:
+        data = json.loads(message)
+        data = data.get('data', data)
+        return data.get('E') or data.get('T')
+    except (ValueError, AttributeError):
+        return None
+
+async def replay(websocket, ticks, speed):
+    """Send ticks to one client, keeping the recorded spacing scaled by speed"""
+    previous = None
+    for message in ticks:
+        current = tick_time(message)
+        if speed > 0 and previous is not None and current is not None:
+            await asyncio.sleep(max(current - previous, 0) / 1000 / speed)
+        previous = current
+        await websocket.send(message)
+
+async def serve(ticks, host, port, speed):
+    async def handler(websocket, path=None):
+        await replay(websocket, ticks, speed)
+
+    async with websockets.serve(handler, host, port):
+        print(f"Replaying {len(ticks)} ticks on ws://{host}:{port}/ws")
+        await asyncio.Future()
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python ws_replay_server.py <ticks_file> [port] [speed]")
+        print("  ticks_file: recorded raw stream messages, one JSON object per line")
+        print("  port: listen port (default 8765)")
+        print("  speed: replay speed multiplier, 0 sends as fast as possible (default 1)")
+        print()
+        print("Then run: BINANCE_WS_URL=ws://127.0.0.1:8765/ws python binance_price_calc.py SOL 190 180 1000 --stream")
+        sys.exit(1)
+
+    ticks = load_ticks(sys.argv[1])
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    speed = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    try:
+        asyncio.run(serve(ticks, '127.0.0.1', port, speed))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()